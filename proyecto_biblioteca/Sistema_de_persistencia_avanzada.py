@@ -7,6 +7,9 @@
 # Importamos el módulo que contiene todas las funciones CRUD y utilitarias.
 # Este módulo (funciones_jerarquia.py) implementa la lógica de persistencia,
 # validaciones, recursividad y manejo de archivos CSV.
+import os
+import sys
+
 import funciones_jerarquia as fcs
 
 # ------------------------------------------------------------
@@ -24,10 +27,20 @@ import funciones_jerarquia as fcs
 # └── Historia/
 #     └── Yuval Harari/
 #         └── Sapiens/libros.csv
-ROOT = "./biblioteca"
+# Se puede elegir otra biblioteca como argumento o con la variable de entorno
+# BIBLIOTECA_ROOT. Si la ruta termina en .db/.sqlite se usa el backend SQLite
+# (toda la biblioteca en un solo archivo), por ejemplo:
+#     python Sistema_de_persistencia_avanzada.py biblioteca.db
+ROOT = sys.argv[1] if len(sys.argv) > 1 else os.environ.get("BIBLIOTECA_ROOT", "./biblioteca")
 
-# Creamos la carpeta raíz si no existe (persistencia avanzada)
+# Creamos la carpeta raíz (o el archivo SQLite) si no existe (persistencia avanzada)
 fcs.inicializar_root(ROOT)
+# Métricas de rendimiento: se activan desde la opción "m" o con BIBLIOTECA_METRICAS=1.
+# Al salir, si están activas, se guardan en METRICAS_ARCHIVO (JSON).
+METRICAS_ARCHIVO = os.environ.get("BIBLIOTECA_METRICAS_ARCHIVO", "metricas.json")
+fcs.activar_metricas(os.environ.get("BIBLIOTECA_METRICAS") == "1")
+
+print(f"Biblioteca: {ROOT} ({'SQLite' if fcs.es_sqlite(ROOT) else 'carpetas CSV'})")
 
 # ------------------------------------------------------------
 #  MENÚ PRINCIPAL
@@ -44,6 +57,11 @@ while True:
     print("6. Mostrar estadísticas")
     print("7. Filtrar libros por atributo")
     print("8. Salir")
+    print("b. Buscar por título o autor (tolera errores de tipeo)")
+    print("i. Importar libros en lote (CSV/JSONL u otra biblioteca)")
+    print("v. Verificar / reconstruir índices y estadísticas")
+    print("c. Compactar biblioteca")
+    print("m. Métricas de rendimiento")
 
     # El usuario elige una opción.
     opcion = input("Seleccione una opción: ").strip()
@@ -118,8 +136,15 @@ while True:
         # ------------------- OPCIÓN 5 ------------------------
         # ORDENAR LIBROS POR PRECIO
         case "5":
-            libros = fcs.leer_toda_jerarquia(ROOT)
-            ordenados = fcs.ordenar_libros(libros, "precio")
+            cantidad = input("¿Cuántos libros mostrar? (vacío = todos): ").strip()
+            if cantidad and not cantidad.isdigit():
+                print("Cantidad inválida.")
+                continue
+            if cantidad:
+                # Top-N con un heap sobre el lector en streaming: no ordena toda la biblioteca.
+                ordenados = fcs.ordenar_libros(fcs.iter_libros(ROOT), "precio", limite=int(cantidad))
+            else:
+                ordenados = fcs.ordenar_libros(fcs.leer_toda_jerarquia(ROOT), "precio")
             print("\n--- Libros ordenados por precio ---")
             for l in ordenados:
                 print(f"{l['titulo']} - ${l['precio']}")
@@ -127,21 +152,42 @@ while True:
         # ------------------- OPCIÓN 6 ------------------------
         # ESTADÍSTICAS
         case "6":
-            libros = fcs.leer_toda_jerarquia(ROOT)
-            fcs.estadisticas(libros)
+            agrupar = input("Agrupar por (genero, autor, anio; vacío = no agrupar): ").strip() or None
+            if agrupar not in (None, "genero", "autor", "anio"):
+                print("Atributo inválido para agrupar.")
+                continue
+            # Sin agrupar, por género o por autor se leen las estadísticas materializadas
+            # (no se recorre la biblioteca); por año, una sola pasada en streaming.
+            fcs.estadisticas_biblioteca(ROOT, agrupar)
 
         # ------------------- OPCIÓN 7 ------------------------
         # FILTRO (por género, autor, año, etc.)
         case "7":
-            libros = fcs.leer_toda_jerarquia(ROOT)
-            if not libros:
-                print("No hay libros para filtrar.")
+            # Se permite al usuario escribir el atributo y el valor deseado, o bien
+            # una consulta compuesta (rangos, prefijos, & = "y", | = "o").
+            atributo = input("Atributo (ej. genero, autor, anio) o consulta "
+                             "(ej. precio=1000..5000 & anio>=1990): ").strip()
+            if any(simbolo in atributo for simbolo in "=<>"):
+                try:
+                    resultado = fcs.consultar_biblioteca(ROOT, atributo)
+                except ValueError as e:
+                    print(f"Error en la consulta: {e}")
+                    continue
+                if not resultado:
+                    print("No se encontraron libros para esa consulta.")
+                for l in resultado:
+                    print(f"{l['titulo']} | {l['autor']} | {l['genero']} | ${l['precio']} | {l['anio']}")
                 continue
-
-            # Se permite al usuario escribir el atributo y el valor deseado.
-            atributo = input("Atributo (ej. genero, autor, anio): ").strip()
             valor = input(f"Valor de {atributo}: ").strip()
 
+            # Si el atributo es un nivel de carpeta (genero, autor, titulo), iter_libros
+            # solo recorre el subárbol que coincide; para el resto se recorre todo,
+            # pero en streaming (sin cargar la biblioteca completa en memoria).
+            if atributo in fcs.NIVELES:
+                libros = fcs.iter_libros(ROOT, **{atributo: valor})
+            else:
+                libros = fcs.iter_libros(ROOT)
+
             # Filtramos y mostramos los resultados.
             resultado = fcs.filtrar_libros(libros, atributo, valor)
             if resultado:
@@ -149,9 +195,135 @@ while True:
                 for l in resultado:
                     print(f"{l['titulo']} | {l['autor']} | {l['genero']} | ${l['precio']} | {l['anio']}")
 
+        # ------------------- OPCIÓN V ------------------------
+        # VERIFICAR / RECONSTRUIR ÍNDICES Y ESTADÍSTICAS (recuperación)
+        case "v" | "V":
+            # Borra temporales .tmp sueltos de escrituras interrumpidas.
+            borrados = fcs.limpiar_temporales(ROOT)
+            if borrados:
+                print(f"Se borraron {len(borrados)} archivos temporales sueltos.")
+            # Compara los índices de codigo_libro y título con una lectura completa.
+            problemas = fcs.verificar_indices(ROOT)
+            if not any(problemas.values()):
+                print("Los índices están al día.")
+            else:
+                for tipo, codigos in problemas.items():
+                    if codigos:
+                        print(f"{tipo}: {len(codigos)}")
+                if input("¿Reconstruir los índices? (s/n): ").strip().lower() == "s":
+                    total = fcs.reconstruir_indices(ROOT)
+                    print(f"Índices reconstruidos ({total} libros).")
+            # Compara las estadísticas materializadas (opción 6) con una lectura completa.
+            diferencias = fcs.verificar_agregados(ROOT)
+            if not diferencias:
+                print("Las estadísticas materializadas están al día.")
+                continue
+            print(f"Estadísticas materializadas con {len(diferencias)} diferencias, por ejemplo:")
+            for diferencia in diferencias[:5]:
+                print(f"  {diferencia}")
+            if input("¿Reconstruir las estadísticas? (s/n): ").strip().lower() == "s":
+                total = fcs.reconstruir_agregados(ROOT)
+                print(f"Estadísticas reconstruidas ({total} libros).")
+
+        # ------------------- OPCIÓN I ------------------------
+        # IMPORTACIÓN MASIVA (alta agrupada por carpeta de título)
+        case "i" | "I":
+            archivo = input("Archivo a importar (.csv, .jsonl, carpeta o .db de otra biblioteca): ").strip()
+            try:
+                if os.path.isdir(archivo) or fcs.es_sqlite(archivo):
+                    # Otra biblioteca (de cualquier backend): se copia conservando los códigos
+                    resumen = fcs.copiar_biblioteca(archivo, ROOT)
+                else:
+                    resumen = fcs.alta_libros_bulk(ROOT, archivo)
+            except Exception as e:
+                print(f"Error al importar: {e}")
+                continue
+            print(f"Libros importados: {resumen['libros']} en {resumen['archivos']} archivos "
+                  f"({resumen['filas_por_segundo']:.0f} filas/s)")
+            if resumen["errores"]:
+                print(f"Registros rechazados: {len(resumen['errores'])}")
+                for numero, mensaje in resumen["errores"][:10]:
+                    print(f"  registro {numero}: {mensaje}")
+
+        # ------------------- OPCIÓN B ------------------------
+        # BÚSQUEDA POR TÍTULO O AUTOR (índice de trigramas: subcadena y parecidos)
+        case "b" | "B":
+            texto = input("Texto a buscar (parte del título o del autor): ").strip()
+            campo = input("Buscar en (titulo, autor; vacío = ambos): ").strip().lower()
+            campos = (campo,) if campo else fcs.CAMPOS_BUSQUEDA
+            try:
+                resultados = fcs.buscar_libros(ROOT, texto, campos, difuso=True, limite=20)
+            except ValueError as e:
+                print(f"Error: {e}")
+                continue
+            if not resultados:
+                print("No se encontraron libros parecidos.")
+                continue
+            similitudes = {r["codigo_libro"]: r["similitud"] for r in resultados}
+            print("\n--- Libros encontrados (del más parecido al menos parecido) ---")
+            for l in fcs.leer_libros_por_codigo(ROOT, list(similitudes)):
+                print(f"{similitudes[l['codigo_libro']]:.0%} | {l['titulo']} | {l['autor']} | {l['genero']} | "
+                      f"${l['precio']} | {l['anio']}")
+
+        # ------------------- OPCIÓN C ------------------------
+        # COMPACTACIÓN (CSV y carpetas vacías, reagrupar por autor/género)
+        case "c" | "C":
+            fragmentar = None
+            if not fcs.es_sqlite(ROOT):  # en SQLite compactar es VACUUM
+                print(f"Disposición actual: un libros.csv por {fcs.nivel_fragmentacion(ROOT)}.")
+                fragmentar = input("Reagrupar en un libros.csv por (titulo, autor, genero; "
+                                   "vacío = solo limpiar): ").strip().lower() or None
+            try:
+                resumen = fcs.compactar_biblioteca(ROOT, fragmentar)
+            except ValueError as e:
+                print(f"Error: {e}")
+                continue
+            antes, despues = resumen["antes"], resumen["despues"]
+            print(f"CSV vacíos borrados: {resumen['csv_vacios']}  temporales: {resumen['temporales']}  "
+                  f"carpetas borradas: {resumen['carpetas_borradas']}")
+            if resumen["csv_reagrupados"]:
+                print(f"{resumen['csv_reagrupados']} CSV reagrupados en {resumen['fragmentos']}.")
+            print(f"Antes:   {antes['csv']} CSV, {antes['archivos']} archivos, {antes['carpetas']} carpetas, "
+                  f"{antes['bytes_en_disco'] / 1024:.0f} KB en disco")
+            print(f"Después: {despues['csv']} CSV, {despues['archivos']} archivos, {despues['carpetas']} carpetas, "
+                  f"{despues['bytes_en_disco'] / 1024:.0f} KB en disco  ({resumen['segundos']:.2f} s)")
+
+        # ------------------- OPCIÓN M ------------------------
+        # MÉTRICAS (tiempos por función, archivos, filas y bytes) Y PERFILADO
+        case "m" | "M":
+            print(f"Métricas {'activas' if fcs.METRICAS_ACTIVAS else 'desactivadas'}.")
+            print("1. Activar / desactivar  2. Ver  3. Reiniciar  4. Perfilar lectura completa  "
+                  "5. Perfilar estadísticas")
+            accion = input("Opción: ").strip()
+            if accion == "1":
+                fcs.activar_metricas(not fcs.METRICAS_ACTIVAS)
+                print(f"Métricas {'activadas' if fcs.METRICAS_ACTIVAS else 'desactivadas'}.")
+            elif accion == "2":
+                metricas = fcs.obtener_metricas()
+                if not metricas["funciones"] and not metricas["contadores"]:
+                    print("Todavía no hay métricas (actívelas y use el menú).")
+                for nombre, datos in sorted(metricas["funciones"].items(), key=lambda x: -x[1]["segundos"]):
+                    print(f"{nombre:<30} {datos['llamadas']:6d} llamadas  {datos['segundos']:9.4f} s  "
+                          f"(máx. {datos['maximo']:.4f} s)")
+                for nombre, cantidad in sorted(metricas["contadores"].items()):
+                    print(f"{nombre:<30} {cantidad}")
+            elif accion == "3":
+                fcs.reiniciar_metricas()
+                print("Métricas reiniciadas.")
+            elif accion == "4":
+                libros = fcs.perfilar(fcs.leer_toda_jerarquia, ROOT)
+                print(f"{len(libros)} libros leídos.")
+            elif accion == "5":
+                fcs.perfilar(fcs.estadisticas, fcs.iter_libros(ROOT))
+            else:
+                print("Opción inválida.")
+
         # ------------------- OPCIÓN 8 ------------------------
         # SALIR DEL PROGRAMA
         case "8":
+            if fcs.METRICAS_ACTIVAS:
+                fcs.guardar_metricas(METRICAS_ARCHIVO)
+                print(f"Métricas guardadas en {METRICAS_ARCHIVO}.")
             print("Saliendo del sistema de biblioteca... ")
             break
 
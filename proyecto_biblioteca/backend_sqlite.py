@@ -0,0 +1,597 @@
+# ============================================================
+# Backend SQLite - Sistema de Persistencia Jerárquica
+# ------------------------------------------------------------
+# Alternativa a la jerarquía de carpetas con un CSV por título:
+# toda la biblioteca vive en un único archivo SQLite (sqlite3 de
+# la biblioteca estándar, sin dependencias externas).
+#
+# No se usa directamente: funciones_jerarquia delega acá cuando
+# `root` termina en .db / .sqlite / .sqlite3, por ejemplo
+#     fcs.alta_libro("biblioteca.db", "Ficción", "Tolkien", ...)
+# Cada función tiene el mismo nombre, parámetros y retorno que su
+# versión de CSV (ver fcs.FUNCIONES_BACKEND).
+#
+# Migrar entre backends (importar / exportar):
+#     python backend_sqlite.py ./biblioteca biblioteca.db
+#     python backend_sqlite.py biblioteca.db ./biblioteca_exportada
+# ============================================================
+import argparse
+import os
+import sqlite3
+import time
+import uuid
+from contextlib import closing
+
+import funciones_jerarquia as fcs
+
+# Tabla única. Las columnas *_clave guardan el texto en minúsculas (str.lower, igual
+# que la versión CSV) para comparar sin distinguir mayúsculas usando los índices.
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS libros (
+    codigo_libro TEXT PRIMARY KEY,
+    titulo TEXT NOT NULL,
+    autor TEXT NOT NULL,
+    genero TEXT NOT NULL,
+    precio REAL,
+    anio INTEGER,
+    titulo_clave TEXT NOT NULL,
+    autor_clave TEXT NOT NULL,
+    genero_clave TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_jerarquia ON libros (genero_clave, autor_clave, titulo_clave);
+CREATE INDEX IF NOT EXISTS ix_autor ON libros (autor_clave);
+CREATE INDEX IF NOT EXISTS ix_titulo ON libros (titulo_clave);
+CREATE INDEX IF NOT EXISTS ix_precio ON libros (precio);
+CREATE INDEX IF NOT EXISTS ix_anio ON libros (anio);
+CREATE TABLE IF NOT EXISTS trigramas (
+    trigrama TEXT NOT NULL,
+    campo TEXT NOT NULL,
+    clave TEXT NOT NULL,
+    PRIMARY KEY (trigrama, campo, clave)
+) WITHOUT ROWID;
+"""
+# trigramas: índice de búsqueda, igual al de .indices/trigramas de la versión CSV
+# (ver fcs._trigramas_termino). Una fila por trigrama de cada título y autor distinto
+# (clave = la columna *_clave); las listas de un trigrama salen de un rango de la
+# clave primaria y buscar_libros las interseca con GROUP BY ... HAVING.
+
+COLUMNAS = ", ".join(fcs.REQUIRED_FIELDS)
+
+# Columna SQL que se compara para cada campo de las consultas
+COLUMNA_CONSULTA = {
+    "codigo_libro": "codigo_libro",
+    "titulo": "titulo_clave",
+    "autor": "autor_clave",
+    "genero": "genero_clave",
+    "precio": "precio",
+    "anio": "anio",
+}
+OPERADORES_SQL = {"=": "=", "<": "<", "<=": "<=", ">": ">", ">=": ">="}
+
+# Máximo de parámetros por sentencia (límite de SQLite en versiones viejas: 999)
+TAM_BLOQUE_IN = 500
+
+
+# Bases (ruta absoluta) a las que este proceso ya les aplicó ESQUEMA
+_BASES_INICIALIZADAS = set()
+
+
+def _conectar(root):
+    """
+    Abre la base `root` (la crea con su esquema si no existe).
+    El esquema (y el modo WAL, que queda guardado en el archivo) se aplica solo la
+    primera vez que el proceso abre cada base, o si el archivo ya no está.
+    synchronous=NORMAL: cada transacción confirmada sobrevive a un corte del
+    programa. Con varios procesos escribiendo, cada uno espera (hasta 60 s) a que
+    se libere la base.
+    """
+    ruta = os.path.abspath(root)
+    nueva = ruta not in _BASES_INICIALIZADAS or not os.path.exists(ruta)
+    conexion = sqlite3.connect(root, timeout=60)
+    conexion.execute("PRAGMA synchronous=NORMAL")
+    if nueva:
+        conexion.execute("PRAGMA journal_mode=WAL")
+        conexion.executescript(ESQUEMA)
+        _migrar_trigramas(conexion)
+        _BASES_INICIALIZADAS.add(ruta)
+    return conexion
+
+
+def _migrar_trigramas(conexion):
+    """Bases creadas antes de la tabla trigramas: la llena una vez con los libros que ya tienen."""
+    vacia = "SELECT NOT EXISTS (SELECT 1 FROM trigramas) AND EXISTS (SELECT 1 FROM libros)"
+    if not conexion.execute(vacia).fetchone()[0]:
+        return
+    with conexion:
+        conexion.execute("BEGIN IMMEDIATE")
+        if conexion.execute(vacia).fetchone()[0]:  # otro proceso pudo llenarla mientras esperábamos
+            _llenar_trigramas(conexion)
+
+
+def _terminos_de(filas_sql):
+    """(campo, clave) de búsqueda de filas con el formato de _fila_sql."""
+    return {termino for fila in filas_sql for termino in (("titulo", fila[6]), ("autor", fila[7]))}
+
+
+def _indexar_terminos(conexion, terminos):
+    """
+    Agrega los trigramas de los términos (campo, clave); los que ya estaban se ignoran.
+    Se insertan en el orden de la clave primaria: en un lote grande SQLite recorre
+    el árbol de la tabla de punta a punta en lugar de saltar por todo el archivo.
+    """
+    conexion.executemany("INSERT OR IGNORE INTO trigramas (trigrama, campo, clave) VALUES (?, ?, ?)",
+                         sorted([(trigrama, campo, clave) for campo, clave in terminos
+                                 for trigrama in fcs._trigramas_termino(clave)], key=lambda fila: fila[0]))
+
+
+def _desindexar_huerfanos(conexion, terminos):
+    """Quita los trigramas de los términos (campo, clave) que ya no tiene ningún libro."""
+    huerfanos = [(campo, clave) for campo, clave in terminos
+                 if conexion.execute(f"SELECT 1 FROM libros WHERE {COLUMNA_CONSULTA[campo]} = ? LIMIT 1",
+                                     (clave,)).fetchone() is None]
+    conexion.executemany("DELETE FROM trigramas WHERE trigrama = ? AND campo = ? AND clave = ?",
+                         ((trigrama, campo, clave) for campo, clave in huerfanos
+                          for trigrama in fcs._trigramas_termino(clave)))
+
+
+def _llenar_trigramas(conexion):
+    """Vacía y vuelve a armar la tabla trigramas a partir de la tabla libros."""
+    conexion.execute("DELETE FROM trigramas")
+    _indexar_terminos(conexion, _terminos_existentes(conexion))
+
+
+def _terminos_existentes(conexion):
+    """Todos los (campo, clave) de búsqueda de la tabla libros (salen de ix_titulo / ix_autor)."""
+    return [(campo, clave) for campo in fcs.CAMPOS_BUSQUEDA
+            for (clave,) in conexion.execute(f"SELECT DISTINCT {COLUMNA_CONSULTA[campo]} FROM libros")]
+
+
+def _fila_sql(fila):
+    """Fila en el orden de REQUIRED_FIELDS (strings) -> parámetros del INSERT."""
+    codigo, titulo, autor, genero, precio, anio = fila
+    return (codigo, titulo, autor, genero, fcs._a_float(precio), fcs._a_int(anio),
+            titulo.lower(), autor.lower(), genero.lower())
+
+
+def _a_libro(root, fila):
+    """Fila de la tabla -> diccionario igual a los de leer_toda_jerarquia (valores en texto)."""
+    libro = dict(zip(fcs.REQUIRED_FIELDS, (fcs._texto_csv(v) for v in fila)))
+    libro["_origen"] = root
+    return libro
+
+
+_INSERTAR = (f"INSERT OR REPLACE INTO libros ({COLUMNAS}, titulo_clave, autor_clave, genero_clave) "
+             f"VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)")
+
+
+# --------------------------- INICIALIZACIÓN / ALTA --------------------
+def inicializar_root(root):
+    """Crea el archivo SQLite (y su carpeta) con la tabla e índices si no existen."""
+    carpeta = os.path.dirname(os.path.abspath(root))
+    os.makedirs(carpeta, exist_ok=True)
+    with closing(_conectar(root)):
+        pass
+
+
+def alta_libro(root, genero, autor, titulo, precio, anio):
+    """Alta de un libro (una fila nueva con un UUID). Mismos mensajes y retorno que la versión CSV."""
+    fila = [str(uuid.uuid4()), titulo, autor, genero, fcs._texto_csv(precio), fcs._texto_csv(anio)]
+    try:
+        parametros = _fila_sql(fila)
+        with closing(_conectar(root)) as conexion, conexion:
+            conexion.execute(_INSERTAR, parametros)
+            _indexar_terminos(conexion, _terminos_de([parametros]))
+        print(" Libro agregado correctamente.")
+        return fila[0]
+    except Exception as e:
+        print(f"Error al guardar el libro: {e}")
+        return None
+
+
+def alta_libros_bulk(root, origen, lote=100000, conservar_codigos=False):
+    """
+    Alta masiva: valida igual que la versión CSV y escribe `lote` filas por
+    transacción con executemany. Un codigo_libro repetido reemplaza al anterior.
+    Retorna el mismo resumen (archivos = 1 si se escribió algo, carpetas = 0).
+    """
+    inicio = time.perf_counter()
+    resumen = {"libros": 0, "archivos": 0, "carpetas": 0, "errores": []}
+    pendientes = []
+    with closing(_conectar(root)) as conexion:
+        def volcar():
+            with conexion:
+                reemplazados = set()
+                if conservar_codigos:
+                    # Un código repetido reemplaza al libro anterior: sus términos pueden quedar sin libros
+                    reemplazados = _terminos_de(_leer_por_codigo(conexion, root, [f[0] for f in pendientes],
+                                                                 sql=True).values())
+                conexion.executemany(_INSERTAR, pendientes)
+                _indexar_terminos(conexion, _terminos_de(pendientes))
+                _desindexar_huerfanos(conexion, reemplazados)
+            resumen["libros"] += len(pendientes)
+            pendientes.clear()
+
+        for numero, registro in enumerate(fcs._registros_de(origen), start=1):
+            try:
+                pendientes.append(_fila_sql(fcs._validar_registro(registro, conservar_codigos)))
+            except (ValueError, TypeError, AttributeError) as e:
+                resumen["errores"].append((numero, str(e)))
+                continue
+            if len(pendientes) >= lote:
+                volcar()
+        volcar()
+
+    resumen["archivos"] = 1 if resumen["libros"] else 0
+    resumen["segundos"] = time.perf_counter() - inicio
+    resumen["filas_por_segundo"] = resumen["libros"] / resumen["segundos"] if resumen["segundos"] else 0.0
+    return resumen
+
+
+# --------------------------- LECTURA --------------------------------
+def leer_toda_jerarquia(root, motor=None, trabajadores=None, usar_manifiesto=True):
+    """Todos los libros en orden de alta. motor/trabajadores/usar_manifiesto no aplican acá."""
+    return list(iter_libros(root))
+
+
+def iter_libros(root, genero=None, autor=None, titulo=None):
+    """Generador de libros; los filtros (case-insensitive) usan el índice ix_jerarquia."""
+    condiciones, parametros = [], []
+    for campo, valor in (("genero", genero), ("autor", autor), ("titulo", titulo)):
+        if valor:
+            condiciones.append(f"{campo}_clave = ?")
+            parametros.append(valor.lower())
+    donde = f" WHERE {' AND '.join(condiciones)}" if condiciones else ""
+    with closing(_conectar(root)) as conexion:
+        for fila in conexion.execute(f"SELECT {COLUMNAS} FROM libros{donde} ORDER BY rowid", parametros):
+            yield _a_libro(root, fila)
+
+
+def cargar_catalogo_compacto(root, motor=None, trabajadores=None):
+    """Catálogo compacto leído directamente de la tabla (sin diccionarios intermedios)."""
+    catalogo = fcs.CatalogoCompacto()
+    with closing(_conectar(root)) as conexion:
+        for fila in conexion.execute(f"SELECT {COLUMNAS} FROM libros ORDER BY rowid"):
+            catalogo.agregar(*fila, root)
+    return catalogo
+
+
+def codigos_por_titulo(root, titulo):
+    """Códigos cuyo título coincide exactamente (case-insensitive), en orden de alta."""
+    with closing(_conectar(root)) as conexion:
+        filas = conexion.execute("SELECT codigo_libro FROM libros WHERE titulo_clave = ? ORDER BY rowid",
+                                 (titulo.strip().lower(),))
+        return [c for (c,) in filas]
+
+
+def codigos_por_titulo_parcial(root, texto):
+    """Códigos cuyo título contiene `texto` (sin distinguir mayúsculas ni tildes, como en CSV)."""
+    return [r["codigo_libro"] for r in buscar_libros(root, texto, ("titulo",))]
+
+
+def _candidatos_trigramas(conexion, consulta, campos, difuso, similitud_minima):
+    """
+    Igual que fcs._candidatos_trigramas, con la tabla trigramas: {(campo, clave): cota}.
+    - Subcadena: los términos que tienen todos los trigramas de la consulta (la
+    intersección de sus listas, resuelta por SQLite con GROUP BY ... HAVING).
+    - Difuso: los que tienen al menos similitud_minima de sus trigramas por palabra.
+    """
+    candidatos = {}
+    subcadena = sorted(fcs._trigramas_subcadena(consulta))
+    buscados = sorted(fcs._trigramas_palabras(consulta))
+    for campo in campos:
+        if subcadena:
+            marcas = ", ".join("?" * len(subcadena))
+            filas = conexion.execute(f"SELECT clave FROM trigramas WHERE trigrama IN ({marcas}) AND campo = ? "
+                                     "GROUP BY clave HAVING COUNT(*) = ?", [*subcadena, campo, len(subcadena)])
+            candidatos.update(((campo, clave), 1.0) for (clave,) in filas)
+        else:
+            # Consulta de una o dos letras: no tiene trigramas propios, se recorren los términos
+            filas = conexion.execute(f"SELECT DISTINCT {COLUMNA_CONSULTA[campo]} FROM libros")
+            candidatos.update(((campo, clave), 1.0) for (clave,) in filas if consulta in fcs._plegar(clave))
+        if difuso:
+            marcas = ", ".join("?" * len(buscados))
+            filas = conexion.execute(f"SELECT clave, COUNT(*) FROM trigramas WHERE trigrama IN ({marcas}) "
+                                     "AND campo = ? GROUP BY clave HAVING COUNT(*) >= ?",
+                                     [*buscados, campo, similitud_minima * len(buscados)])
+            for clave, n in filas:
+                candidatos.setdefault((campo, clave), min(1.0, n / len(buscados)))
+    return candidatos
+
+
+def buscar_libros(root, texto, campos=fcs.CAMPOS_BUSQUEDA, difuso=False, similitud_minima=fcs.SIMILITUD_MINIMA,
+                  limite=None):
+    """
+    Misma búsqueda que en CSV (subcadena y difusa, ver fcs.buscar_libros): los
+    candidatos salen de la tabla trigramas y se confirman con fcs._rankear_terminos;
+    los libros de cada término, de los índices ix_titulo / ix_autor.
+    """
+    campos = tuple(campos)
+    for campo in campos:
+        if campo not in fcs.CAMPOS_BUSQUEDA:
+            raise ValueError(f"Solo se puede buscar por {', '.join(fcs.CAMPOS_BUSQUEDA)}: {campo}")
+    consulta = fcs._plegar(texto)
+    if not consulta:
+        return []
+    resultados = []
+    vistos = set()
+    with closing(_conectar(root)) as conexion:
+        candidatos = _candidatos_trigramas(conexion, consulta, campos, difuso, similitud_minima)
+        for similitud, campo, clave in fcs._rankear_terminos(texto, candidatos, difuso, similitud_minima, limite):
+            filas = conexion.execute(f"SELECT codigo_libro FROM libros WHERE {COLUMNA_CONSULTA[campo]} = ? "
+                                     "ORDER BY rowid", (clave,))
+            for (codigo,) in filas:
+                if codigo not in vistos:
+                    vistos.add(codigo)
+                    resultados.append({"codigo_libro": codigo, "campo": campo, "termino": clave,
+                                       "similitud": similitud})
+            if limite is not None and len(resultados) >= limite:
+                break
+    return resultados[:limite]
+
+
+def _leer_por_codigo(conexion, root, codigos, sql=False):
+    """
+    {codigo: libro} de los `codigos` que existen (con su "_version", como en la
+    versión CSV). Con sql=True, las filas tal cual están en la tabla (como _fila_sql).
+    """
+    codigos = list(codigos)
+    columnas = f"{COLUMNAS}, titulo_clave, autor_clave, genero_clave" if sql else COLUMNAS
+    encontrados = {}
+    for i in range(0, len(codigos), TAM_BLOQUE_IN):
+        bloque = codigos[i:i + TAM_BLOQUE_IN]
+        marcas = ", ".join("?" * len(bloque))
+        for fila in conexion.execute(f"SELECT {columnas} FROM libros WHERE codigo_libro IN ({marcas})",
+                                     bloque):
+            if sql:
+                encontrados[fila[0]] = fila
+                continue
+            libro = _a_libro(root, fila)
+            libro["_version"] = fcs._version_fila(libro)
+            encontrados[fila[0]] = libro
+    return encontrados
+
+
+def leer_libros_por_codigo(root, codigos):
+    """Libros de la lista `codigos` (por clave primaria), en el mismo orden."""
+    codigos = list(codigos)
+    with closing(_conectar(root)) as conexion:
+        encontrados = _leer_por_codigo(conexion, root, codigos)
+    return [encontrados[c] for c in codigos if c in encontrados]
+
+
+# --------------------------- MODIFICACIÓN / BAJA ---------------------
+def aplicar_lote(root, operaciones, versiones=None):
+    """
+    Aplica todas las modificaciones y bajas en una sola transacción de SQLite
+    (todo o nada). Retorna el mismo resumen que la versión CSV.
+    - versiones: igual que en la versión CSV; se comparan dentro de la misma
+    transacción (BEGIN IMMEDIATE), así nadie cambia el libro entre la
+    comparación y la escritura.
+    """
+    por_codigo = fcs._consolidar_operaciones(operaciones)
+    versiones = {c: v for c, v in (versiones or {}).items() if v is not None and c in por_codigo}
+    resumen = {"actualizados": 0, "eliminados": 0, "archivos": 0, "no_encontrados": [], "conflictos": []}
+    with closing(_conectar(root)) as conexion, conexion:
+        if versiones:
+            conexion.execute("BEGIN IMMEDIATE")
+            actuales = _leer_por_codigo(conexion, root, versiones)
+            for codigo, version in versiones.items():
+                if codigo in actuales and actuales[codigo]["_version"] != version:
+                    resumen["conflictos"].append(codigo)
+                    del por_codigo[codigo]
+        eliminados = [codigo for codigo, campos in por_codigo.items() if campos is None]
+        terminos = _terminos_de(_leer_por_codigo(conexion, root, eliminados, sql=True).values())
+        for codigo, campos in por_codigo.items():
+            if campos is None:
+                cambiadas = conexion.execute("DELETE FROM libros WHERE codigo_libro = ?", (codigo,)).rowcount
+                clave = "eliminados"
+            elif campos:
+                asignaciones = ", ".join(f"{c} = ?" for c in campos)
+                valores = [fcs._a_float(v) if c == "precio" else fcs._a_int(v) for c, v in campos.items()]
+                cambiadas = conexion.execute(f"UPDATE libros SET {asignaciones} WHERE codigo_libro = ?",
+                                             [*valores, codigo]).rowcount
+                clave = "actualizados"
+            else:
+                # Sin columnas para cambiar: solo cuenta si el libro existe
+                cambiadas = conexion.execute("SELECT 1 FROM libros WHERE codigo_libro = ?",
+                                             (codigo,)).fetchone() is not None
+                clave = "actualizados"
+            if cambiadas:
+                resumen[clave] += 1
+            else:
+                resumen["no_encontrados"].append(codigo)
+        _desindexar_huerfanos(conexion, terminos)
+    resumen["archivos"] = 1 if resumen["actualizados"] or resumen["eliminados"] else 0
+    return resumen
+
+
+# --------------------------- MANTENIMIENTO --------------------------
+def limpiar_temporales(root):
+    """SQLite no deja temporales sueltos (su propio journal/WAL se recupera solo)."""
+    return []
+
+
+def verificar_indices(root, reparar=False):
+    """
+    Verifica la base: PRAGMA integrity_check (clave "integridad"), que las
+    columnas *_clave coincidan con el texto en minúsculas (clave "titulos") y la
+    tabla trigramas (clave "trigramas", términos "campo:clave" mal registrados).
+    Con reparar=True, si hay diferencias reconstruye los índices.
+    """
+    problemas = {"faltantes": [], "sobrantes": [], "ruta_incorrecta": [], "titulos": [], "integridad": [],
+                 "trigramas": []}
+    with closing(_conectar(root)) as conexion:
+        problemas["integridad"] = [m for (m,) in conexion.execute("PRAGMA integrity_check") if m != "ok"]
+        filas = conexion.execute("SELECT codigo_libro, titulo, autor, genero, "
+                                 "titulo_clave, autor_clave, genero_clave FROM libros")
+        for codigo, titulo, autor, genero, *claves in filas:
+            if claves != [titulo.lower(), autor.lower(), genero.lower()]:
+                problemas["titulos"].append(codigo)
+        esperados = {(trigrama, campo, clave) for campo, clave in _terminos_existentes(conexion)
+                     for trigrama in fcs._trigramas_termino(clave)}
+        actuales = set(conexion.execute("SELECT trigrama, campo, clave FROM trigramas"))
+        problemas["trigramas"] = sorted({f"{campo}:{clave}" for _, campo, clave in esperados ^ actuales})
+    if reparar and any(problemas.values()):
+        reconstruir_indices(root)
+    return problemas
+
+
+def reconstruir_indices(root):
+    """
+    Recalcula las columnas *_clave, vuelve a armar la tabla trigramas y reconstruye
+    los índices (REINDEX). Retorna la cantidad de libros.
+    """
+    with closing(_conectar(root)) as conexion, conexion:
+        filas = conexion.execute("SELECT codigo_libro, titulo, autor, genero FROM libros").fetchall()
+        conexion.executemany("UPDATE libros SET titulo_clave = ?, autor_clave = ?, genero_clave = ? "
+                             "WHERE codigo_libro = ?",
+                             [(t.lower(), a.lower(), g.lower(), c) for c, t, a, g in filas])
+        _llenar_trigramas(conexion)
+        conexion.execute("REINDEX")
+    return len(filas)
+
+
+def _medir_base(root):
+    """Misma forma que fcs.medir_arbol, para el archivo de la base y sus -wal/-shm."""
+    medida = {"csv": 0, "archivos": 0, "carpetas": 0, "bytes": 0, "bytes_en_disco": 0}
+    for ruta in (root, root + "-wal", root + "-shm"):
+        try:
+            st = os.stat(ruta)
+        except OSError:
+            continue
+        medida["archivos"] += 1
+        medida["bytes"] += st.st_size
+        medida["bytes_en_disco"] += getattr(st, "st_blocks", 0) * 512 or st.st_size
+    return medida
+
+
+def compactar_biblioteca(root, fragmentar=None):
+    """
+    VACUUM: reescribe la base sin páginas libres (las que dejan las bajas) y
+    vacía el WAL. No hay archivos chicos que reagrupar: `fragmentar` no aplica.
+    Retorna el mismo resumen que la versión de carpetas.
+    """
+    if fragmentar is not None and fragmentar not in fcs.NIVELES_FRAGMENTACION:
+        raise ValueError(f"fragmentar debe ser uno de {fcs.NIVELES_FRAGMENTACION} (o None).")
+    inicio = time.perf_counter()
+    resumen = {"antes": _medir_base(root), "temporales": 0, "csv_vacios": 0, "csv_reagrupados": 0,
+               "fragmentos": 0, "carpetas_borradas": 0}
+    with closing(_conectar(root)) as conexion:
+        conexion.execute("VACUUM")
+        conexion.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    resumen["despues"] = _medir_base(root)
+    resumen["segundos"] = time.perf_counter() - inicio
+    return resumen
+
+
+# --------------------------- ESTADÍSTICAS ---------------------------
+def _grupos_sql(conexion, columna):
+    """
+    Grupos con la misma forma que los materializados de la versión CSV (ver
+    fcs._grupo_vacio), calculados con GROUP BY sobre `columna` (None = global, clave "").
+    """
+    clave = columna or "''"
+    grupos = {}
+    for valor, total, cantidad, suma, media, minimo, maximo in conexion.execute(
+            f"SELECT {clave}, COUNT(*), COUNT(precio), TOTAL(precio), AVG(precio), "
+            f"MIN(precio), MAX(precio) FROM libros GROUP BY 1"):
+        grupo = grupos[valor] = fcs._grupo_vacio()
+        grupo.update(total=total, cantidad=cantidad, suma=suma, media=media or 0.0,
+                     minimo=minimo, maximo=maximo)
+    # M2 en una segunda pasada con la media ya calculada (sin restar sumas de cuadrados)
+    if columna:
+        desvios = (f"SELECT l.{columna}, TOTAL((l.precio - m.media) * (l.precio - m.media)) "
+                   f"FROM libros AS l JOIN (SELECT {columna} AS valor, AVG(precio) AS media "
+                   f"FROM libros GROUP BY 1) AS m ON m.valor = l.{columna} GROUP BY 1")
+    else:
+        desvios = ("SELECT '', TOTAL((precio - m.media) * (precio - m.media)) "
+                   "FROM libros, (SELECT AVG(precio) AS media FROM libros) AS m")
+    for valor, m2 in conexion.execute(desvios):
+        if valor in grupos:
+            grupos[valor]["m2"] = m2
+    for valor, anio, n in conexion.execute(f"SELECT {clave}, anio, COUNT(*) FROM libros GROUP BY 1, 2"):
+        grupos[valor]["anios"][str(fcs._a_int(anio))] = n
+    for valor, barra, n in conexion.execute(f"SELECT {clave}, cubeta_precio(precio), COUNT(*) FROM libros "
+                                            f"WHERE precio IS NOT NULL GROUP BY 1, 2"):
+        grupos[valor]["precios"][barra] = n
+    return grupos
+
+
+def agregados_biblioteca(root, agrupar_por=None):
+    """
+    Mismo resultado que la versión CSV, calculado en la base con GROUP BY (sin
+    archivos materializados: SQLite agrupa sin traer los libros a Python).
+    """
+    if agrupar_por not in fcs.AGRUPACIONES_MATERIALIZADAS:
+        raise ValueError(f"agrupar_por debe ser uno de {fcs.AGRUPACIONES_MATERIALIZADAS}.")
+    with closing(_conectar(root)) as conexion:
+        conexion.create_function("cubeta_precio", 1, fcs._cubeta_precio, deterministic=True)
+        agregados = {"global": _grupos_sql(conexion, None)}
+        if agrupar_por:
+            agregados[agrupar_por] = _grupos_sql(conexion, agrupar_por)
+    return fcs._resultado_agregados(agregados, agrupar_por)
+
+
+def verificar_agregados(root, reparar=False):
+    """No hay agregados guardados que puedan quedar viejos: siempre están al día."""
+    return []
+
+
+def reconstruir_agregados(root):
+    """Nada que reconstruir (ver agregados_biblioteca). Retorna la cantidad de libros."""
+    with closing(_conectar(root)) as conexion:
+        return conexion.execute("SELECT COUNT(*) FROM libros").fetchone()[0]
+
+
+# --------------------------- CONSULTAS ------------------------------
+def _sql_condicion(condicion, parametros):
+    """Traduce una condición de MotorConsultas a SQL (agrega los valores a `parametros`)."""
+    tipo = condicion[0]
+    if tipo in ("y", "o"):
+        union = " AND " if tipo == "y" else " OR "
+        return "(" + union.join(_sql_condicion(c, parametros) for c in condicion[1:]) + ")"
+    campo, operador = condicion[0], condicion[1]
+    if campo not in COLUMNA_CONSULTA:
+        raise ValueError(f"Columna desconocida: {campo}")
+    columna = COLUMNA_CONSULTA[campo]
+    if campo in fcs.CAMPOS_NUMERICOS:
+        valores = [fcs._a_float(v) for v in condicion[2:]]
+        if any(v != v for v in valores):
+            # NaN: en SQL no coincidiría con nada, en el motor con todo; mejor avisar
+            raise ValueError(f"{campo} necesita un valor numérico: {condicion!r}")
+    else:
+        valores = [str(v).lower() for v in condicion[2:]]
+    if operador == "entre":
+        parametros.extend(valores)
+        return f"{columna} BETWEEN ? AND ?"
+    if operador == "prefijo":
+        # Rango [prefijo, prefijo + máximo carácter): usa el índice de la columna
+        parametros.extend([valores[0], valores[0] + "\U0010ffff"])
+        return f"({columna} >= ? AND {columna} < ?)"
+    parametros.append(valores[0])
+    if operador == "!=":
+        return f"({columna} IS NULL OR {columna} != ?)"
+    return f"{columna} {OPERADORES_SQL[operador]} ?"
+
+
+def consultar_biblioteca(root, consulta):
+    """Consulta compuesta (texto o tupla, ver fcs.parsear_consulta) resuelta por SQLite."""
+    condicion = fcs.parsear_consulta(consulta) if isinstance(consulta, str) else consulta
+    fcs._validar_condicion(condicion)
+    parametros = []
+    donde = _sql_condicion(condicion, parametros)
+    with closing(_conectar(root)) as conexion:
+        filas = conexion.execute(f"SELECT {COLUMNAS} FROM libros WHERE {donde} ORDER BY rowid", parametros)
+        return [_a_libro(root, fila) for fila in filas]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Copia una biblioteca entre backends (carpeta de CSV <-> archivo .db/.sqlite).")
+    parser.add_argument("origen")
+    parser.add_argument("destino")
+    parser.add_argument("--lote", type=int, default=100000)
+    args = parser.parse_args()
+    resumen = fcs.copiar_biblioteca(args.origen, args.destino, args.lote)
+    print(f"Copiados {resumen['libros']} libros de {args.origen} a {args.destino} "
+          f"({resumen['filas_por_segundo']:.0f} filas/s, {len(resumen['errores'])} rechazados).")
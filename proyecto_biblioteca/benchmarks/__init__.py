@@ -0,0 +1,8 @@
+# ============================================================
+# Benchmarks del Sistema de Persistencia Jerárquica
+# ------------------------------------------------------------
+# Se ejecutan desde la carpeta proyecto_biblioteca/, por ejemplo:
+#     python -m benchmarks.lectura --csvs 100000
+# Cada módulo genera (o reutiliza) una biblioteca sintética con
+# semilla fija y mide las funciones de funciones_jerarquia.py.
+# ============================================================
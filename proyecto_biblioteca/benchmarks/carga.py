@@ -0,0 +1,237 @@
+"""
+Prueba de carga del servicio HTTP/JSON (servidor.py): pedidos por segundo y latencias.
+Uso (desde proyecto_biblioteca/):
+    python -m benchmarks.carga --iniciar ./bench_suite/biblioteca_100000_10 --clientes 64 --duracion 20
+    python -m benchmarks.carga --puerto 8080 --clientes 16 --escrituras 0.05
+- --iniciar ROOT levanta servidor.py sobre ROOT en un subproceso (y lo cierra al
+  terminar); sin esa opción se usa un servicio ya levantado en --host/--puerto.
+- Cada cliente es una corrutina con su propia conexión persistente (keep-alive)
+  que manda pedidos sin pausa hasta cumplir --duracion segundos.
+- Mezcla de lecturas: listado paginado, un libro por código, top-10 por precio,
+  estadísticas por género y filtros (simple y compuesto). Con --escrituras F,
+  esa fracción de los pedidos son PATCH que vuelven a escribir el mismo precio
+  del libro (no cambian los datos, pero invalidan el caché del servicio).
+- Informa pedidos/s y latencias (p50, p90, p99, máximo) en total y por tipo de
+  pedido; con --salida guarda lo mismo en JSON. Sale con código 1 si hubo errores.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+import urllib.parse
+
+
+class ClienteHTTP:
+    """Cliente HTTP/1.1 mínimo con una conexión persistente (solo cuerpos JSON)."""
+
+    def __init__(self, host, puerto):
+        self.host = host
+        self.puerto = puerto
+        self.reader = self.writer = None
+
+    async def pedir(self, metodo, ruta, datos=None):
+        """Manda un pedido y retorna (estado, datos de la respuesta)."""
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection(self.host, self.puerto)
+        cuerpo = json.dumps(datos).encode("utf-8") if datos is not None else b""
+        self.writer.write((f"{metodo} {ruta} HTTP/1.1\r\nHost: {self.host}\r\n"
+                           f"Content-Type: application/json\r\nContent-Length: {len(cuerpo)}\r\n\r\n")
+                          .encode("latin-1") + cuerpo)
+        await self.writer.drain()
+        estado = int((await self.reader.readline()).split()[1])
+        largo, cerrar = 0, False
+        while True:
+            linea = await self.reader.readline()
+            if linea in (b"\r\n", b"\n", b""):
+                break
+            nombre, _, valor = linea.decode("latin-1").partition(":")
+            nombre = nombre.strip().lower()
+            if nombre == "content-length":
+                largo = int(valor)
+            elif nombre == "connection" and valor.strip().lower() == "close":
+                cerrar = True
+        respuesta = json.loads(await self.reader.readexactly(largo)) if largo else None
+        if cerrar:
+            self.cerrar()
+        return estado, respuesta
+
+    def cerrar(self):
+        if self.writer is not None:
+            self.writer.close()
+        self.reader = self.writer = None
+
+
+def percentil(ordenados, p):
+    """Percentil `p` (0-100) de una lista ya ordenada (el más cercano por rango)."""
+    if not ordenados:
+        return None
+    return ordenados[min(len(ordenados) - 1, max(0, round(p / 100 * len(ordenados)) - 1))]
+
+
+def resumir(latencias, segundos):
+    """Pedidos/s y latencias en milisegundos de una lista de duraciones (segundos)."""
+    ordenadas = sorted(latencias)
+    ms = lambda x: None if x is None else round(x * 1000, 3)
+    return {
+        "pedidos": len(ordenadas),
+        "pedidos_por_segundo": round(len(ordenadas) / segundos, 1) if segundos else 0.0,
+        "p50_ms": ms(percentil(ordenadas, 50)),
+        "p90_ms": ms(percentil(ordenadas, 90)),
+        "p99_ms": ms(percentil(ordenadas, 99)),
+        "max_ms": ms(ordenadas[-1] if ordenadas else None),
+    }
+
+
+async def preparar_pedidos(cliente):
+    """Arma la mezcla de pedidos a partir de una muestra de la biblioteca servida."""
+    estado, datos = await cliente.pedir("GET", "/libros?limite=1000")
+    if estado != 200 or not datos["libros"]:
+        raise SystemExit(f"La biblioteca servida está vacía o no responde (estado {estado}).")
+    muestra = datos["libros"]
+    generos = sorted({l["genero"] for l in muestra})
+    autores = sorted({l["autor"] for l in muestra})
+    q = urllib.parse.quote
+    lecturas = {
+        "listar": lambda rnd: ("GET", f"/libros?desde={rnd.randrange(len(muestra))}&limite=20", None),
+        "leer": lambda rnd: ("GET", f"/libros/{q(rnd.choice(muestra)['codigo_libro'])}", None),
+        "ordenar": lambda rnd: ("GET", "/ordenar?clave=precio&limite=10", None),
+        "estadisticas": lambda rnd: ("GET", "/estadisticas?agrupar=genero", None),
+        "filtrar": lambda rnd: ("GET", f"/filtrar?atributo=autor&valor={q(rnd.choice(autores))}", None),
+        "consultar": lambda rnd: ("GET", "/filtrar?consulta=" + q(
+            f"precio=1000..5000 & anio>=1990 & genero={rnd.choice(generos)}"), None),
+    }
+
+    def escritura(rnd):
+        libro = rnd.choice(muestra)
+        return "PATCH", f"/libros/{q(libro['codigo_libro'])}", {"precio": libro["precio"]}
+
+    return lecturas, escritura
+
+
+async def cliente_carga(host, puerto, lecturas, escritura, fraccion_escrituras, fin, semilla, resultados):
+    """Manda pedidos hasta `fin` (time.perf_counter) y anota (tipo, duración, estado)."""
+    rnd = random.Random(semilla)
+    cliente = ClienteHTTP(host, puerto)
+    tipos = list(lecturas)
+    try:
+        while time.perf_counter() < fin:
+            if fraccion_escrituras and rnd.random() < fraccion_escrituras:
+                tipo, (metodo, ruta, datos) = "actualizar", escritura(rnd)
+            else:
+                tipo = rnd.choice(tipos)
+                metodo, ruta, datos = lecturas[tipo](rnd)
+            inicio = time.perf_counter()
+            try:
+                estado, _ = await cliente.pedir(metodo, ruta, datos)
+            except (OSError, asyncio.IncompleteReadError, ValueError, IndexError):
+                estado = None
+                cliente.cerrar()
+            resultados.append((tipo, time.perf_counter() - inicio, estado))
+    finally:
+        cliente.cerrar()
+
+
+async def esperar_servicio(host, puerto, espera=120):
+    """Espera hasta `espera` segundos a que /salud responda (el servicio precarga el catálogo)."""
+    limite = time.perf_counter() + espera
+    while True:
+        cliente = ClienteHTTP(host, puerto)
+        try:
+            estado, _ = await cliente.pedir("GET", "/salud")
+            if estado == 200:
+                return
+        except (OSError, asyncio.IncompleteReadError, ValueError, IndexError):
+            pass
+        finally:
+            cliente.cerrar()
+        if time.perf_counter() > limite:
+            raise SystemExit(f"El servicio en {host}:{puerto} no respondió.")
+        await asyncio.sleep(0.2)
+
+
+async def correr(args):
+    await esperar_servicio(args.host, args.puerto)
+    preparador = ClienteHTTP(args.host, args.puerto)
+    lecturas, escritura = await preparar_pedidos(preparador)
+    # Calentamiento: cada tipo de pedido una vez (arma caché y motor de consultas)
+    rnd = random.Random(0)
+    for armar in lecturas.values():
+        await preparador.pedir(*armar(rnd))
+    preparador.cerrar()
+
+    resultados = []
+    inicio = time.perf_counter()
+    fin = inicio + args.duracion
+    await asyncio.gather(*(
+        cliente_carga(args.host, args.puerto, lecturas, escritura, args.escrituras, fin, args.semilla + n,
+                      resultados)
+        for n in range(args.clientes)))
+    segundos = time.perf_counter() - inicio
+
+    por_tipo = {}
+    for tipo, duracion, estado in resultados:
+        por_tipo.setdefault(tipo, []).append(duracion)
+    errores = sum(1 for _, _, estado in resultados if estado is None or estado >= 400)
+    return {
+        "fecha": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "cpus": os.cpu_count(),
+        "clientes": args.clientes,
+        "duracion": round(segundos, 2),
+        "escrituras": args.escrituras,
+        "errores": errores,
+        "total": resumir([d for _, d, _ in resultados], segundos),
+        "por_tipo": {tipo: resumir(duraciones, segundos) for tipo, duraciones in sorted(por_tipo.items())},
+    }
+
+
+def mostrar(resultado):
+    print(f"\n{resultado['clientes']} clientes, {resultado['duracion']} s, errores: {resultado['errores']}")
+    print(f"{'pedido':<14} {'cantidad':>9} {'pedidos/s':>10} {'p50 ms':>9} {'p90 ms':>9} {'p99 ms':>9} {'máx ms':>9}")
+    filas = list(resultado["por_tipo"].items()) + [("TOTAL", resultado["total"])]
+    for tipo, r in filas:
+        print(f"{tipo:<14} {r['pedidos']:9d} {r['pedidos_por_segundo']:10.1f} {r['p50_ms']:9.2f} "
+              f"{r['p90_ms']:9.2f} {r['p99_ms']:9.2f} {r['max_ms']:9.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Prueba de carga del servicio HTTP/JSON de la biblioteca.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--puerto", type=int, default=8080)
+    parser.add_argument("--iniciar", metavar="ROOT", help="levantar servidor.py sobre ROOT durante la prueba")
+    parser.add_argument("--clientes", type=int, default=32, help="conexiones concurrentes")
+    parser.add_argument("--duracion", type=float, default=10.0, help="segundos de carga")
+    parser.add_argument("--escrituras", type=float, default=0.0,
+                        help="fracción de pedidos que son modificaciones (0.05 = 5%%)")
+    parser.add_argument("--semilla", type=int, default=1)
+    parser.add_argument("--salida", help="guardar el resultado en este JSON")
+    args = parser.parse_args()
+
+    servidor = None
+    if args.iniciar:
+        ruta = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "servidor.py")
+        servidor = subprocess.Popen([sys.executable, ruta, args.iniciar, "--host", args.host,
+                                     "--puerto", str(args.puerto)], stdout=subprocess.DEVNULL)
+    try:
+        resultado = asyncio.run(correr(args))
+    finally:
+        if servidor is not None:
+            servidor.terminate()
+            servidor.wait()
+
+    mostrar(resultado)
+    if args.salida:
+        with open(args.salida, "w", encoding="utf-8") as f:
+            f.write(json.dumps(resultado, ensure_ascii=False, indent=2))
+        print(f"Resultados guardados en {args.salida}")
+    if resultado["errores"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+Compara MotorConsultas (índices ordenados y hash en memoria) con el filtro lineal.
+Uso (desde proyecto_biblioteca/):
+    python -m benchmarks.consultas --libros 100000 --root /tmp/bench_biblioteca
+- Lineal: filtrar_libros para igualdades y un recorrido completo que evalúa la
+  condición fila por fila para las consultas compuestas.
+- Motor: tiempo de armar los índices (una vez) y de cada consulta.
+"""
+import argparse
+import contextlib
+import io
+import os
+import time
+
+import funciones_jerarquia as fcs
+from benchmarks.generador import dimensiones_para, generar_biblioteca
+
+
+def cronometrar(funcion, repeticiones=3):
+    """Devuelve (mejor tiempo en segundos, último resultado); descarta lo que imprime `funcion`."""
+    mejor, resultado = None, None
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            resultado = funcion()
+        duracion = time.perf_counter() - inicio
+        mejor = duracion if mejor is None else min(mejor, duracion)
+    return mejor, resultado
+
+
+def filtro_lineal(libros, motor, condicion):
+    """Recorre todas las filas evaluando la condición (lo que haría un filtro sin índices)."""
+    return [libros[i] for i in range(len(libros)) if motor.cumple(i, condicion)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de consultas: índices vs filtro lineal.")
+    parser.add_argument("--root", default="./bench_biblioteca")
+    parser.add_argument("--libros", type=int, default=100000)
+    parser.add_argument("--filas-por-csv", type=int, default=1)
+    parser.add_argument("--repeticiones", type=int, default=3)
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.root):
+        g, a, t = dimensiones_para(args.libros, args.filas_por_csv)
+        print(f"Generando {g * a * t * args.filas_por_csv} libros en {args.root} ...")
+        generar_biblioteca(args.root, g, a, t, args.filas_por_csv)
+
+    libros = fcs.leer_toda_jerarquia(args.root)
+    genero, autor = libros[0]["genero"], libros[-1]["autor"]
+    construccion, motor = cronometrar(lambda: fcs.MotorConsultas(libros), 1)
+    print(f"{len(libros)} libros; armado de índices: {construccion:.3f} s\n")
+
+    segundos, _ = cronometrar(lambda: fcs.filtrar_libros(libros, "genero", genero), args.repeticiones)
+    indexado, _ = cronometrar(lambda: fcs.filtrar_libros(motor, "genero", genero), args.repeticiones)
+    print(f"{'filtrar_libros genero':<55} lineal {segundos * 1000:9.2f} ms  motor {indexado * 1000:9.2f} ms")
+
+    consultas = [
+        f"autor={autor}",
+        "anio=2000",
+        "precio=1000..5000",
+        f"precio=1000..5000 & anio>=1990 & genero={genero}",
+        f"autor={autor} | precio<600",
+        "titulo^=titulo 001 & precio>19000",
+    ]
+    for texto in consultas:
+        condicion = fcs.parsear_consulta(texto)
+        lineal, esperado = cronometrar(lambda: filtro_lineal(libros, motor, condicion), args.repeticiones)
+        indexado, obtenido = cronometrar(lambda: motor.consultar(condicion), args.repeticiones)
+        estado = "ok" if obtenido == esperado else "DISTINTO"
+        print(f"{texto:<55} lineal {lineal * 1000:9.2f} ms  motor {indexado * 1000:9.2f} ms  "
+              f"x{lineal / max(indexado, 1e-9):7.1f}  {len(obtenido)} filas {estado}")
+        print(f"    plan: {motor.explicar(condicion)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+"""
+Prueba de estrés de escritores concurrentes: N procesos sobre la misma biblioteca.
+Uso (desde proyecto_biblioteca/):
+    python -m benchmarks.estres --procesos 8 --altas 200
+- Cada proceso da de alta libros de a uno (alta_libro) y en lote
+  (alta_libros_bulk con códigos propios) sobre un conjunto chico de títulos
+  compartidos, para que varios procesos escriban el mismo libros.csv a la vez.
+- Después modifica precios de sus libros (aplicar_lote y actualizar_por_codigo)
+  y elimina una parte (eliminar_por_codigo), mientras los demás siguen escribiendo.
+- Al final se verifica con una lectura completa sin manifiesto que no se perdió
+  ni se duplicó ninguna fila y que cada libro tiene el último precio escrito;
+  también el manifiesto, los índices y que no quedaron temporales.
+  Sale con código 1 si algo no coincide.
+"""
+import argparse
+import collections
+import contextlib
+import io
+import multiprocessing
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+import funciones_jerarquia as fcs
+
+GENEROS = ("Ficción", "Historia", "Ciencia")
+AUTORES = ("Autor A", "Autor B")
+TITULOS = ("Titulo 1", "Titulo 2", "Titulo 3")
+
+
+def trabajador(root, numero, altas, semilla):
+    """
+    Ejecuta la carga de un proceso. Retorna ({codigo: precio final esperado}, [códigos eliminados]).
+    """
+    rnd = random.Random(semilla + numero)
+    esperados = {}
+
+    def lugar():
+        return rnd.choice(GENEROS), rnd.choice(AUTORES), rnd.choice(TITULOS)
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        # Altas individuales y en lote
+        for i in range(altas):
+            genero, autor, titulo = lugar()
+            precio = float(rnd.randint(1, 10000))
+            codigo = fcs.alta_libro(root, genero, autor, titulo, precio, 2000)
+            if codigo is None:
+                raise RuntimeError(f"alta_libro falló en el proceso {numero}")
+            esperados[codigo] = precio
+        lote = []
+        for i in range(altas):
+            genero, autor, titulo = lugar()
+            codigo = f"p{numero}-lote-{i}"
+            precio = float(rnd.randint(1, 10000))
+            lote.append({"codigo_libro": codigo, "genero": genero, "autor": autor, "titulo": titulo,
+                         "precio": precio, "anio": 2001})
+            esperados[codigo] = precio
+        resumen = fcs.alta_libros_bulk(root, lote, lote=max(1, altas // 4), conservar_codigos=True)
+        if resumen["errores"]:
+            raise RuntimeError(f"alta_libros_bulk rechazó registros: {resumen['errores'][:3]}")
+
+        # Modificaciones: la mitad en lotes chicos, algunas de a una
+        codigos = list(esperados)
+        rnd.shuffle(codigos)
+        for inicio in range(0, len(codigos) // 2, 10):
+            operaciones = []
+            for codigo in codigos[inicio:inicio + 10]:
+                esperados[codigo] = float(rnd.randint(10001, 20000))
+                operaciones.append(("actualizar", codigo, {"precio": esperados[codigo]}))
+            fcs.aplicar_lote(root, operaciones)
+        for codigo in codigos[len(codigos) // 2:len(codigos) // 2 + altas // 10]:
+            esperados[codigo] = float(rnd.randint(20001, 30000))
+            if not fcs.actualizar_por_codigo(root, codigo, esperados[codigo]):
+                raise RuntimeError(f"actualizar_por_codigo no encontró {codigo}")
+
+        # Bajas
+        eliminados = codigos[-(altas // 5):] if altas >= 5 else []
+        for codigo in eliminados:
+            if not fcs.eliminar_por_codigo(root, codigo):
+                raise RuntimeError(f"eliminar_por_codigo no encontró {codigo}")
+            del esperados[codigo]
+    return esperados, eliminados
+
+
+def _trabajador(argumentos):
+    return trabajador(*argumentos)
+
+
+def verificar(root, esperados, eliminados):
+    """Compara la biblioteca con lo que escribieron los procesos. Retorna la lista de problemas."""
+    problemas = []
+    libros = fcs.leer_toda_jerarquia(root, usar_manifiesto=False)
+    conteo = collections.Counter(l["codigo_libro"] for l in libros)
+    duplicados = [c for c, n in conteo.items() if n > 1]
+    faltantes = [c for c in esperados if c not in conteo]
+    sobrantes = [c for c in conteo if c not in esperados]
+    precios = [l["codigo_libro"] for l in libros
+               if l["codigo_libro"] in esperados and float(l["precio"]) != esperados[l["codigo_libro"]]]
+    revividos = [c for c in eliminados if c in conteo]
+    for nombre, lista in (("duplicados", duplicados), ("faltantes", faltantes), ("sobrantes", sobrantes),
+                          ("precio incorrecto", precios), ("eliminados presentes", revividos)):
+        if lista:
+            problemas.append(f"{nombre}: {len(lista)} (ej. {lista[:3]})")
+
+    con_manifiesto = fcs.leer_toda_jerarquia(root)
+    clave = lambda l: (l["codigo_libro"], l["precio"])
+    if sorted(map(clave, con_manifiesto)) != sorted(map(clave, libros)):
+        problemas.append("el manifiesto no coincide con los CSV")
+    indices = {k: v for k, v in fcs.verificar_indices(root).items() if v}
+    if indices:
+        problemas.append(f"índices inconsistentes: { {k: len(v) for k, v in indices.items()} }")
+    temporales = [os.path.join(c, n) for c, _, archivos in os.walk(root) for n in archivos if n.endswith(".tmp")]
+    if temporales:
+        problemas.append(f"temporales sueltos: {temporales[:3]}")
+    return problemas, len(libros)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Estrés de escritores concurrentes sobre una biblioteca.")
+    parser.add_argument("--procesos", type=int, default=8)
+    parser.add_argument("--altas", type=int, default=200, help="altas individuales (y otras tantas en lote) por proceso")
+    parser.add_argument("--root", help="biblioteca a usar (por defecto una carpeta temporal nueva)")
+    parser.add_argument("--semilla", type=int, default=42)
+    args = parser.parse_args()
+
+    root = args.root or os.path.join(tempfile.mkdtemp(prefix="estres_"), "biblioteca")
+    fcs.inicializar_root(root)
+    fcs.reconstruir_indices(root)  # índices desde el inicio: también se ejercitan
+    previos = {l["codigo_libro"]: float(l["precio"]) for l in fcs.leer_toda_jerarquia(root)}
+
+    inicio = time.perf_counter()
+    with multiprocessing.Pool(args.procesos) as pool:
+        resultados = pool.map(_trabajador, [(root, n, args.altas, args.semilla) for n in range(args.procesos)])
+    segundos = time.perf_counter() - inicio
+
+    esperados, eliminados = dict(previos), []
+    for parcial, borrados in resultados:
+        esperados.update(parcial)
+        eliminados.extend(borrados)
+    operaciones = args.procesos * args.altas * 2
+    print(f"{args.procesos} procesos, {operaciones} altas en {segundos:.2f} s "
+          f"({operaciones / segundos:.0f} altas/s con modificaciones y bajas intercaladas)")
+
+    problemas, total = verificar(root, esperados, eliminados)
+    if not args.root:
+        shutil.rmtree(os.path.dirname(root), ignore_errors=True)
+    if problemas:
+        print("ERROR:")
+        for p in problemas:
+            print(f"  - {p}")
+        sys.exit(1)
+    print(f"OK: {total} libros, sin filas perdidas ni duplicadas.")
+
+
+if __name__ == "__main__":
+    main()
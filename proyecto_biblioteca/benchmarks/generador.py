@@ -0,0 +1,78 @@
+"""
+Generador de bibliotecas sintéticas para los benchmarks.
+- Crea la misma jerarquía que alta_libro (root/genero/autor/titulo/libros.csv),
+  pero escribiendo cada CSV de una sola vez (mucho más rápido que llamar a
+  alta_libro fila por fila).
+- Usa una semilla fija: dos ejecuciones con los mismos parámetros generan
+  exactamente los mismos datos (incluidos los codigo_libro).
+"""
+import argparse
+import csv
+import os
+import random
+import uuid
+
+import funciones_jerarquia as fcs
+
+
+def generar_biblioteca(root, generos=10, autores=100, titulos=100, filas_por_csv=1, semilla=42):
+    """
+    Genera una biblioteca sintética en `root`.
+    - generos: cantidad de carpetas de género.
+    - autores: autores por género.
+    - titulos: títulos por autor.
+    - filas_por_csv: libros (filas) dentro de cada libros.csv.
+    - semilla: semilla del generador aleatorio.
+    Total de CSV = generos * autores * titulos; total de libros = CSV * filas_por_csv.
+    Retorna la cantidad de libros escritos.
+    """
+    rnd = random.Random(semilla)
+    fcs.inicializar_root(root)
+    total = 0
+    for g in range(generos):
+        genero = f"Genero {g:03d}"
+        for a in range(autores):
+            autor = f"Autor {g:03d}-{a:04d}"
+            for t in range(titulos):
+                titulo = f"Titulo {g:03d}-{a:04d}-{t:04d}"
+                carpeta = os.path.join(root, genero, autor, titulo)
+                os.makedirs(carpeta, exist_ok=True)
+                with open(os.path.join(carpeta, fcs.CSV_FILE), "w", newline="", encoding="utf-8") as f:
+                    writer = csv.writer(f)
+                    writer.writerow(fcs.REQUIRED_FIELDS)
+                    for _ in range(filas_por_csv):
+                        writer.writerow([
+                            str(uuid.UUID(int=rnd.getrandbits(128), version=4)),
+                            titulo,
+                            autor,
+                            genero,
+                            f"{rnd.uniform(500, 20000):.2f}",
+                            rnd.randint(1500, 2025),
+                        ])
+                        total += 1
+    return total
+
+
+def dimensiones_para(libros, filas_por_csv=1, generos=10):
+    """
+    Calcula (generos, autores, titulos) para llegar aproximadamente a `libros`
+    repartiendo los CSV en una jerarquía balanceada.
+    """
+    csvs = max(1, libros // filas_por_csv)
+    por_genero = max(1, csvs // generos)
+    autores = max(1, int(por_genero ** 0.5))
+    titulos = max(1, por_genero // autores)
+    return generos, autores, titulos
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Genera una biblioteca sintética.")
+    parser.add_argument("root")
+    parser.add_argument("--libros", type=int, default=1000)
+    parser.add_argument("--filas-por-csv", type=int, default=1)
+    parser.add_argument("--generos", type=int, default=10)
+    parser.add_argument("--semilla", type=int, default=42)
+    args = parser.parse_args()
+    g, a, t = dimensiones_para(args.libros, args.filas_por_csv, args.generos)
+    n = generar_biblioteca(args.root, g, a, t, args.filas_por_csv, args.semilla)
+    print(f"Biblioteca generada en {args.root}: {n} libros ({g} géneros x {a} autores x {t} títulos).")
@@ -0,0 +1,57 @@
+"""
+Compara los motores de lectura de leer_toda_jerarquia sobre una biblioteca sintética.
+Uso (desde proyecto_biblioteca/):
+    python -m benchmarks.lectura --csvs 100000 --root /tmp/bench_biblioteca
+- Mide lecturas "en frío" (sin manifiesto) de cada motor y una lectura
+  "en caliente" con el manifiesto ya armado.
+"""
+import argparse
+import os
+import time
+
+import funciones_jerarquia as fcs
+from benchmarks.generador import dimensiones_para, generar_biblioteca
+
+
+def medir(funcion, repeticiones=3):
+    """Ejecuta `funcion` varias veces y devuelve (mejor tiempo en segundos, último resultado)."""
+    mejor = None
+    resultado = None
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        resultado = funcion()
+        duracion = time.perf_counter() - inicio
+        mejor = duracion if mejor is None else min(mejor, duracion)
+    return mejor, resultado
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de los motores de lectura.")
+    parser.add_argument("--root", default="./bench_biblioteca")
+    parser.add_argument("--csvs", type=int, default=100000)
+    parser.add_argument("--trabajadores", type=int, default=None)
+    parser.add_argument("--repeticiones", type=int, default=3)
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.root):
+        g, a, t = dimensiones_para(args.csvs)
+        print(f"Generando {g * a * t} CSV en {args.root} ...")
+        generar_biblioteca(args.root, g, a, t)
+
+    base = None
+    for motor in ("serie", "hilos", "procesos"):
+        segundos, libros = medir(
+            lambda: fcs.leer_toda_jerarquia(args.root, motor=motor, trabajadores=args.trabajadores,
+                                            usar_manifiesto=False),
+            args.repeticiones)
+        base = base or segundos
+        print(f"{motor:>9} (frío): {segundos:8.3f} s  {len(libros)} libros  x{base / segundos:.2f}")
+
+    fcs.leer_toda_jerarquia(args.root)  # arma el manifiesto
+    for motor in ("serie", "hilos"):
+        segundos, libros = medir(lambda: fcs.leer_toda_jerarquia(args.root, motor=motor), args.repeticiones)
+        print(f"{motor:>9} (manifiesto): {segundos:8.3f} s  {len(libros)} libros  x{base / segundos:.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""
+Compara la lista de diccionarios de leer_toda_jerarquia con el CatalogoCompacto.
+Uso (desde proyecto_biblioteca/):
+    python -m benchmarks.memoria --libros 1000000 --root /tmp/bench_1m
+- Memoria: bytes retenidos por la colección cargada (tracemalloc).
+- Velocidad: carga (con manifiesto), ordenar por precio, estadísticas y filtro por género.
+"""
+import argparse
+import contextlib
+import io
+import os
+import time
+import tracemalloc
+
+import funciones_jerarquia as fcs
+from benchmarks.generador import dimensiones_para, generar_biblioteca
+
+
+def memoria_retenida(cargar):
+    """Devuelve (bytes retenidos por el resultado de cargar(), resultado)."""
+    tracemalloc.start()
+    antes = tracemalloc.get_traced_memory()[0]
+    resultado = cargar()
+    despues = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return despues - antes, resultado
+
+
+def cronometrar(funcion):
+    inicio = time.perf_counter()
+    # estadisticas/filtrar imprimen: descartamos la salida para no medir la consola
+    with contextlib.redirect_stdout(io.StringIO()):
+        funcion()
+    return time.perf_counter() - inicio
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Memoria y velocidad: diccionarios vs CatalogoCompacto.")
+    parser.add_argument("--root", default="./bench_biblioteca_1m")
+    parser.add_argument("--libros", type=int, default=1000000)
+    parser.add_argument("--filas-por-csv", type=int, default=10)
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.root):
+        g, a, t = dimensiones_para(args.libros, args.filas_por_csv)
+        print(f"Generando {args.libros} libros en {args.root} ...")
+        generar_biblioteca(args.root, g, a, t, args.filas_por_csv)
+    fcs.leer_toda_jerarquia(args.root)  # arma el manifiesto (las dos variantes lo usan)
+
+    variantes = [("diccionarios", fcs.leer_toda_jerarquia), ("compacto", fcs.cargar_catalogo_compacto)]
+    for nombre, cargar in variantes:
+        retenidos, libros = memoria_retenida(lambda: cargar(args.root))
+        genero = libros[0]["genero"]
+        print(f"\n[{nombre}] {len(libros)} libros")
+        print(f"  memoria: {retenidos / 1e6:9.1f} MB ({retenidos / max(1, len(libros)):.0f} bytes/libro)")
+        del libros
+        tiempos = {"carga": cronometrar(lambda: cargar(args.root))}
+        libros = cargar(args.root)
+        tiempos["ordenar precio"] = cronometrar(lambda: fcs.ordenar_libros(libros, "precio"))
+        tiempos["estadisticas"] = cronometrar(lambda: fcs.estadisticas(libros))
+        tiempos["filtrar genero"] = cronometrar(lambda: fcs.filtrar_libros(libros, "genero", genero))
+        for operacion, segundos in tiempos.items():
+            print(f"  {operacion:>15}: {segundos:7.3f} s")
+        del libros
+
+
+if __name__ == "__main__":
+    main()
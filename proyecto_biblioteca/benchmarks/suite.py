@@ -0,0 +1,206 @@
+"""
+Suite de benchmarks de funciones_jerarquia a varios tamaños, con resultados en JSON.
+Uso (desde proyecto_biblioteca/):
+    python -m benchmarks.suite --tamanios 1000 100000 1000000 --salida base.json
+    python -m benchmarks.suite --tamanios 1000 100000 --salida nuevo.json --comparar base.json
+- Para cada tamaño genera (o reutiliza) una biblioteca sintética con semilla fija
+  en --carpeta y mide alta, lectura, modificación, eliminación, ordenamiento,
+  estadísticas, filtro y consultas.
+- Las modificaciones (idempotentes) se repiten como las lecturas; las altas y
+  bajas se miden una sola vez, así que conviene subir --tolerancia para ellas.
+- Las operaciones de escritura dejan la biblioteca como estaba: se modifican
+  libros con su mismo precio y se eliminan los libros agregados por la suite
+  (solo quedan las carpetas, ya vacías, de esos títulos).
+- --comparar: marca como regresión toda operación que tarde más de
+  (1 + tolerancia) veces lo que tardaba en la base (y al menos --minimo-ms más).
+  Sale con código 1 si hay regresiones.
+- --backend sqlite: copia cada biblioteca a un archivo .db y mide ese backend.
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import sys
+import time
+
+import funciones_jerarquia as fcs
+from benchmarks.generador import dimensiones_para, generar_biblioteca
+
+
+def cronometrar(funcion, repeticiones=1):
+    """Mejor tiempo (segundos) de `funcion` en `repeticiones` corridas, descartando lo que imprime."""
+    mejor = None
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            funcion()
+        duracion = time.perf_counter() - inicio
+        mejor = duracion if mejor is None else min(mejor, duracion)
+    return mejor
+
+
+def preparar_biblioteca(carpeta, libros, filas_por_csv, backend):
+    """Genera (si no existe) la biblioteca de `libros` libros y devuelve (root, segundos de generación)."""
+    root = os.path.join(carpeta, f"biblioteca_{libros}_{filas_por_csv}")
+    segundos = 0.0
+    if not os.path.isdir(root):
+        g, a, t = dimensiones_para(libros, filas_por_csv)
+        print(f"Generando {g * a * t * filas_por_csv} libros en {root} ...")
+        inicio = time.perf_counter()
+        generar_biblioteca(root, g, a, t, filas_por_csv)
+        segundos = time.perf_counter() - inicio
+    if backend == "sqlite":
+        base = root + ".db"
+        if not os.path.exists(base):
+            print(f"Copiando {root} a {base} ...")
+            fcs.copiar_biblioteca(root, base)
+        root = base
+    return root, segundos
+
+
+def medir_tamanio(root, operaciones, repeticiones, frio=True):
+    """Mide todas las operaciones sobre `root`. Retorna {operación: segundos}."""
+    r = {}
+    if frio and not fcs.es_sqlite(root):
+        r["leer_toda_jerarquia (sin manifiesto)"] = cronometrar(
+            lambda: fcs.leer_toda_jerarquia(root, usar_manifiesto=False))
+    fcs.leer_toda_jerarquia(root)  # deja armados manifiesto e índices
+    fcs.codigos_por_titulo(root, "")
+    r["leer_toda_jerarquia"] = cronometrar(lambda: fcs.leer_toda_jerarquia(root), repeticiones)
+    libros = fcs.leer_toda_jerarquia(root)
+    catalogo = fcs.cargar_catalogo_compacto(root)
+    genero, autor = libros[0]["genero"], libros[-1]["autor"]
+    r["cargar_catalogo_compacto"] = cronometrar(lambda: fcs.cargar_catalogo_compacto(root), repeticiones)
+    r["iter_libros (genero)"] = cronometrar(lambda: sum(1 for _ in fcs.iter_libros(root, genero=genero)),
+                                            repeticiones)
+    r["iter_libros (autor)"] = cronometrar(lambda: sum(1 for _ in fcs.iter_libros(root, autor=autor)),
+                                           repeticiones)
+    titulo = libros[len(libros) // 2]["titulo"]
+    r["codigos_por_titulo_parcial"] = cronometrar(lambda: fcs.codigos_por_titulo_parcial(root, titulo[-8:]),
+                                                  repeticiones)
+    r["buscar_libros difuso top-10"] = cronometrar(lambda: fcs.buscar_libros(
+        root, titulo[:-2] + titulo[-1] + titulo[-2], difuso=True, limite=10), repeticiones)
+    r["reconstruir_agregados"] = cronometrar(lambda: fcs.reconstruir_agregados(root))
+    r["agregados_biblioteca genero"] = cronometrar(lambda: fcs.agregados_biblioteca(root, "genero"), repeticiones)
+
+    # Escritura: se agregan `operaciones` libros de a uno y otros tantos en lote
+    rnd = random.Random(7)
+    nuevos = [{"genero": genero, "autor": f"Autor suite {i % 10}", "titulo": f"Titulo suite {i}",
+               "precio": f"{rnd.uniform(500, 20000):.2f}", "anio": rnd.randint(1500, 2025)}
+              for i in range(operaciones)]
+    r[f"alta_libro x{operaciones}"] = cronometrar(lambda: [
+        fcs.alta_libro(root, n["genero"], n["autor"], n["titulo"], float(n["precio"]), n["anio"]) for n in nuevos])
+    r[f"alta_libros_bulk x{operaciones}"] = cronometrar(lambda: fcs.alta_libros_bulk(root, nuevos))
+    agregados = [c for n in nuevos for c in fcs.codigos_por_titulo(root, n["titulo"])]
+
+    muestra = rnd.sample(libros, min(operaciones, len(libros)))
+    r[f"actualizar_por_codigo x{len(muestra)}"] = cronometrar(lambda: [
+        fcs.actualizar_por_codigo(root, l["codigo_libro"], l["precio"]) for l in muestra], repeticiones)
+    r[f"aplicar_lote actualizar x{len(muestra)}"] = cronometrar(lambda: fcs.aplicar_lote(
+        root, [("actualizar", l["codigo_libro"], {"precio": l["precio"]}) for l in muestra]), repeticiones)
+    mitad = len(agregados) // 2
+    r[f"eliminar_por_codigo x{mitad}"] = cronometrar(lambda: [
+        fcs.eliminar_por_codigo(root, c) for c in agregados[:mitad]])
+    r[f"aplicar_lote eliminar x{len(agregados) - mitad}"] = cronometrar(lambda: fcs.aplicar_lote(
+        root, [("eliminar", c) for c in agregados[mitad:]]))
+
+    # En memoria (sobre la lista de diccionarios y sobre el catálogo compacto)
+    for nombre, coleccion in (("dict", libros), ("compacto", catalogo)):
+        r[f"ordenar_libros precio [{nombre}]"] = cronometrar(
+            lambda: fcs.ordenar_libros(coleccion, "precio"), repeticiones)
+        r[f"ordenar_libros genero,-precio [{nombre}]"] = cronometrar(
+            lambda: fcs.ordenar_libros(coleccion, ["genero", "-precio"]), repeticiones)
+        r[f"ordenar_libros top-10 [{nombre}]"] = cronometrar(
+            lambda: fcs.ordenar_libros(coleccion, "precio", limite=10), repeticiones)
+        r[f"estadisticas [{nombre}]"] = cronometrar(lambda: fcs.estadisticas(coleccion), repeticiones)
+        r[f"estadisticas genero [{nombre}]"] = cronometrar(
+            lambda: fcs.estadisticas(coleccion, "genero"), repeticiones)
+        r[f"filtrar_libros genero [{nombre}]"] = cronometrar(
+            lambda: fcs.filtrar_libros(coleccion, "genero", genero), repeticiones)
+    r["MotorConsultas (armado)"] = cronometrar(lambda: fcs.MotorConsultas(catalogo))
+    motor = fcs.MotorConsultas(catalogo)
+    consulta = f"precio=1000..5000 & anio>=1990 & genero={genero}"
+    r["consultar_libros compuesta"] = cronometrar(lambda: fcs.consultar_libros(motor, consulta), repeticiones)
+    r["consultar_biblioteca compuesta"] = cronometrar(lambda: fcs.consultar_biblioteca(root, consulta))
+    return r
+
+
+def comparar(base, nuevo, tolerancia, minimo_ms):
+    """
+    Compara dos resultados (mismo formato que escribe la suite).
+    Imprime una tabla y devuelve la lista de regresiones (tamaño, operación, base, nuevo).
+    """
+    regresiones = []
+    for tamanio, operaciones in nuevo["tamanios"].items():
+        anteriores = base.get("tamanios", {}).get(tamanio, {})
+        print(f"\n== {tamanio} libros ==")
+        for operacion, segundos in operaciones.items():
+            antes = anteriores.get(operacion)
+            if antes is None:
+                print(f"  {operacion:<45} {segundos:10.4f} s   (sin base)")
+                continue
+            razon = segundos / antes if antes else float("inf")
+            peor = razon > 1 + tolerancia and (segundos - antes) * 1000 > minimo_ms
+            marca = "  REGRESIÓN" if peor else ""
+            print(f"  {operacion:<45} {antes:10.4f} -> {segundos:10.4f} s  x{razon:5.2f}{marca}")
+            if peor:
+                regresiones.append((tamanio, operacion, antes, segundos))
+    return regresiones
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Suite de benchmarks de funciones_jerarquia.")
+    parser.add_argument("--tamanios", type=int, nargs="+", default=[1000, 100000, 1000000])
+    parser.add_argument("--filas-por-csv", type=int, default=10)
+    parser.add_argument("--carpeta", default="./bench_suite")
+    parser.add_argument("--backend", choices=("csv", "sqlite"), default="csv")
+    parser.add_argument("--operaciones", type=int, default=100,
+                        help="libros agregados/modificados/eliminados por cada operación de escritura")
+    parser.add_argument("--repeticiones", type=int, default=3)
+    parser.add_argument("--sin-frio", action="store_true", help="no medir la lectura sin manifiesto")
+    parser.add_argument("--salida", default="benchmarks.json")
+    parser.add_argument("--comparar", help="JSON de una corrida anterior (línea base)")
+    parser.add_argument("--tolerancia", type=float, default=0.2, help="0.2 = hasta 20%% más lento se acepta")
+    parser.add_argument("--minimo-ms", type=float, default=5.0,
+                        help="diferencias menores a esto no cuentan como regresión (ruido)")
+    args = parser.parse_args()
+
+    os.makedirs(args.carpeta, exist_ok=True)
+    resultado = {
+        "fecha": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "plataforma": platform.platform(),
+        "cpus": os.cpu_count(),
+        "backend": args.backend,
+        "filas_por_csv": args.filas_por_csv,
+        "tamanios": {},
+    }
+    for libros in args.tamanios:
+        root, generacion = preparar_biblioteca(args.carpeta, libros, args.filas_por_csv, args.backend)
+        print(f"Midiendo {root} ...")
+        tiempos = medir_tamanio(root, args.operaciones, args.repeticiones, frio=not args.sin_frio)
+        if generacion:
+            tiempos["generar_biblioteca"] = generacion
+        resultado["tamanios"][str(libros)] = tiempos
+        for operacion, segundos in tiempos.items():
+            print(f"  {operacion:<45} {segundos:10.4f} s")
+
+    with open(args.salida, "w", encoding="utf-8") as f:
+        f.write(json.dumps(resultado, ensure_ascii=False, indent=2))
+    print(f"\nResultados guardados en {args.salida}")
+
+    if args.comparar:
+        with open(args.comparar, "r", encoding="utf-8") as f:
+            base = json.load(f)
+        regresiones = comparar(base, resultado, args.tolerancia, args.minimo_ms)
+        if regresiones:
+            print(f"\n{len(regresiones)} regresiones (tolerancia {args.tolerancia:.0%}).")
+            sys.exit(1)
+        print("\nSin regresiones.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,372 @@
+# ============================================================
+# Línea de comandos (no interactiva) de la biblioteca
+# ============================================================
+# Alternativa al menú de Sistema_de_persistencia_avanzada.py para scripts y
+# otros programas: cada operación es un subcomando y la salida es JSON o CSV.
+#
+# Uso (desde proyecto_biblioteca/):
+#     python comandos.py [--root ROOT] [--formato json|csv] SUBCOMANDO ...
+#
+#     add --genero G --autor A --titulo T --precio P --anio N
+#     add --archivo libros.jsonl           (alta masiva desde .csv/.jsonl)
+#     list [--desde N] [--limite N]
+#     update CODIGO [--precio P] [--anio N]
+#     delete CODIGO
+#     sort [--clave=genero,-precio] [--limite N]   (con "=" si empieza con -)
+#     stats [--agrupar genero|autor|anio] [--anios]
+#     verify-stats [--reparar]             (estadísticas materializadas vs. lectura completa)
+#     filter --atributo autor --valor Tolkien
+#     filter --consulta "precio=1000..5000 & anio>=1990"
+#     search TEXTO [--campo titulo|autor] [--difuso] [--limite N]
+#     compact [--fragmentar titulo|autor|genero]
+#     script [ARCHIVO]                     (sin ARCHIVO o con "-": lee stdin)
+#
+# script ejecuta muchos comandos, uno por línea (misma sintaxis, sin
+# "python comandos.py" ni --root/--formato; se ignoran las líneas vacías y las
+# que empiezan con #), todos en la misma sesión: la biblioteca se carga una sola
+# vez, como catálogo compacto, y solo se vuelve a cargar después de una escritura.
+# Con --formato json cada comando escribe una línea JSON (JSON Lines); con csv,
+# una tabla con cabecera. Los errores van a stderr y el código de salida es 1.
+#
+# Arranque rápido: funciones_jerarquia se importa recién cuando un comando lo
+# necesita (--help o un error de sintaxis no lo cargan), y nada se lee de disco
+# hasta el primer comando que usa la biblioteca.
+import argparse
+import os
+import shlex
+import sys
+
+
+def _fcs():
+    """Importa funciones_jerarquia la primera vez que se usa."""
+    import funciones_jerarquia
+    return funciones_jerarquia
+
+
+class Sesion:
+    """
+    Estado compartido por los comandos de una ejecución (o de un script).
+    - catalogo(): CatalogoCompacto de la biblioteca, cargado la primera vez.
+    - motor(): MotorConsultas sobre ese catálogo (se arma con el primer filtro).
+    - invalidar(): los descarta; lo llaman los comandos que escriben.
+    """
+
+    def __init__(self, root):
+        self.root = root
+        self.cargas = 0
+        self._catalogo = None
+        self._motor = None
+        self._inicializada = False
+
+    def fcs(self):
+        """funciones_jerarquia, con la biblioteca ya inicializada (una vez por sesión)."""
+        fcs = _fcs()
+        if not self._inicializada:
+            fcs.inicializar_root(self.root)
+            self._inicializada = True
+        return fcs
+
+    def catalogo(self):
+        if self._catalogo is None:
+            self._catalogo = self.fcs().cargar_catalogo_compacto(self.root)
+            self.cargas += 1
+        return self._catalogo
+
+    def motor(self):
+        if self._motor is None:
+            self._motor = _fcs().MotorConsultas(self.catalogo())
+        return self._motor
+
+    def invalidar(self):
+        self._catalogo = None
+        self._motor = None
+
+
+# --------------------------- COMANDOS -------------------------------
+# Cada comando recibe (sesion, args) y devuelve un diccionario: los que listan
+# libros lo hacen en "libros" (lista de libro_tipado), el resto con claves simples.
+def _libros(fcs, libros, desde=0, limite=None):
+    hasta = len(libros) if limite is None else min(len(libros), desde + limite)
+    return [fcs.libro_tipado(libros[i]) for i in range(desde, hasta)]
+
+
+def cmd_add(sesion, args):
+    fcs = sesion.fcs()
+    if args.archivo:
+        origen = args.archivo
+    else:
+        faltantes = [c for c in ("genero", "autor", "titulo", "precio", "anio") if getattr(args, c) is None]
+        if faltantes:
+            raise ValueError(f"Faltan datos del libro: {', '.join(faltantes)} (o indique --archivo).")
+        import uuid
+        # El código se asigna acá para poder informarlo (alta_libros_bulk no imprime)
+        origen = [{"codigo_libro": str(uuid.uuid4()), "genero": args.genero, "autor": args.autor,
+                   "titulo": args.titulo, "precio": args.precio, "anio": args.anio}]
+    try:
+        resumen = fcs.alta_libros_bulk(sesion.root, origen, conservar_codigos=not args.archivo)
+    finally:
+        sesion.invalidar()
+    if not args.archivo:
+        if resumen["errores"]:
+            raise ValueError(resumen["errores"][0][1])
+        return {"codigo_libro": origen[0]["codigo_libro"]}
+    return {"libros": resumen["libros"], "archivos": resumen["archivos"],
+            "rechazados": len(resumen["errores"]),
+            "errores": "; ".join(f"registro {n}: {m}" for n, m in resumen["errores"][:10])}
+
+
+def cmd_list(sesion, args):
+    catalogo = sesion.catalogo()
+    return {"total": len(catalogo), "libros": _libros(_fcs(), catalogo, args.desde, args.limite)}
+
+
+def _aplicar(sesion, operacion, contador):
+    try:
+        resumen = sesion.fcs().aplicar_lote(sesion.root, [operacion])
+    finally:
+        sesion.invalidar()
+    if not resumen[contador]:
+        raise ValueError(f"No se encontró un libro con código {operacion[1]}.")
+    return {"codigo_libro": operacion[1], contador: resumen[contador]}
+
+
+def cmd_update(sesion, args):
+    fcs = sesion.fcs()
+    cambios = {}
+    if args.precio is not None:
+        cambios["precio"] = fcs.validar_numero(args.precio)
+    if args.anio is not None:
+        cambios["anio"] = fcs.validar_anio(args.anio)
+    if not cambios:
+        raise ValueError("Indique --precio y/o --anio.")
+    return _aplicar(sesion, ("actualizar", args.codigo, cambios), "actualizados")
+
+
+def cmd_delete(sesion, args):
+    return _aplicar(sesion, ("eliminar", args.codigo), "eliminados")
+
+
+def cmd_sort(sesion, args):
+    fcs = _fcs()
+    claves = [c.strip() for c in args.clave.split(",") if c.strip()]
+    ordenados = fcs.ordenar_libros(sesion.catalogo(), claves, args.limite)
+    return {"total": len(ordenados), "libros": _libros(fcs, ordenados)}
+
+
+def cmd_stats(sesion, args):
+    fcs = sesion.fcs()
+    if args.agrupar in fcs.AGRUPACIONES_MATERIALIZADAS:
+        # Estadísticas materializadas: no hace falta cargar el catálogo
+        resultado = fcs.agregados_biblioteca(sesion.root, args.agrupar)
+        if not args.anios:
+            for datos in [resultado["global"], *resultado["grupos"].values()]:
+                del datos["anios"]
+    else:
+        resultado = fcs.calcular_estadisticas(sesion.catalogo(), args.agrupar)
+    return {"global": resultado["global"], "grupos": {str(k): v for k, v in resultado["grupos"].items()}}
+
+
+def cmd_verify_stats(sesion, args):
+    diferencias = sesion.fcs().verificar_agregados(sesion.root, reparar=args.reparar)
+    return {"diferencias": len(diferencias), "reparado": bool(args.reparar and diferencias), "detalle": diferencias}
+
+
+def cmd_filter(sesion, args):
+    fcs = _fcs()
+    if args.consulta:
+        condicion = fcs.parsear_consulta(args.consulta)
+    elif args.atributo and args.valor is not None:
+        condicion = (args.atributo, "=", args.valor)
+    else:
+        raise ValueError("Indique --consulta o --atributo y --valor.")
+    resultado = sesion.motor().consultar(condicion)
+    return {"total": len(resultado), "libros": _libros(fcs, resultado)}
+
+
+def cmd_search(sesion, args):
+    fcs = sesion.fcs()
+    campos = (args.campo,) if args.campo else fcs.CAMPOS_BUSQUEDA
+    resultados = fcs.buscar_libros(sesion.root, args.texto, campos, args.difuso, args.similitud, args.limite)
+    similitudes = {r["codigo_libro"]: r["similitud"] for r in resultados}
+    libros = [dict(fcs.libro_tipado(l), similitud=similitudes[l["codigo_libro"]])
+              for l in fcs.leer_libros_por_codigo(sesion.root, list(similitudes))]
+    return {"total": len(libros), "libros": libros}
+
+
+def cmd_compact(sesion, args):
+    resumen = sesion.fcs().compactar_biblioteca(sesion.root, args.fragmentar)
+    sesion.invalidar()
+    # Resultado plano (una fila en CSV): las medidas de antes/después como clave_antes / clave_despues
+    plano = {clave: valor for clave, valor in resumen.items() if not isinstance(valor, dict)}
+    for momento in ("antes", "despues"):
+        plano.update({f"{clave}_{momento}": valor for clave, valor in resumen[momento].items()})
+    plano["segundos"] = round(resumen["segundos"], 3)
+    return plano
+
+
+# --------------------------- SALIDA ---------------------------------
+def escribir(resultado, formato, salida=None):
+    """
+    Escribe el resultado de un comando.
+    - json: una línea por comando.
+    - csv: los libros como tabla (columnas de REQUIRED_FIELDS); las estadísticas,
+    una fila por grupo (el total general con grupo "*"); el resto, una fila con
+    las claves del resultado como cabecera.
+    """
+    import json
+    salida = salida or sys.stdout
+    if formato == "json":
+        salida.write(json.dumps(resultado, ensure_ascii=False) + "\n")
+        return
+    import csv
+    writer = csv.writer(salida, lineterminator="\n")
+    if "libros" in resultado and isinstance(resultado["libros"], list):
+        columnas = _fcs().REQUIRED_FIELDS
+        writer.writerow(columnas)
+        writer.writerows([l[c] for c in columnas] for l in resultado["libros"])
+    elif "global" in resultado:
+        columnas = list(resultado["global"])
+        writer.writerow(["grupo"] + columnas)
+        writer.writerow(["*"] + [resultado["global"][c] for c in columnas])
+        for grupo, datos in sorted(resultado["grupos"].items()):
+            writer.writerow([grupo] + [datos.get(c) for c in columnas])
+    else:
+        writer.writerow(list(resultado))
+        writer.writerow(list(resultado.values()))
+
+
+# --------------------------- PARSER ---------------------------------
+class _ParserScript(argparse.ArgumentParser):
+    """Parser para las líneas de un script: los errores se lanzan en lugar de terminar el programa."""
+
+    def error(self, message):
+        raise ValueError(message)
+
+    def exit(self, status=0, message=None):
+        raise ValueError(message.strip() if message else "comando no ejecutado")
+
+
+def crear_parser(clase=argparse.ArgumentParser, globales=True):
+    """
+    Arma el parser de la línea de comandos. Con globales=False (líneas de un
+    script) no acepta --root ni --formato: se usan los de la invocación de script.
+    """
+    parser = clase(prog="comandos.py", description="Línea de comandos de la biblioteca (salida JSON o CSV).")
+    if globales:
+        parser.add_argument("--root", default=os.environ.get("BIBLIOTECA_ROOT", "./biblioteca"),
+                            help="carpeta de la biblioteca o archivo .db (por defecto BIBLIOTECA_ROOT o ./biblioteca)")
+        parser.add_argument("--formato", choices=("json", "csv"), default="json")
+    sub = parser.add_subparsers(dest="comando", required=True, metavar="SUBCOMANDO")
+
+    p = sub.add_parser("add", help="alta de un libro (o masiva con --archivo)")
+    for campo in ("genero", "autor", "titulo", "precio", "anio"):
+        p.add_argument(f"--{campo}")
+    p.add_argument("--archivo", help=".csv o .jsonl con muchos libros")
+    p.set_defaults(funcion=cmd_add)
+
+    p = sub.add_parser("list", help="listar libros")
+    p.add_argument("--desde", type=int, default=0)
+    p.add_argument("--limite", type=int)
+    p.set_defaults(funcion=cmd_list)
+
+    p = sub.add_parser("update", help="modificar precio y/o año por código")
+    p.add_argument("codigo")
+    p.add_argument("--precio")
+    p.add_argument("--anio")
+    p.set_defaults(funcion=cmd_update)
+
+    p = sub.add_parser("delete", help="eliminar por código")
+    p.add_argument("codigo")
+    p.set_defaults(funcion=cmd_delete)
+
+    p = sub.add_parser("sort", help="ordenar por una o varias claves")
+    p.add_argument("--clave", default="precio", help='ej. precio o --clave=genero,-precio ("-" = descendente)')
+    p.add_argument("--limite", type=int, help="solo los N primeros")
+    p.set_defaults(funcion=cmd_sort)
+
+    p = sub.add_parser("stats", help="estadísticas de precio")
+    p.add_argument("--agrupar", choices=("genero", "autor", "anio"))
+    p.add_argument("--anios", action="store_true", help="incluir la cantidad de libros por año (sin --agrupar anio)")
+    p.set_defaults(funcion=cmd_stats)
+
+    p = sub.add_parser("verify-stats", help="comparar las estadísticas materializadas con una lectura completa")
+    p.add_argument("--reparar", action="store_true", help="si hay diferencias, reconstruirlas")
+    p.set_defaults(funcion=cmd_verify_stats)
+
+    p = sub.add_parser("filter", help="filtrar por atributo o con una consulta compuesta")
+    p.add_argument("--atributo")
+    p.add_argument("--valor")
+    p.add_argument("--consulta", help='ej. "precio=1000..5000 & anio>=1990 & genero=Historia"')
+    p.set_defaults(funcion=cmd_filter)
+
+    p = sub.add_parser("search", help="buscar por título o autor (subcadena o parecidos, con el índice de trigramas)")
+    p.add_argument("texto")
+    p.add_argument("--campo", choices=("titulo", "autor"), help="por defecto, ambos")
+    p.add_argument("--difuso", action="store_true", help="incluir parecidos (errores de tipeo)")
+    p.add_argument("--similitud", type=float, default=0.4, help="similitud mínima de los parecidos (0 a 1)")
+    p.add_argument("--limite", type=int)
+    p.set_defaults(funcion=cmd_search)
+
+    p = sub.add_parser("compact", help="borrar CSV y carpetas vacías y (opcional) reagrupar los CSV")
+    p.add_argument("--fragmentar", choices=("titulo", "autor", "genero"),
+                   help="un libros.csv por título, por autor o por género")
+    p.set_defaults(funcion=cmd_compact)
+
+    p = sub.add_parser("script", help="ejecutar muchos comandos (uno por línea) en la misma sesión")
+    p.add_argument("archivo", nargs="?", default="-", help='archivo de comandos ("-" = stdin)')
+    p.add_argument("--detener", action="store_true", help="terminar en el primer error")
+    return parser
+
+
+def ejecutar(sesion, args, formato):
+    """Ejecuta un comando ya parseado. Retorna True si terminó bien (el error va a stderr)."""
+    try:
+        escribir(args.funcion(sesion, args), formato)
+        return True
+    except (ValueError, KeyError, OSError) as e:
+        sys.stderr.write(f"Error ({args.comando}): {e}\n")
+        return False
+
+
+def ejecutar_script(sesion, archivo, formato, detener=False):
+    """Ejecuta los comandos de `archivo` (o stdin) en `sesion`. Retorna la cantidad de errores."""
+    parser = crear_parser(_ParserScript, globales=False)
+    entrada = sys.stdin if archivo == "-" else open(archivo, "r", encoding="utf-8")
+    errores = 0
+    try:
+        for numero, linea in enumerate(entrada, start=1):
+            linea = linea.strip()
+            if not linea or linea.startswith("#"):
+                continue
+            try:
+                args = parser.parse_args(shlex.split(linea))
+                if args.comando == "script":
+                    raise ValueError("no se puede anidar 'script'")
+            except ValueError as e:
+                sys.stderr.write(f"Error (línea {numero}): {e}\n")
+                ok = False
+            else:
+                ok = ejecutar(sesion, args, formato)
+            if not ok:
+                errores += 1
+                if detener:
+                    break
+            sys.stdout.flush()
+    finally:
+        if entrada is not sys.stdin:
+            entrada.close()
+    return errores
+
+
+def main(argv=None):
+    args = crear_parser().parse_args(argv)
+    sesion = Sesion(args.root)
+    if args.comando == "script":
+        ok = ejecutar_script(sesion, args.archivo, args.formato, args.detener) == 0
+    else:
+        ok = ejecutar(sesion, args, args.formato)
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
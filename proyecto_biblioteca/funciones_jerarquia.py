@@ -1,13 +1,324 @@
 import os
+import bisect
+import contextlib
 import csv
+import functools
+import hashlib
+import heapq
+import itertools
+import json
+import math
+import operator
+import pickle
+import re
+import shutil
+import tempfile
+import threading
+import unicodedata
+from array import array
+import time
+import types
 import uuid
+import zlib
+
+# Bloqueos entre procesos: fcntl en Linux/macOS, msvcrt en Windows.
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+try:
+    import msvcrt
+except ImportError:
+    msvcrt = None
 
 # Nombre del archivo CSV que se guarda en cada carpeta de tercer nivel (Título)
 CSV_FILE = "libros.csv"
 
+# Manifiesto (caché en disco) de las filas ya parseadas de cada CSV.
+# - MANIFIESTO_FILE: foto completa {ruta relativa: {firma, campos, filas}}
+# - MANIFIESTO_LOG: cambios posteriores (una línea JSON por escritura), se
+#   aplican sobre la foto al cargar y se compactan en la siguiente lectura.
+MANIFIESTO_FILE = ".manifiesto.json"
+MANIFIESTO_LOG = ".manifiesto.log"
+
+# Índices secundarios persistentes (carpeta oculta dentro de root):
+# - "codigos": codigo_libro -> ruta relativa del CSV donde está el libro
+# - "titulos": titulo normalizado (minúsculas) -> lista de codigo_libro
+# - "autores": autor normalizado (minúsculas) -> lista de codigo_libro
+# - "trigramas": trigrama -> {"titulo": [títulos normalizados], "autor": [...]}
+#   (búsqueda por subcadena y con errores de tipeo, ver buscar_libros)
+# Cada índice se reparte en INDICE_CUBETAS archivos JSON chicos, así una
+# alta/baja solo reescribe la cubeta que le corresponde.
+# Un título o autor nuevo toca unas 30 cubetas de trigramas: en lugar de
+# reescribirlas en cada alta, se anota en TRIGRAMAS_LOG (como el log del
+# manifiesto) y se vuelca a las cubetas cuando pasa TRIGRAMAS_LOG_MAXIMO bytes.
+INDICES_DIR = ".indices"
+INDICE_CUBETAS = 256
+TRIGRAMAS_LOG = "trigramas.log"
+TRIGRAMAS_LOG_MAXIMO = 64 * 1024
+
+# Bloqueos entre procesos (varios programas escribiendo la misma biblioteca).
+# Cada CSV usa uno de BLOQUEOS_CUBETAS archivos de bloqueo según su ruta (igual
+# que las cubetas de los índices), además de bloqueos para el manifiesto, los
+# índices, los agregados y los lotes de modificación.
+BLOQUEOS_DIR = ".bloqueos"
+BLOQUEOS_CUBETAS = 256
+
+# Journal (registro de escritura anticipada) de las reescrituras de CSV.
+# Si el programa se corta en medio de un lote, la próxima inicialización lo
+# completa ("confirmado") o lo deshace ("preparando").
+JOURNAL_FILE = ".journal.json"
+
+# Fragmentación (ver compactar_biblioteca): por defecto hay un libros.csv por
+# título; una biblioteca compactada puede guardar un solo CSV por autor
+# (root/genero/autor/libros.csv) o por género (root/genero/libros.csv).
+# FRAGMENTACION_FILE guarda el nivel elegido, para que las altas de géneros o
+# autores nuevos sigan la misma disposición.
+FRAGMENTACION_FILE = ".fragmentacion.json"
+NIVELES_FRAGMENTACION = ("titulo", "autor", "genero")
+
+# Estadísticas materializadas (ver agregados_biblioteca): por género, por autor
+# y globales (cantidad, suma, media y M2 de Welford, mín/máx de precio, histogramas de precio y año),
+# al día con cada alta/modificación/baja.
+# - AGREGADOS_DIR/<dimension>.json: foto de cada dimensión ("global", "genero", "autor").
+# - AGREGADOS_LOG: altas/bajas posteriores (una línea JSON por escritura), se
+#   vuelcan a las fotos cuando pasa AGREGADOS_LOG_MAXIMO bytes.
+# - RAZON_HISTOGRAMA: ancho relativo de cada barra del histograma de precios
+#   (mediana y p90 se interpolan dentro de las barras, con un error de ±2,5 %).
+AGREGADOS_DIR = ".agregados"
+AGREGADOS_LOG = "cambios.log"
+AGREGADOS_LOG_MAXIMO = 64 * 1024
+DIMENSIONES_AGREGADOS = ("global", "genero", "autor")
+RAZON_HISTOGRAMA = 1.05
+
+# Columnas que se pueden modificar con actualizar/aplicar_lote
+CAMPOS_MODIFICABLES = ("precio", "anio")
+
+# Motor de lectura por defecto de leer_toda_jerarquia: "serie", "hilos" o "procesos".
+# TRABAJADORES_LECTURA = None usa os.cpu_count().
+MOTOR_LECTURA = "serie"
+TRABAJADORES_LECTURA = None
+
+# Métricas de instrumentación (ver activar_metricas). Desactivadas, cada función
+# medida solo agrega una comprobación de esta variable.
+METRICAS_ACTIVAS = False
+
 # Orden/columnas obligatorias del CSV — mantener consistencia al escribir/leer
 REQUIRED_FIELDS = ["codigo_libro", "titulo", "autor", "genero", "precio", "anio"]
 
+# Backends de almacenamiento:
+# - Por defecto `root` es una carpeta con la jerarquía Género/Autor/Título/libros.csv.
+# - Si `root` termina en alguna de EXTENSIONES_SQLITE, las funciones de
+#   FUNCIONES_BACKEND delegan en backend_sqlite (un solo archivo SQLite).
+EXTENSIONES_SQLITE = (".db", ".sqlite", ".sqlite3")
+FUNCIONES_BACKEND = (
+    "inicializar_root", "alta_libro", "alta_libros_bulk", "leer_toda_jerarquia", "iter_libros",
+    "cargar_catalogo_compacto", "aplicar_lote", "codigos_por_titulo", "codigos_por_titulo_parcial",
+    "leer_libros_por_codigo", "limpiar_temporales", "verificar_indices", "reconstruir_indices",
+    "consultar_biblioteca", "compactar_biblioteca", "buscar_libros", "agregados_biblioteca",
+    "verificar_agregados", "reconstruir_agregados",
+)
+
+
+# --------------------------- BACKENDS --------------------------------
+def es_sqlite(root):
+    """True si `root` es un archivo SQLite (por su extensión) en lugar de una carpeta."""
+    return os.fspath(root).lower().endswith(EXTENSIONES_SQLITE)
+
+
+def _con_backend(funcion):
+    """
+    Decorador de las funciones de FUNCIONES_BACKEND: si `root` es un archivo SQLite,
+    la llamada se delega en la función del mismo nombre de backend_sqlite.
+    El módulo se importa recién la primera vez que se usa.
+    """
+    @functools.wraps(funcion)
+    def despachar(root, *args, **kwargs):
+        if es_sqlite(root):
+            import backend_sqlite
+            return getattr(backend_sqlite, funcion.__name__)(root, *args, **kwargs)
+        return funcion(root, *args, **kwargs)
+    return despachar
+
+
+# --------------------------- MÉTRICAS --------------------------------
+# Acumulado de la sesión:
+# - "funciones": {nombre: {"llamadas", "segundos", "maximo"}} (tiempo inclusivo:
+#   si una función medida llama a otra, el tiempo cuenta en las dos)
+# - "contadores": directorios_visitados, csv_leidos, csv_desde_manifiesto,
+#   csv_escritos, filas_leidas, filas_escritas, bytes_leidos, bytes_escritos,
+#   reescrituras_tmp, manifiestos_guardados, cubetas_indice_escritas
+_METRICAS = {"funciones": {}, "contadores": {}}
+
+
+def activar_metricas(activo=True):
+    """Enciende (o apaga con activo=False) la recolección de métricas."""
+    global METRICAS_ACTIVAS
+    METRICAS_ACTIVAS = bool(activo)
+
+
+def reiniciar_metricas():
+    """Borra todo lo acumulado (no cambia si están activas o no)."""
+    _METRICAS["funciones"].clear()
+    _METRICAS["contadores"].clear()
+
+
+def obtener_metricas():
+    """Copia de las métricas acumuladas: {"activas", "funciones", "contadores"}."""
+    return {
+        "activas": METRICAS_ACTIVAS,
+        "funciones": {n: dict(d) for n, d in _METRICAS["funciones"].items()},
+        "contadores": dict(_METRICAS["contadores"]),
+    }
+
+
+def guardar_metricas(ruta):
+    """Escribe obtener_metricas() como JSON en `ruta`."""
+    with open(ruta, "w", encoding="utf-8") as f:
+        f.write(json.dumps(obtener_metricas(), ensure_ascii=False, indent=2))
+
+
+def _contar(**cantidades):
+    """Suma `cantidades` a los contadores. Se llama solo si METRICAS_ACTIVAS."""
+    contadores = _METRICAS["contadores"]
+    for nombre, cantidad in cantidades.items():
+        contadores[nombre] = contadores.get(nombre, 0) + cantidad
+
+
+def _registrar_tiempo(nombre, segundos):
+    datos = _METRICAS["funciones"].setdefault(nombre, {"llamadas": 0, "segundos": 0.0, "maximo": 0.0})
+    datos["llamadas"] += 1
+    datos["segundos"] += segundos
+    datos["maximo"] = max(datos["maximo"], segundos)
+
+
+def _medido(funcion):
+    """
+    Decorador: con las métricas activas acumula llamadas y tiempo de `funcion`.
+    Si devuelve un generador (iter_libros) se mide el tiempo de recorrerlo
+    (solo lo que tarda el generador, no lo que hace quien lo consume).
+    """
+    nombre = funcion.__name__
+
+    @functools.wraps(funcion)
+    def medir(*args, **kwargs):
+        if not METRICAS_ACTIVAS:
+            return funcion(*args, **kwargs)
+        inicio = time.perf_counter()
+        resultado = funcion(*args, **kwargs)
+        if isinstance(resultado, types.GeneratorType):
+            return _generador_medido(nombre, resultado, time.perf_counter() - inicio)
+        _registrar_tiempo(nombre, time.perf_counter() - inicio)
+        return resultado
+    return medir
+
+
+def _generador_medido(nombre, generador, transcurrido):
+    try:
+        while True:
+            inicio = time.perf_counter()
+            try:
+                valor = next(generador)
+            except StopIteration:
+                return
+            finally:
+                transcurrido += time.perf_counter() - inicio
+            yield valor
+    finally:
+        generador.close()
+        _registrar_tiempo(nombre, transcurrido)
+
+
+# --------------------------- BLOQUEOS --------------------------------
+# Rutas bloqueadas por el hilo actual (los bloqueos son reentrantes por hilo)
+_bloqueos_del_hilo = threading.local()
+
+
+@contextlib.contextmanager
+def _bloqueo(ruta):
+    """
+    Bloqueo exclusivo entre procesos (y entre hilos) sobre el archivo `ruta`.
+    - Usa fcntl.flock (o msvcrt.locking en Windows); si no hay ninguno de los
+    dos, no bloquea.
+    - Es reentrante dentro del mismo hilo: volver a pedir un bloqueo que ya se
+    tiene no espera.
+    - El bloqueo se libera al cerrar el archivo, aunque el proceso muera.
+    """
+    ruta = os.path.abspath(ruta)
+    tomados = _bloqueos_del_hilo.__dict__.setdefault("rutas", set())
+    if ruta in tomados:
+        yield
+        return
+    try:
+        f = open(ruta, "a+b")
+    except FileNotFoundError:
+        os.makedirs(os.path.dirname(ruta), exist_ok=True)
+        f = open(ruta, "a+b")
+    with f:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        elif msvcrt is not None:
+            f.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    continue  # LK_LOCK se rinde a los 10 s: seguimos esperando
+        tomados.add(ruta)
+        try:
+            yield
+        finally:
+            tomados.discard(ruta)
+            if fcntl is None and msvcrt is not None:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def _bloqueo_nombrado(root, nombre):
+    """Bloqueo de un recurso compartido de `root`: "manifiesto", "indices", "agregados" o "lote"."""
+    return _bloqueo(os.path.join(root, BLOQUEOS_DIR, f"{nombre}.lock"))
+
+
+def _cubeta_bloqueo(root, csv_path):
+    return zlib.crc32(os.path.relpath(csv_path, root).encode("utf-8")) % BLOQUEOS_CUBETAS
+
+
+def _bloqueo_csv(root, csv_path):
+    """Bloqueo de un libros.csv (compartido con los CSV de la misma cubeta)."""
+    return _bloqueo(os.path.join(root, BLOQUEOS_DIR, f"{_cubeta_bloqueo(root, csv_path):02x}.lock"))
+
+
+@contextlib.contextmanager
+def _bloqueo_todos_los_csv(root):
+    """Todas las cubetas de bloqueo de CSV, en orden: nadie agrega ni reescribe libros mientras dura."""
+    with contextlib.ExitStack() as bloqueos:
+        for cubeta in range(BLOQUEOS_CUBETAS):
+            bloqueos.enter_context(_bloqueo(os.path.join(root, BLOQUEOS_DIR, f"{cubeta:02x}.lock")))
+        yield
+
+
+def _ruta_temporal(destino):
+    """Nombre de temporal único por proceso para `destino` (dos escritores nunca comparten el .tmp)."""
+    return f"{destino}.{os.getpid()}-{uuid.uuid4().hex[:8]}.tmp"
+
+
+def perfilar(funcion, *args, lineas=20, orden="cumulative", archivo=None, **kwargs):
+    """
+    Ejecuta funcion(*args, **kwargs) bajo cProfile e imprime las `lineas` funciones
+    más costosas (ordenadas por `orden`, como pstats). Con `archivo` además guarda
+    el perfil completo (se abre con pstats o snakeviz). Retorna lo que retorna `funcion`.
+    """
+    import cProfile
+    import pstats
+
+    perfil = cProfile.Profile()
+    resultado = perfil.runcall(funcion, *args, **kwargs)
+    if archivo:
+        perfil.dump_stats(archivo)
+    pstats.Stats(perfil).strip_dirs().sort_stats(orden).print_stats(lineas)
+    return resultado
+
 
 # --------------------------- VALIDACIONES ---------------------------
 def validar_cadena(texto):
@@ -58,6 +369,8 @@ def validar_anio(valor):
 
 
 # --------------------------- INICIALIZACIÓN --------------------------
+@_medido
+@_con_backend
 def inicializar_root(root):
     """
     Crea la carpeta raíz `root` si no existe.
@@ -65,266 +378,3390 @@ def inicializar_root(root):
     - Efecto: crea el directorio con os.makedirs(..., exist_ok=True).
     - No devuelve nada.
     Importante: no borra nada si ya existe.
+    - Si quedó un lote de escrituras a medio aplicar (JOURNAL_FILE), lo recupera.
     """
     os.makedirs(root, exist_ok=True)
+    recuperar_journal(root)
 
 
-# --------------------------- CRUD: ALTA ------------------------------
-def alta_libro(root, genero, autor, titulo, precio, anio):
+# --------------------------- MANIFIESTO (CACHÉ) ----------------------
+def _firma(ruta):
     """
-    Alta (Create): agrega un libro en la jerarquía Género/Autor/Título.
-    - Construye la ruta: root/genero/autor/titulo
-    - Crea carpetas si hace falta con os.makedirs(..., exist_ok=True)
-    - Genera un codigo_libro único con uuid.uuid4() -> string
-    - Abre (append) CSV_FILE en esa carpeta y escribe una fila con los campos REQUIRED_FIELDS.
-    - Usa `with open(...)` para manejo seguro de archivos.
-    - Parámetros:
-        root: carpeta raíz donde se guardan datos
-        genero, autor, titulo: strings (deben validarse antes)
-        precio: número (float) validado por validar_numero
-        anio: entero validado por validar_anio
-    - Manejo de errores: captura Exception general y muestra mensaje; no propaga.
+    Devuelve la "firma" de un archivo: [mtime en nanosegundos, tamaño en bytes].
+    Si cualquiera de los dos cambió desde la última lectura, el CSV se vuelve a parsear.
     """
-    # Construcción de la ruta jerárquica
-    path = os.path.join(root, genero, autor, titulo)
-    os.makedirs(path, exist_ok=True)  # crea carpetas si no existen
+    st = os.stat(ruta)
+    return [st.st_mtime_ns, st.st_size]
 
-    codigo_libro = str(uuid.uuid4())  # identificador único (UUID)
-    csv_path = os.path.join(path, CSV_FILE)
 
-    # Diccionario con la información a escribir en el CSV
-    nuevo = {
-        "codigo_libro": codigo_libro,
-        "titulo": titulo,
-        "autor": autor,
-        "genero": genero,
-        "precio": precio,
-        "anio": anio,
-    }
+def _parsear_csv(ruta):
+    """
+    Lee un CSV completo y devuelve (campos, filas) con filas como listas de strings.
+    - Se guardan listas (no diccionarios) para que el manifiesto ocupe menos en disco.
+    - Igual que csv.DictReader: se saltean filas vacías y las filas cortas se
+      completan con None.
+    """
+    with open(ruta, "r", newline="", encoding="utf-8") as f:
+        reader = csv.reader(f)
+        campos = next(reader, None) or []
+        filas = []
+        for row in reader:
+            if not row:
+                continue
+            if len(row) < len(campos):
+                row = row + [None] * (len(campos) - len(row))
+            filas.append(row[:len(campos)])
+    return campos, filas
+
 
+def cargar_manifiesto(root):
+    """
+    Carga el manifiesto de `root`: la foto MANIFIESTO_FILE más los cambios de MANIFIESTO_LOG.
+    - Salida: diccionario {ruta relativa del CSV: {"firma", "campos", "filas"}}.
+    - Si el manifiesto no existe o está dañado, devuelve {} (se reconstruye leyendo).
+    """
+    manifiesto = {}
     try:
-        file_exists = os.path.exists(csv_path)
-        # Abrimos en modo 'a' (append). Si no existe, escribimos la cabecera primero.
-        with open(csv_path, "a", newline="", encoding="utf-8") as f:
-            writer = csv.DictWriter(f, fieldnames=REQUIRED_FIELDS)
-            if not file_exists or os.path.getsize(csv_path) == 0:
-                writer.writeheader()
-            writer.writerow(nuevo)
-        print(" Libro agregado correctamente.")
-    except Exception as e:
-        # Aquí podríamos diferenciar tipos de excepción (IOError, OSError), pero
-        # un mensaje general es suficiente para un proyecto académico.
-        print(f"Error al guardar el libro: {e}")
+        with open(os.path.join(root, MANIFIESTO_FILE), "r", encoding="utf-8") as f:
+            manifiesto = json.load(f)
+    except (OSError, ValueError):
+        manifiesto = {}
 
+    try:
+        with open(os.path.join(root, MANIFIESTO_LOG), "r", encoding="utf-8") as f:
+            for linea in f:
+                try:
+                    _aplicar_cambio_manifiesto(manifiesto, json.loads(linea))
+                except ValueError:
+                    # Línea incompleta (p. ej. el programa se cortó escribiendo): la ignoramos.
+                    continue
+    except OSError:
+        pass
+    return manifiesto
 
-# --------------------------- LECTURA RECURSIVA -----------------------
-def leer_toda_jerarquia(root):
+
+def _aplicar_cambio_manifiesto(manifiesto, cambio):
     """
-    Read All (obligatoriamente recursivo).
-    - Recorre de forma recursiva todos los subdirectorios dentro de `root`.
-    - Cada vez que encuentra un archivo llamado CSV_FILE lo abre y lee sus filas.
-    - Consolida todas las filas en una lista `libros` de diccionarios.
-    - Añade la clave "_origen" a cada registro con la ruta absoluta/parcial del CSV,
-    para saber en qué archivo reside cada ítem (útil para actualizar/eliminar).
-    - Retorna la lista completa de libros (puede estar vacía).
-    - Mecanismo recursivo: la función interna `recorrer(ruta)` se llama a sí misma
-    cuando encuentra un subdirectorio: `recorrer(subruta)` -> caso recursivo.
-    Caso base: cuando no hay subdirectorios o cuando se encuentra un CSV (lo lee).
-    - Manejo de errores: captura excepciones de filesystem dentro del bloque try,
-    y continúa (no interrumpe toda la lectura por un error parcial).
+    Aplica una línea del log sobre el manifiesto en memoria.
+    - "reemplazar": el CSV se reescribió completo; se guarda su nuevo contenido.
+    - "agregar": se agregaron filas al final. Solo se aplica si la firma previa
+      coincide con la del manifiesto; si no, se descarta la entrada y la próxima
+      lectura vuelve a parsear ese archivo.
+    - "borrar": el CSV ya no existe.
     """
-    libros = []
+    ruta = cambio["ruta"]
+    if cambio["op"] == "reemplazar":
+        manifiesto[ruta] = {"firma": cambio["firma"], "campos": cambio["campos"], "filas": cambio["filas"]}
+    elif cambio["op"] == "agregar":
+        entrada = manifiesto.get(ruta)
+        nuevas = cambio["filas"]  # ya vienen en el orden de REQUIRED_FIELDS
+        if cambio["previa"] is None:
+            manifiesto[ruta] = {"firma": cambio["firma"], "campos": list(REQUIRED_FIELDS), "filas": nuevas}
+        elif entrada and entrada["firma"] == cambio["previa"] and entrada["campos"] == REQUIRED_FIELDS:
+            entrada["filas"].extend(nuevas)
+            entrada["firma"] = cambio["firma"]
+        else:
+            manifiesto.pop(ruta, None)
+    elif cambio["op"] == "borrar":
+        manifiesto.pop(ruta, None)
 
-    def recorrer(ruta):
-        try:
-            # Lista los nombres dentro de `ruta` (archivos y carpetas)
-            for elemento in os.listdir(ruta):
-                subruta = os.path.join(ruta, elemento)
-                # Si es un directorio, llamo recursivamente
-                if os.path.isdir(subruta):
-                    recorrer(subruta)  #  llamada recursiva
-                # Si el nombre coincide con CSV_FILE, lo abro y leo sus filas
-                elif elemento == CSV_FILE:
-                    with open(subruta, "r", newline="", encoding="utf-8") as f:
-                        reader = csv.DictReader(f)
-                        for row in reader:
-                            # Añadimos trazabilidad: desde qué archivo proviene este registro
-                            row["_origen"] = subruta
-                            libros.append(row)
-        except Exception:
-            # Ignoramos carpetas inaccesibles o errores puntuales de lectura
-            # Podríamos loguear el error en una solución más robusta.
-            pass
 
-    recorrer(root)  # inicio de la recursión desde la raíz
-    return libros
+def guardar_manifiesto(root, manifiesto):
+    """
+    Escribe la foto completa del manifiesto y vacía el log de cambios.
+    - Se escribe en un temporal y se reemplaza con os.replace (mismo criterio que los CSV).
+    - Si otro proceso agrega líneas al log mientras tanto, se pierden del caché;
+      las firmas hacen que esos CSV simplemente se vuelvan a parsear.
+    - Es un caché: si falla, solo se pierde velocidad, nunca datos.
+    - El temporal se crea con el bloqueo "manifiesto" tomado: limpiar_temporales
+    (que también lo toma) no puede borrarlo antes del os.replace.
+    """
+    destino = os.path.join(root, MANIFIESTO_FILE)
+    temp = _ruta_temporal(destino)
+    # json.dumps usa el codificador en C (json.dump a archivo es mucho más lento)
+    contenido = json.dumps(manifiesto, ensure_ascii=False, separators=(",", ":"))
+    try:
+        with _bloqueo_nombrado(root, "manifiesto"):
+            with open(temp, "w", encoding="utf-8") as f:
+                f.write(contenido)
+            os.replace(temp, destino)
+            log = os.path.join(root, MANIFIESTO_LOG)
+            if os.path.exists(log):
+                os.remove(log)
+        if METRICAS_ACTIVAS:
+            _contar(manifiestos_guardados=1)
+    except OSError:
+        _borrar_si_existe(temp)
 
 
-# --------------------------- MODIFICACIÓN ----------------------------
-def actualizar_libro(root, titulo, nuevo_precio=None, nuevo_anio=None):
+def _registrar_en_manifiesto(root, *cambios):
     """
-    Update: Actualiza precio y/o año de un libro identificado por su título.
-    - Estrategia:
-        1. Recolectar todos los libros con leer_toda_jerarquia(root).
-        2. Buscar el primer libro cuya 'titulo' coincida (case-insensitive).
-        3. Abrir el CSV de origen y reescribirlo en un archivo temporal:
-            - al encontrar la fila correcta (comparando codigo_libro), modificar campos
-            - escribir todas las otras filas tal cual
-        4. Reemplazar el archivo original por el temporal con os.replace (más seguro)
-    - Parámetros:
-        root: ruta raíz
-        titulo: título a buscar (string)
-        nuevo_precio: float o None
-        nuevo_anio: int o None
-    - Observación: si existen múltiples libros con el mismo título, se actualiza
-      el **primer** que se encuentre (la versión principal usa búsqueda por titulo
-    en main.py para seleccionar cuál modificar; aquí se usa la coincidencia directa).
+    Agrega líneas al log del manifiesto (O(1): no reescribe la foto completa).
+    La llaman los escritores (alta, actualizar, eliminar) después de tocar un CSV;
+    la alta masiva pasa todos sus cambios juntos para abrir el log una sola vez.
     """
-    libros = leer_toda_jerarquia(root)
+    try:
+        with _bloqueo_nombrado(root, "manifiesto"), \
+                open(os.path.join(root, MANIFIESTO_LOG), "a", encoding="utf-8") as f:
+            f.writelines(json.dumps(c, ensure_ascii=False, separators=(",", ":")) + "\n" for c in cambios)
+    except OSError:
+        pass
 
-    # Buscamos una coincidencia por título (case-insensitive)
-    encontrado = None
-    for l in libros:
-        if l["titulo"].lower() == titulo.lower():
-            encontrado = l
-            break
 
-    if not encontrado:
-        print(" Libro no encontrado.")
-        return
+def _registrar_reescritura(root, origen, campos, filas, registrar=True):
+    """
+    Registra en el manifiesto el contenido completo de un CSV recién reescrito.
+    Con registrar=False solo devuelve el cambio (para escribir varios juntos).
+    """
+    cambio = {
+        "op": "reemplazar",
+        "ruta": os.path.relpath(origen, root),
+        "firma": _firma(origen),
+        "campos": list(campos),
+        "filas": filas,
+    }
+    if registrar:
+        _registrar_en_manifiesto(root, cambio)
+    return cambio
 
-    origen = encontrado["_origen"]  # path del CSV donde está la fila a modificar
 
+def _texto_csv(valor):
+    """Convierte un valor al texto que quedará en el CSV (como lo hace csv.DictWriter)."""
+    return "" if valor is None else str(valor)
+
+
+# --------------------------- ÍNDICES SECUNDARIOS ---------------------
+def _cubeta(clave):
+    """Devuelve el nombre de la cubeta ("00".."ff") donde se guarda `clave`."""
+    return f"{zlib.crc32(clave.encode('utf-8')) % INDICE_CUBETAS:02x}"
+
+
+def _ruta_cubeta(root, tipo, cubeta):
+    return os.path.join(root, INDICES_DIR, tipo, cubeta + ".json")
+
+
+def _leer_cubeta(root, tipo, cubeta):
+    """Lee una cubeta del índice `tipo`; si no existe o está dañada devuelve {}."""
     try:
-        temp = origen + ".tmp"
-        # Abrimos archivo original para leer y temp para escribir
-        with open(origen, "r", newline="", encoding="utf-8") as infile, \
-            open(temp, "w", newline="", encoding="utf-8") as outfile:
-            reader = csv.DictReader(infile)
-            writer = csv.DictWriter(outfile, fieldnames=reader.fieldnames)
-            writer.writeheader()
-            for row in reader:
-                # Identificamos la fila mediante codigo_libro (único)
-                if row["codigo_libro"] == encontrado["codigo_libro"]:
-                    # Aplicamos cambios solo a las columnas permitidas
-                    if nuevo_precio:
-                        row["precio"] = nuevo_precio
-                    if nuevo_anio:
-                        row["anio"] = nuevo_anio
-                # Escribimos la fila (modificada o no)
-                writer.writerow(row)
-        # Reemplazo atómico del CSV original por el temp (reduce ventana de corrupción)
-        os.replace(temp, origen)
-        print(" Libro actualizado correctamente.")
-    except Exception as e:
-        # Si ocurre un error, intentamos no dejar temp suelto (podríamos eliminarlo)
-        print(f"Error al actualizar el libro: {e}")
+        with open(_ruta_cubeta(root, tipo, cubeta), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
 
 
-# --------------------------- ELIMINACIÓN ------------------------------
-def eliminar_libro(root, titulo):
+def _guardar_cubeta(root, tipo, cubeta, datos):
+    """Escribe una cubeta con el patrón temporal + os.replace."""
+    destino = _ruta_cubeta(root, tipo, cubeta)
+    os.makedirs(os.path.dirname(destino), exist_ok=True)
+    temp = _ruta_temporal(destino)
+    with open(temp, "w", encoding="utf-8") as f:
+        f.write(json.dumps(datos, ensure_ascii=False, separators=(",", ":")))
+    os.replace(temp, destino)
+    if METRICAS_ACTIVAS:
+        _contar(cubetas_indice_escritas=1)
+
+
+def _normalizar_titulo(titulo):
+    return titulo.strip().lower()
+
+
+def indices_existentes(root):
     """
-    Delete: Elimina un libro buscándolo por título (coincidencia parcial).
-    - Paso 1: obtener todos los libros.
-    - Paso 2: filtrar aquellos cuyo título contiene la cadena `titulo` (case-insensitive).
-    - Si hay múltiples coincidencias, pide al usuario seleccionar cuál eliminar.
-    - Antes de borrar pregunta confirmación 's'/'n'.
-    - Reescribe el CSV de origen sin la fila eliminada (mismo patrón que en actualizar).
-    - Parámetros:
-        root: ruta raíz
-        titulo: cadena para buscar en 'titulo' de cada registro
+    Indica si los índices de `root` ya fueron construidos. Se mira el índice de
+    trigramas (el último que escribe reconstruir_indices): los índices de
+    versiones anteriores, sin él, se reconstruyen completos al primer uso.
     """
-    libros = leer_toda_jerarquia(root)
-    encontrados = [l for l in libros if titulo.lower() in l["titulo"].lower()]
+    return os.path.isdir(os.path.join(root, INDICES_DIR, "trigramas"))
 
-    if not encontrados:
-        print(" No se encontraron libros con ese título.")
+
+def _asegurar_indices(root):
+    """Construye los índices la primera vez que se necesitan (bibliotecas previas a esta versión)."""
+    if not indices_existentes(root):
+        with _bloqueo_nombrado(root, "indices"):
+            if not indices_existentes(root):  # otro proceso pudo construirlos mientras esperábamos
+                reconstruir_indices(root)
+
+
+def _invalidar_indices(root):
+    """
+    Descarta los índices (por ejemplo si no se pudo indexar un libro ya guardado):
+    _asegurar_indices los reconstruye completos en la próxima consulta.
+    Primero se borra la carpeta de trigramas, que es la que mira indices_existentes.
+    """
+    carpeta = os.path.join(root, INDICES_DIR)
+    with _bloqueo_nombrado(root, "indices"):
+        shutil.rmtree(os.path.join(carpeta, "trigramas"), ignore_errors=True)
+        shutil.rmtree(carpeta, ignore_errors=True)
+
+
+def indexar_libro(root, codigo, titulo, autor, csv_path):
+    """
+    Registra un libro nuevo en los índices (lo llama alta_libro).
+    - Si los índices todavía no existen no hace nada: se construirán completos
+    (incluyendo este libro) la primera vez que se consulten.
+    """
+    indexar_libros(root, [(codigo, titulo, autor, csv_path)])
+
+
+def indexar_libros(root, libros):
+    """
+    Registra varios libros a la vez: libros es una lista de (codigo, titulo, autor, csv_path).
+    Agrupa por cubeta, así cada archivo del índice se lee y escribe una sola vez.
+    El índice de trigramas solo cambia con los títulos y autores que aparecen por
+    primera vez (los repetidos ya están).
+    Toma el bloqueo de los índices (lectura-modificación-escritura de cada cubeta).
+    """
+    if not libros or not indices_existentes(root):
         return
+    with _bloqueo_nombrado(root, "indices"):
+        _indexar_libros(root, libros)
 
-    # Si hay varias coincidencias, mostramos opciones para seleccionar
-    if len(encontrados) > 1:
-        print("\nSe encontraron varios libros con ese título:")
-        for i, l in enumerate(encontrados, start=1):
-            print(f"{i}. {l['titulo']} - {l['autor']} ({l['genero']}) - {l['anio']}")
-        indice = input("Seleccione el número del libro a eliminar: ").strip()
-        if not indice.isdigit() or not (1 <= int(indice) <= len(encontrados)):
-            print("Selección inválida.")
-            return
-        encontrado = encontrados[int(indice) - 1]
-    else:
-        encontrado = encontrados[0]
 
-    origen = encontrado["_origen"]
+def _indexar_libros(root, libros):
+    por_codigo = {}
+    por_clave = {campo: {} for campo in CAMPOS_BUSQUEDA}  # campo -> cubeta -> [(clave, codigo)]
+    for codigo, titulo, autor, csv_path in libros:
+        por_codigo.setdefault(_cubeta(codigo), []).append((codigo, os.path.relpath(csv_path, root)))
+        for campo, valor in (("titulo", titulo), ("autor", autor)):
+            clave = _normalizar_titulo(valor or "")
+            por_clave[campo].setdefault(_cubeta(clave), []).append((clave, codigo))
 
-    # Confirmación del usuario antes de eliminar
-    confirm = input(f"¿Seguro que desea eliminar '{encontrado['titulo']}'? (s/n): ").lower()
-    if confirm != "s":
-        print("Operación cancelada.")
+    for cubeta, entradas in por_codigo.items():
+        codigos = _leer_cubeta(root, "codigos", cubeta)
+        codigos.update(entradas)
+        _guardar_cubeta(root, "codigos", cubeta, codigos)
+    nuevos = []  # (campo, clave) que no estaban: van al índice de trigramas
+    for campo, cubetas in por_clave.items():
+        tipo = INDICE_DE_CAMPO[campo]
+        for cubeta, entradas in cubetas.items():
+            claves = _leer_cubeta(root, tipo, cubeta)
+            for clave, codigo in entradas:
+                lista = claves.setdefault(clave, [])
+                if not lista:
+                    nuevos.append((campo, clave))
+                if codigo not in lista:  # ya puede estar si los índices se reconstruyeron recién
+                    lista.append(codigo)
+            _guardar_cubeta(root, tipo, cubeta, claves)
+    _actualizar_trigramas(root, nuevos, agregar=True)
+
+
+def desindexar_libro(root, codigo, titulo, autor):
+    """Quita un libro de los índices (lo llaman las bajas)."""
+    desindexar_libros(root, [(codigo, titulo, autor)])
+
+
+def desindexar_libros(root, libros):
+    """
+    Quita varios libros de los índices: libros es una lista de (codigo, titulo, autor).
+    Igual que indexar_libros, cada cubeta se lee y escribe una sola vez; un
+    título o autor sale del índice de trigramas cuando ya no le quedan libros.
+    (Los journals de versiones anteriores traen (codigo, titulo): sin autor, el
+    índice de autores se corrige con verificar_indices.)
+    """
+    if not libros or not indices_existentes(root):
         return
+    with _bloqueo_nombrado(root, "indices"):
+        _desindexar_libros(root, libros)
 
-    try:
-        temp = origen + ".tmp"
-        with open(origen, "r", newline="", encoding="utf-8") as infile, \
-            open(temp, "w", newline="", encoding="utf-8") as outfile:
-            reader = csv.DictReader(infile)
-            writer = csv.DictWriter(outfile, fieldnames=reader.fieldnames)
-            writer.writeheader()
-            for row in reader:
-                # Escribimos todas las filas excepto la que queremos eliminar
-                if row["codigo_libro"] != encontrado["codigo_libro"]:
-                    writer.writerow(row)
-        os.replace(temp, origen)
-        print(" Libro eliminado correctamente.")
-    except Exception as e:
-        print(f"Error al eliminar el libro: {e}")
 
+def _desindexar_libros(root, libros):
+    por_codigo = {}
+    por_clave = {campo: {} for campo in CAMPOS_BUSQUEDA}
+    for codigo, titulo, *resto in libros:
+        por_codigo.setdefault(_cubeta(codigo), []).append(codigo)
+        for campo, valor in zip(CAMPOS_BUSQUEDA, [titulo] + resto):
+            clave = _normalizar_titulo(valor or "")
+            por_clave[campo].setdefault(_cubeta(clave), []).append((clave, codigo))
 
-# --------------------------- ORDENAMIENTO Y ESTADÍSTICAS -------------
-def ordenar_libros(libros, clave):
+    for cubeta, lista in por_codigo.items():
+        codigos = _leer_cubeta(root, "codigos", cubeta)
+        quitados = [c for c in lista if codigos.pop(c, None) is not None]
+        if quitados:
+            _guardar_cubeta(root, "codigos", cubeta, codigos)
+    vacios = []  # (campo, clave) sin libros: salen del índice de trigramas
+    for campo, cubetas in por_clave.items():
+        tipo = INDICE_DE_CAMPO[campo]
+        for cubeta, lista in cubetas.items():
+            claves = _leer_cubeta(root, tipo, cubeta)
+            cambio = False
+            for clave, codigo in lista:
+                if codigo in claves.get(clave, []):
+                    claves[clave].remove(codigo)
+                    if not claves[clave]:
+                        del claves[clave]
+                        vacios.append((campo, clave))
+                    cambio = True
+            if cambio:
+                _guardar_cubeta(root, tipo, cubeta, claves)
+    _actualizar_trigramas(root, vacios, agregar=False)
+
+
+def _actualizar_trigramas(root, terminos, agregar):
     """
-    Ordena una lista de libros por `clave`.
-    - Intenta convertir la clave a float para orden numérico (ej. 'precio', 'anio').
-    - Si falla (campo no numérico), ordena lexicográficamente (case-insensitive).
-    - Retorna una lista nueva ordenada; no modifica la original.
+    Anota en TRIGRAMAS_LOG los términos (campo, clave) nuevos (agregar=True) o
+    que se quedaron sin libros; las búsquedas aplican el log sobre las cubetas.
+    Si el log pasa TRIGRAMAS_LOG_MAXIMO bytes, se vuelca. Se llama con el
+    bloqueo de los índices tomado.
     """
+    if not terminos:
+        return
+    ruta = os.path.join(root, INDICES_DIR, TRIGRAMAS_LOG)
+    with open(ruta, "a", encoding="utf-8") as f:
+        f.write(json.dumps({"agregar": agregar, "terminos": terminos}, ensure_ascii=False,
+                           separators=(",", ":")) + "\n")
+    if os.path.getsize(ruta) > TRIGRAMAS_LOG_MAXIMO:
+        _volcar_log_trigramas(root)
+
+
+def _leer_log_trigramas(root):
+    """Cambios pendientes del log: {(campo, clave): True (agregado) / False (quitado)}, el último manda."""
+    pendientes = {}
     try:
-        return sorted(libros, key=lambda x: float(x.get(clave, 0)))
-    except Exception:
-        return sorted(libros, key=lambda x: x.get(clave, "").lower())
+        with open(os.path.join(root, INDICES_DIR, TRIGRAMAS_LOG), "r", encoding="utf-8") as f:
+            for linea in f:
+                try:
+                    cambio = json.loads(linea)
+                except ValueError:
+                    continue  # línea cortada por una interrupción
+                for campo, clave in cambio["terminos"]:
+                    pendientes[campo, clave] = cambio["agregar"]
+    except OSError:
+        pass
+    return pendientes
 
 
-def estadisticas(libros):
+def _volcar_log_trigramas(root):
     """
-    Calcula y muestra estadísticas básicas sobre la lista `libros`.
-    - Calcula: total, mínimo, máximo y promedio de 'precio'.
-    - Si no hay precios validables, muestra un mensaje y retorna.
-    - No devuelve estructura; imprime en consola (fácil de adaptar si se necesita retorno).
+    Aplica el log a las cubetas de trigramas (cada una se lee y escribe una sola
+    vez) y lo borra. Volver a aplicarlo no cambia nada, así que un corte en el
+    medio no deja el índice mal. Se llama con el bloqueo de los índices tomado.
     """
-    precios = [float(l["precio"]) for l in libros if l.get("precio")]
-    if not precios:
-        print("No hay precios cargados para calcular estadísticas.")
-        return
-    print(f"Total de libros: {len(libros)}")
-    print(f"Precio mínimo: ${min(precios):.2f}")
-    print(f"Precio máximo: ${max(precios):.2f}")
-    print(f"Promedio de precios: ${sum(precios)/len(precios):.2f}")
+    por_cubeta = {}  # cubeta -> (trigrama, campo) -> {clave: agregar}
+    for (campo, clave), agregar in _leer_log_trigramas(root).items():
+        for trigrama in _trigramas_termino(clave):
+            por_cubeta.setdefault(_cubeta(trigrama), {}).setdefault((trigrama, campo), {})[clave] = agregar
+    for cubeta, cambios in por_cubeta.items():
+        trigramas = _leer_cubeta(root, "trigramas", cubeta)
+        for (trigrama, campo), claves in cambios.items():
+            listas = trigramas.setdefault(trigrama, {})
+            lista = [c for c in listas.get(campo, []) if claves.get(c, True)]
+            presentes = set(lista)
+            lista.extend(c for c, agregar in claves.items() if agregar and c not in presentes)
+            if lista:
+                listas[campo] = lista
+            else:
+                listas.pop(campo, None)
+            if not listas:
+                del trigramas[trigrama]
+        _guardar_cubeta(root, "trigramas", cubeta, trigramas)
+    _borrar_si_existe(os.path.join(root, INDICES_DIR, TRIGRAMAS_LOG))
 
 
-# --------------------------- FILTRO ----------------------------------
-def filtrar_libros(libros, atributo, valor):
+def ubicar_codigo(root, codigo):
+    """Devuelve la ruta del CSV que contiene `codigo`, o None si no está indexado."""
+    _asegurar_indices(root)
+    relativa = _leer_cubeta(root, "codigos", _cubeta(codigo)).get(codigo)
+    return os.path.join(root, relativa) if relativa else None
+
+
+@_medido
+def ubicar_codigos(root, codigos):
     """
-    Filtra la lista `libros` por `atributo == valor` (comparación case-insensitive).
-    - Parámetros:
-        libros: lista de diccionarios (resultado de leer_toda_jerarquia)
-        atributo: nombre de la columna (ej. 'genero', 'autor', 'anio')
-        valor: valor buscado (string)
-    - Retorna: lista con coincidencias (puede estar vacía).
-    - Imprime mensaje si no encuentra coincidencias.
+    Versión en lote de ubicar_codigo: devuelve {codigo: ruta del CSV} de los códigos
+    indexados, leyendo cada cubeta del índice una sola vez.
     """
-    resultado = []
-    for l in libros:
-        if str(l.get(atributo, "")).lower() == str(valor).lower():
-            resultado.append(l)
-    if not resultado:
-        print(f"No se encontraron libros con {atributo} = {valor}.")
-    return resultado
+    _asegurar_indices(root)
+    cubetas = {}
+    ubicados = {}
+    for codigo in codigos:
+        cubeta = _cubeta(codigo)
+        if cubeta not in cubetas:
+            cubetas[cubeta] = _leer_cubeta(root, "codigos", cubeta)
+        relativa = cubetas[cubeta].get(codigo)
+        if relativa:
+            ubicados[codigo] = os.path.join(root, relativa)
+    return ubicados
+
+
+@_medido
+@_con_backend
+def codigos_por_titulo(root, titulo):
+    """Devuelve los codigo_libro cuyo título coincide exactamente (case-insensitive)."""
+    _asegurar_indices(root)
+    clave = _normalizar_titulo(titulo)
+    return list(_leer_cubeta(root, "titulos", _cubeta(clave)).get(clave, []))
+
+
+@_medido
+@_con_backend
+def codigos_por_titulo_parcial(root, texto):
+    """
+    Devuelve los codigo_libro cuyo título contiene `texto` (sin distinguir
+    mayúsculas ni tildes), usando el índice de trigramas (ver buscar_libros):
+    sin abrir ningún CSV ni recorrer todos los títulos.
+    """
+    return [r["codigo_libro"] for r in buscar_libros(root, texto, ("titulo",))]
+
+
+# --------------------------- BÚSQUEDA POR TRIGRAMAS ------------------
+# Un trigrama es una secuencia de 3 caracteres del texto "plegado" (minúsculas,
+# sin tildes). Cada título y autor distinto se registra en el índice
+# "trigramas" bajo todos sus trigramas:
+# - los del texto tal cual: cualquier texto que contenga la consulta tiene todos
+#   los trigramas de la consulta, así que intersecar sus listas da los candidatos
+#   de una búsqueda por subcadena;
+# - los de cada palabra con dos espacios antes y uno después (como pg_trgm):
+#   dos palabras que difieren en una letra comparten la mayoría, y la parte de
+#   los trigramas de la consulta que tiene un término es su similitud.
+CAMPOS_BUSQUEDA = ("titulo", "autor")
+INDICE_DE_CAMPO = {"titulo": "titulos", "autor": "autores"}
+SIMILITUD_MINIMA = 0.4
+
+
+def _plegar(texto):
+    """Forma de comparar en las búsquedas: minúsculas, sin tildes y un solo espacio entre palabras."""
+    if texto.isascii():  # caso común: no hay tildes que quitar
+        return " ".join(texto.lower().split())
+    texto = unicodedata.normalize("NFKD", texto.lower())
+    return " ".join("".join(c for c in texto if not unicodedata.combining(c)).split())
+
+
+def _trigramas_subcadena(plegado):
+    """Trigramas del texto tal cual (los tiene cualquier texto que lo contenga)."""
+    return {plegado[i:i + 3] for i in range(len(plegado) - 2)}
+
+
+def _trigramas_palabras(plegado):
+    """Trigramas de cada palabra, con "  " antes y " " después (base de la similitud)."""
+    trigramas = set()
+    for palabra in plegado.split():
+        palabra = f"  {palabra} "
+        trigramas.update(palabra[i:i + 3] for i in range(len(palabra) - 2))
+    return trigramas
+
+
+def _trigramas_termino(clave):
+    """Trigramas con los que se registra un título o autor en el índice."""
+    plegado = _plegar(clave)
+    return _trigramas_subcadena(plegado) | _trigramas_palabras(plegado)
+
+
+def _rankear_terminos(texto, terminos, difuso=False, similitud_minima=SIMILITUD_MINIMA, limite=None):
+    """
+    Compara `texto` con los términos candidatos [(campo, clave), ...].
+    - Los que contienen el texto (plegado) tienen similitud 1.0.
+    - Con difuso=True, también los demás cuya similitud (parte de los trigramas
+    por palabra de la consulta que tiene el término) llega a `similitud_minima`.
+    - terminos también puede ser {(campo, clave): cota}, con una cota superior de
+    la similitud de cada uno: se comparan de mayor a menor cota y, con `limite`,
+    se termina cuando ningún candidato restante puede entrar entre los `limite`
+    mejores (el resultado tiene al menos esos).
+    - Retorna [(similitud, campo, clave)] de mayor a menor similitud; los empates
+    se ordenan por parecido total (coeficiente de Dice: los más cortos primero).
+    Lo usan los dos backends: solo cambia de dónde salen los candidatos.
+    """
+    consulta = _plegar(texto)
+    if not consulta:
+        return []
+    buscados = _trigramas_palabras(consulta)
+    if isinstance(terminos, dict):
+        terminos = sorted(terminos.items(), key=lambda t: -t[1])
+    else:
+        terminos = [(termino, 1.0) for termino in terminos]
+    puntuados = []
+    mejores = []  # montículo con las `limite` mejores similitudes
+    for (campo, clave), cota in terminos:
+        if limite is not None and len(mejores) >= limite and cota < mejores[0]:
+            break
+        plegado = _plegar(clave)
+        propios = _trigramas_palabras(plegado)
+        comunes = len(buscados & propios)
+        if consulta in plegado:
+            similitud = 1.0
+        elif difuso and comunes / len(buscados) >= similitud_minima:
+            similitud = comunes / len(buscados)
+        else:
+            continue
+        dice = 2 * comunes / (len(buscados) + len(propios))
+        puntuados.append((similitud, dice, campo, clave))
+        if limite is not None:
+            (heapq.heappush if len(mejores) < limite else heapq.heappushpop)(mejores, similitud)
+    puntuados.sort(key=lambda p: (-p[0], -p[1], p[3]))
+    return [(round(similitud, 3), campo, clave) for similitud, _, campo, clave in puntuados]
+
+
+def _candidatos_trigramas(root, consulta, campos, difuso, similitud_minima):
+    """
+    Términos que pueden coincidir con `consulta` (ya plegada), leyendo solo las
+    cubetas de sus trigramas. Retorna {(campo, clave): cota de la similitud}
+    (la parte de los trigramas de la consulta que aparece en su lista); los
+    confirma _rankear_terminos.
+    - Los términos del log todavía no volcado se agregan como candidatos (con
+    cota 1: se comparan todos) o se descartan si se quedaron sin libros.
+    """
+    cubetas = {}
+
+    def listas(trigrama):
+        cubeta = _cubeta(trigrama)
+        if cubeta not in cubetas:
+            cubetas[cubeta] = _leer_cubeta(root, "trigramas", cubeta)
+        return cubetas[cubeta].get(trigrama, {})
+
+    candidatos = {}
+    subcadena = _trigramas_subcadena(consulta)
+    for campo in campos:
+        if subcadena:
+            # Intersección de las listas de todos los trigramas, empezando por la más corta
+            por_trigrama = sorted((listas(t).get(campo, []) for t in subcadena), key=len)
+            comunes = set(por_trigrama[0])
+            for lista in por_trigrama[1:]:
+                if not comunes:
+                    break
+                comunes.intersection_update(lista)
+            candidatos.update(((campo, clave), 1.0) for clave in comunes)
+        else:
+            # Consulta de una o dos letras: no tiene trigramas propios, se recorren las claves
+            for n in range(INDICE_CUBETAS):
+                candidatos.update(((campo, clave), 1.0) for clave in _leer_cubeta(root, INDICE_DE_CAMPO[campo],
+                                                                                    f"{n:02x}")
+                                  if consulta in _plegar(clave))
+        if difuso:
+            # Cuántos trigramas de la consulta tiene cada término: sin llegar al mínimo no puede alcanzar la similitud
+            buscados = _trigramas_palabras(consulta)
+            cuenta = {}
+            for trigrama in buscados:
+                for clave in listas(trigrama).get(campo, []):
+                    cuenta[clave] = cuenta.get(clave, 0) + 1
+            minimo = similitud_minima * len(buscados)
+            for clave, n in cuenta.items():
+                if n >= minimo:
+                    candidatos.setdefault((campo, clave), min(1.0, n / len(buscados)))
+    for (campo, clave), agregado in _leer_log_trigramas(root).items():
+        if campo in campos:
+            if agregado:
+                candidatos[campo, clave] = 1.0
+            else:
+                candidatos.pop((campo, clave), None)
+    return candidatos
+
+
+@_medido
+@_con_backend
+def buscar_libros(root, texto, campos=CAMPOS_BUSQUEDA, difuso=False, similitud_minima=SIMILITUD_MINIMA,
+                  limite=None):
+    """
+    Busca libros por título y/o autor con el índice de trigramas, sin recorrer la biblioteca.
+    - Sin distinguir mayúsculas ni tildes: "cancion" encuentra "Canción".
+    - Siempre devuelve los libros cuyo título/autor contiene `texto` (similitud 1.0).
+    - difuso=True: además los parecidos, tolerando errores de tipeo ("tolkein",
+    "señor de los anilos"), con similitud entre similitud_minima y 1.
+    - campos: ("titulo",), ("autor",) o ambos.
+    - Retorna hasta `limite` resultados {"codigo_libro", "campo", "termino",
+    "similitud"}, del más parecido al menos parecido; un libro aparece una vez
+    (con su mejor coincidencia). "termino" es el título o autor en minúsculas.
+    - Lee solo las cubetas de los trigramas de la consulta y las de los términos
+    encontrados (para pasar a codigo_libro); no abre ningún CSV.
+    """
+    campos = tuple(campos)
+    for campo in campos:
+        if campo not in CAMPOS_BUSQUEDA:
+            raise ValueError(f"Solo se puede buscar por {', '.join(CAMPOS_BUSQUEDA)}: {campo}")
+    consulta = _plegar(texto)
+    if not consulta:
+        return []
+    _asegurar_indices(root)
+    terminos = _rankear_terminos(texto, _candidatos_trigramas(root, consulta, campos, difuso, similitud_minima),
+                                 difuso, similitud_minima, limite)
+    cubetas = {}
+    resultados = []
+    vistos = set()
+    for similitud, campo, clave in terminos:
+        tipo, cubeta = INDICE_DE_CAMPO[campo], _cubeta(clave)
+        if (tipo, cubeta) not in cubetas:
+            cubetas[tipo, cubeta] = _leer_cubeta(root, tipo, cubeta)
+        for codigo in cubetas[tipo, cubeta].get(clave, []):
+            if codigo not in vistos:
+                vistos.add(codigo)
+                resultados.append({"codigo_libro": codigo, "campo": campo, "termino": clave,
+                                   "similitud": similitud})
+        if limite is not None and len(resultados) >= limite:
+            break
+    return resultados[:limite]
+
+
+def _version_fila(libro):
+    """
+    Versión de un libro para la concurrencia optimista: un hash corto (texto) de
+    sus columnas. Cambia solo si cambia esa fila, no por altas o modificaciones de
+    otros libros del mismo CSV.
+    """
+    contenido = "\x1f".join(str(libro.get(campo) or "") for campo in REQUIRED_FIELDS)
+    return hashlib.blake2b(contenido.encode("utf-8"), digest_size=8).hexdigest()
+
+
+@_medido
+@_con_backend
+def leer_libros_por_codigo(root, codigos):
+    """
+    Devuelve los libros (diccionarios con "_origen") de la lista `codigos`,
+    abriendo solo los CSV que los contienen (una vez por archivo).
+    - Cada libro lleva además "_version" (ver _version_fila). Pasándola a
+    actualizar_por_codigo / eliminar_por_codigo (o en `versiones` de
+    aplicar_lote), el cambio se rechaza si otro proceso modificó ese libro.
+    """
+    por_archivo = {}
+    for codigo in codigos:
+        ruta = ubicar_codigo(root, codigo)
+        if ruta:
+            por_archivo.setdefault(ruta, set()).add(codigo)
+
+    encontrados = {}
+    for ruta, buscados in por_archivo.items():
+        for row in _leer_filas_de(ruta, buscados):
+            row["_origen"] = ruta
+            row["_version"] = _version_fila(row)
+            encontrados[row["codigo_libro"]] = row
+    return [encontrados[c] for c in codigos if c in encontrados]
+
+
+def _leer_filas_de(ruta, buscados):
+    """Filas de `ruta` cuyo código está en `buscados` (ninguna si no se puede leer)."""
+    encontradas = []
+    try:
+        with open(ruta, "r", newline="", encoding="utf-8") as f:
+            filas = 0
+            for row in csv.DictReader(f):
+                filas += 1
+                if row.get("codigo_libro") in buscados:
+                    encontradas.append(row)
+            if METRICAS_ACTIVAS:
+                _contar(csv_leidos=1, filas_leidas=filas, bytes_leidos=os.fstat(f.fileno()).st_size)
+    except OSError:
+        return []
+    return encontradas
+
+
+def _indices_desde_libros(root, libros):
+    """
+    Arma en memoria las cubetas de todos los índices a partir de una lista de libros.
+    Retorna {tipo: {cubeta: datos}}, con "trigramas" al final.
+    """
+    indices = {tipo: {f"{n:02x}": {} for n in range(INDICE_CUBETAS)}
+               for tipo in ("codigos", "titulos", "autores", "trigramas")}
+    for l in libros:
+        codigo = l.get("codigo_libro")
+        if not codigo:
+            continue
+        indices["codigos"][_cubeta(codigo)][codigo] = os.path.relpath(l["_origen"], root)
+        for campo in CAMPOS_BUSQUEDA:
+            clave = _normalizar_titulo(l.get(campo) or "")
+            indices[INDICE_DE_CAMPO[campo]][_cubeta(clave)].setdefault(clave, []).append(codigo)
+    trigramas = indices["trigramas"]
+    for campo in CAMPOS_BUSQUEDA:
+        for cubeta in indices[INDICE_DE_CAMPO[campo]].values():
+            for clave in cubeta:
+                for trigrama in _trigramas_termino(clave):
+                    trigramas[_cubeta(trigrama)].setdefault(trigrama, {}).setdefault(campo, []).append(clave)
+    return indices
+
+
+@_medido
+@_con_backend
+def reconstruir_indices(root):
+    """
+    Reconstruye todos los índices desde cero con una lectura completa (recuperación).
+    Retorna la cantidad de libros indexados.
+    """
+    with _bloqueo_nombrado(root, "indices"):
+        libros = leer_toda_jerarquia(root)
+        for tipo, cubetas in _indices_desde_libros(root, libros).items():
+            for cubeta, datos in cubetas.items():
+                _guardar_cubeta(root, tipo, cubeta, datos)
+        _borrar_si_existe(os.path.join(root, INDICES_DIR, TRIGRAMAS_LOG))  # ya incluido
+    return len(libros)
+
+
+@_medido
+@_con_backend
+def verificar_indices(root, reparar=False):
+    """
+    Compara los índices guardados con una lectura completa de la biblioteca.
+    - Retorna un diccionario con listas de codigo_libro:
+        "faltantes": están en los CSV pero no en el índice
+        "sobrantes": están en el índice pero no en los CSV
+        "ruta_incorrecta": el índice apunta a otro archivo
+        "titulos": códigos mal registrados en el índice de títulos
+        "autores": códigos mal registrados en el índice de autores
+      y en "trigramas" los términos ("campo:clave") mal registrados en el
+      índice de trigramas.
+    - Con reparar=True, si hay diferencias reconstruye los índices.
+    """
+    if os.path.exists(os.path.join(root, INDICES_DIR, TRIGRAMAS_LOG)):
+        with _bloqueo_nombrado(root, "indices"):
+            _volcar_log_trigramas(root)  # se comparan las cubetas con el log ya aplicado
+    libros = leer_toda_jerarquia(root)
+    esperados = _indices_desde_libros(root, libros)
+    problemas = {"faltantes": [], "sobrantes": [], "ruta_incorrecta": [], "titulos": [], "autores": [],
+                 "trigramas": []}
+
+    for cubeta, esperado in esperados["codigos"].items():
+        actual = _leer_cubeta(root, "codigos", cubeta)
+        for codigo, ruta in esperado.items():
+            if codigo not in actual:
+                problemas["faltantes"].append(codigo)
+            elif actual[codigo] != ruta:
+                problemas["ruta_incorrecta"].append(codigo)
+        problemas["sobrantes"].extend(c for c in actual if c not in esperado)
+
+    for tipo in ("titulos", "autores"):
+        for cubeta, esperado in esperados[tipo].items():
+            actual = _leer_cubeta(root, tipo, cubeta)
+            for clave in set(esperado) | set(actual):
+                diferencia = set(esperado.get(clave, [])) ^ set(actual.get(clave, []))
+                problemas[tipo].extend(sorted(diferencia))
+
+    mal = set()
+    for cubeta, esperado in esperados["trigramas"].items():
+        actual = _leer_cubeta(root, "trigramas", cubeta)
+        for trigrama in set(esperado) | set(actual):
+            for campo in CAMPOS_BUSQUEDA:
+                diferencia = (set(esperado.get(trigrama, {}).get(campo, []))
+                              ^ set(actual.get(trigrama, {}).get(campo, [])))
+                mal.update(f"{campo}:{clave}" for clave in diferencia)
+    problemas["trigramas"] = sorted(mal)
+
+    if reparar and any(problemas.values()):
+        reconstruir_indices(root)
+    return problemas
+
+
+# --------------------------- CRUD: ALTA ------------------------------
+def nivel_fragmentacion(root):
+    """Nivel de fragmentación elegido al compactar: "titulo" (por defecto), "autor" o "genero"."""
+    try:
+        with open(os.path.join(root, FRAGMENTACION_FILE), "r", encoding="utf-8") as f:
+            nivel = json.load(f).get("nivel")
+    except (OSError, ValueError, AttributeError):
+        return "titulo"
+    return nivel if nivel in NIVELES_FRAGMENTACION else "titulo"
+
+
+def _ruta_csv(root, genero, autor, titulo):
+    """
+    CSV donde se agregan los libros de genero/autor/titulo.
+    - Si ya existe el CSV del género (root/genero/libros.csv) o del autor
+    (root/genero/autor/libros.csv), se usa ese: la biblioteca (o esa parte) está
+    fragmentada.
+    - Si no, el del nivel de nivel_fragmentacion(root); normalmente el del título.
+    """
+    por_genero = os.path.join(root, genero, CSV_FILE)
+    if os.path.exists(por_genero):
+        return por_genero
+    por_autor = os.path.join(root, genero, autor, CSV_FILE)
+    if os.path.exists(por_autor):
+        return por_autor
+    nivel = nivel_fragmentacion(root)
+    if nivel == "genero":
+        return por_genero
+    if nivel == "autor":
+        return por_autor
+    return os.path.join(root, genero, autor, titulo, CSV_FILE)
+
+
+@_medido
+@_con_backend
+def alta_libro(root, genero, autor, titulo, precio, anio):
+    """
+    Alta (Create): agrega un libro en la jerarquía Género/Autor/Título.
+    - Construye la ruta: root/genero/autor/titulo (o el CSV del autor o del género
+      si la biblioteca está fragmentada, ver _ruta_csv)
+    - Crea carpetas si hace falta con os.makedirs(..., exist_ok=True)
+    - Genera un codigo_libro único con uuid.uuid4() -> string
+    - Abre (append) CSV_FILE en esa carpeta y escribe una fila con los campos REQUIRED_FIELDS.
+    - Usa `with open(...)` para manejo seguro de archivos.
+    - Parámetros:
+        root: carpeta raíz donde se guardan datos
+        genero, autor, titulo: strings (deben validarse antes)
+        precio: número (float) validado por validar_numero
+        anio: entero validado por validar_anio
+    - Manejo de errores: captura Exception general y muestra mensaje; no propaga.
+    Si el libro se guardó pero no se pudo indexar, el alta igual es exitosa: los
+    índices se descartan y se reconstruyen en la próxima consulta.
+    - Retorna el codigo_libro asignado (None si no se pudo guardar).
+    """
+    # Construcción de la ruta jerárquica
+    csv_path = _ruta_csv(root, genero, autor, titulo)
+    os.makedirs(os.path.dirname(csv_path), exist_ok=True)  # crea carpetas si no existen
+
+    codigo_libro = str(uuid.uuid4())  # identificador único (UUID)
+
+    # Diccionario con la información a escribir en el CSV
+    nuevo = {
+        "codigo_libro": codigo_libro,
+        "titulo": titulo,
+        "autor": autor,
+        "genero": genero,
+        "precio": precio,
+        "anio": anio,
+    }
+
+    try:
+        _agregar_filas_csv(root, csv_path, [[_texto_csv(nuevo[c]) for c in REQUIRED_FIELDS]])
+    except Exception as e:
+        # Aquí podríamos diferenciar tipos de excepción (IOError, OSError), pero
+        # un mensaje general es suficiente para un proyecto académico.
+        print(f"Error al guardar el libro: {e}")
+        return None
+    # El libro ya está en el CSV: un error al indexar no debe hacer pensar que
+    # falló el alta (reintentarla crearía un duplicado).
+    try:
+        indexar_libro(root, codigo_libro, titulo, autor, csv_path)
+    except Exception:
+        _invalidar_indices(root)
+    print(" Libro agregado correctamente.")
+    return codigo_libro
+
+
+def _agregar_filas_csv(root, csv_path, filas, registrar=True):
+    """
+    Agrega `filas` (listas de strings en el orden de REQUIRED_FIELDS) al final de
+    `csv_path` con una sola apertura del archivo.
+    - Si el CSV no existe (o está vacío) escribe primero la cabecera.
+    - Registra las filas en el manifiesto para que la próxima lectura no re-parsee el CSV,
+    y en los agregados (ver agregados_biblioteca).
+    Con registrar=False no escribe los logs y solo devuelve el cambio (para agruparlos).
+    - Todo ocurre con el bloqueo del CSV: dos procesos que agregan al mismo archivo
+    no mezclan sus filas y la firma previa/final corresponde a esta escritura.
+    La carpeta se vuelve a asegurar con el bloqueo tomado, por si
+    compactar_biblioteca la borró (vacía) mientras tanto.
+    """
+    with _bloqueo_csv(root, csv_path):
+        os.makedirs(os.path.dirname(csv_path), exist_ok=True)
+        try:
+            st = os.stat(csv_path)
+            previa = [st.st_mtime_ns, st.st_size] if st.st_size > 0 else None
+        except FileNotFoundError:
+            previa = None
+        # Abrimos en modo 'a' (append). Si no existe, escribimos la cabecera primero.
+        with open(csv_path, "a", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            if previa is None:
+                writer.writerow(REQUIRED_FIELDS)
+            writer.writerows(filas)
+            f.flush()
+            st = os.fstat(f.fileno())  # firma final sin otro stat por ruta
+        cambio = {
+            "op": "agregar",
+            "ruta": os.path.relpath(csv_path, root),
+            "previa": previa,
+            "firma": [st.st_mtime_ns, st.st_size],
+            "filas": filas,
+        }
+        if registrar:
+            _registrar_en_manifiesto(root, cambio)
+            _registrar_agregados(root, agregar=[_fila_agregada(f) for f in filas])
+    if METRICAS_ACTIVAS:
+        _contar(csv_escritos=1, filas_escritas=len(filas), bytes_escritos=st.st_size - (previa[1] if previa else 0))
+    return cambio
+
+
+# --------------------------- ALTA MASIVA -----------------------------
+def _registros_de(origen):
+    """
+    Normaliza el origen de una importación masiva a un iterable de diccionarios.
+    - origen: ruta a un archivo .csv (con cabecera) o .jsonl (un objeto por línea),
+      o cualquier iterable de diccionarios.
+    """
+    if not isinstance(origen, str):
+        yield from origen
+        return
+    with open(origen, "r", newline="", encoding="utf-8") as f:
+        if origen.lower().endswith(".jsonl"):
+            for linea in f:
+                if linea.strip():
+                    yield json.loads(linea)
+        else:
+            yield from csv.DictReader(f)
+
+
+def _validar_registro(registro, conservar_codigos=False):
+    """
+    Valida un registro de importación y devuelve la fila (strings) en el orden de
+    REQUIRED_FIELDS. Con conservar_codigos=True se mantiene su codigo_libro (si
+    trae uno); si no, recibe un UUID nuevo. Lanza ValueError si algo es inválido.
+    """
+    codigo = str(registro.get("codigo_libro") or "").strip() if conservar_codigos else ""
+    return [
+        codigo or str(uuid.uuid4()),
+        validar_cadena(str(registro.get("titulo") or "")),
+        validar_cadena(str(registro.get("autor") or "")),
+        validar_cadena(str(registro.get("genero") or "")),
+        str(validar_numero(registro.get("precio"))),
+        str(validar_anio(registro.get("anio"))),
+    ]
+
+
+@_medido
+@_con_backend
+def alta_libros_bulk(root, origen, lote=100000, conservar_codigos=False):
+    """
+    Alta masiva: agrega muchos libros agrupando las escrituras por carpeta de título.
+    - origen: iterable de diccionarios (genero, autor, titulo, precio, anio) o
+      ruta a un archivo .csv / .jsonl con esas columnas.
+    - Cada registro se valida con las mismas funciones que el alta individual;
+      los inválidos no se guardan y se informan en el resumen.
+    - Los registros se agrupan por genero/autor/titulo: cada carpeta se crea una
+      sola vez y cada libros.csv (el del título, o el del autor o género si la
+      biblioteca está fragmentada) se abre una sola vez por lote, escribiendo
+      todas sus filas juntas (writer.writerows). Cada libro recibe un UUID nuevo,
+      salvo con conservar_codigos=True (se usa al copiar entre bibliotecas).
+    - El manifiesto, los índices y los agregados también se actualizan una sola
+      vez por lote. Cada lote se escribe con el bloqueo "lote" tomado, así una
+      reconstrucción de los agregados nunca ve sus CSV sin su línea en el log.
+    - lote: cantidad máxima de registros agrupados en memoria antes de escribir.
+    - No imprime por fila. Retorna un resumen:
+        {"libros", "archivos", "carpetas", "errores", "segundos", "filas_por_segundo"}
+      donde "errores" es una lista de (número de registro, mensaje).
+    """
+    inicio = time.perf_counter()
+    resumen = {"libros": 0, "archivos": 0, "carpetas": 0, "errores": []}
+    creadas = set()  # carpetas ya creadas en esta importación
+    grupos = {}      # (genero, autor, titulo) -> lista de filas pendientes
+    pendientes = 0
+
+    def volcar():
+        # Escribe todos los grupos acumulados: una apertura por CSV
+        indexados = []
+        cambios = []
+        por_csv = {}  # varios títulos pueden ir al mismo CSV si la biblioteca está fragmentada
+        for (genero, autor, titulo), nuevos in grupos.items():
+            por_csv.setdefault(_ruta_csv(root, genero, autor, titulo), []).extend(nuevos)
+        with _bloqueo_nombrado(root, "lote"):
+            for csv_path, nuevos in por_csv.items():
+                path = os.path.dirname(csv_path)
+                if path not in creadas:
+                    os.makedirs(path, exist_ok=True)
+                    creadas.add(path)
+                cambios.append(_agregar_filas_csv(root, csv_path, nuevos, registrar=False))
+                indexados.extend((n[0], n[1], n[2], csv_path) for n in nuevos)
+                resumen["archivos"] += 1
+                resumen["libros"] += len(nuevos)
+            _registrar_en_manifiesto(root, *cambios)
+            _registrar_agregados(root, agregar=[_fila_agregada(n) for nuevos in por_csv.values() for n in nuevos])
+        try:
+            indexar_libros(root, indexados)
+        except Exception:
+            _invalidar_indices(root)  # los libros ya están guardados (ver alta_libro)
+        grupos.clear()
+
+    for numero, registro in enumerate(_registros_de(origen), start=1):
+        try:
+            nuevo = _validar_registro(registro, conservar_codigos)
+        except (ValueError, TypeError, AttributeError) as e:
+            resumen["errores"].append((numero, str(e)))
+            continue
+        grupos.setdefault((nuevo[3], nuevo[2], nuevo[1]), []).append(nuevo)
+        pendientes += 1
+        if pendientes >= lote:
+            volcar()
+            pendientes = 0
+    volcar()
+
+    resumen["carpetas"] = len(creadas)
+    resumen["segundos"] = time.perf_counter() - inicio
+    resumen["filas_por_segundo"] = resumen["libros"] / resumen["segundos"] if resumen["segundos"] else 0.0
+    return resumen
+
+
+# --------------------------- LECTURA RECURSIVA -----------------------
+@_medido
+@_con_backend
+def leer_toda_jerarquia(root, motor=None, trabajadores=None, usar_manifiesto=True):
+    """
+    Read All (obligatoriamente recursivo en el motor "serie").
+    - Recorre todos los subdirectorios dentro de `root`.
+    - Cada vez que encuentra un archivo llamado CSV_FILE obtiene sus filas.
+    - Consolida todas las filas en una lista `libros` de diccionarios.
+    - Añade la clave "_origen" a cada registro con la ruta absoluta/parcial del CSV,
+    para saber en qué archivo reside cada ítem (útil para actualizar/eliminar).
+    - Retorna la lista completa de libros (puede estar vacía).
+    - Motores de lectura (parámetro `motor`, por defecto MOTOR_LECTURA):
+        "serie": recorrido recursivo con os.listdir y parseo uno por uno.
+        "hilos" / "procesos": recorrido iterativo con os.scandir (sin stat extra
+        por entrada y sin límite de profundidad) y parseo de los CSV en un pool
+        de `trabajadores` hilos o procesos.
+    - Lectura incremental: las filas ya parseadas se guardan en el manifiesto
+    (MANIFIESTO_FILE) junto con la firma (mtime, tamaño) de cada CSV. Solo se
+    vuelven a parsear los archivos cuya firma cambió desde la última lectura.
+    Con usar_manifiesto=False se parsea todo y no se toca el manifiesto.
+    - Manejo de errores: las carpetas o archivos que fallan se ignoran y la
+    lectura continúa (no se interrumpe todo por un error parcial).
+    """
+    libros = []
+    for subruta, entrada in _entradas_csv(root, motor, trabajadores, usar_manifiesto):
+        campos = entrada["campos"]
+        for valores in entrada["filas"]:
+            row = dict(zip(campos, valores))
+            # Añadimos trazabilidad: desde qué archivo proviene este registro
+            row["_origen"] = subruta
+            libros.append(row)
+    return libros
+
+
+def _entradas_csv(root, motor=None, trabajadores=None, usar_manifiesto=True):
+    """
+    Núcleo de la lectura completa: lista los CSV con el motor elegido, toma del
+    manifiesto los que no cambiaron y parsea el resto.
+    - Retorna una lista de (ruta del CSV, {"firma", "campos", "filas"}) en el orden
+    del recorrido. La usan leer_toda_jerarquia y cargar_catalogo_compacto.
+    """
+    motor = motor or MOTOR_LECTURA
+    if motor == "serie":
+        archivos = _listar_csv_recursivo(root)
+    elif motor in ("hilos", "procesos"):
+        archivos = _listar_csv_scandir(root)
+    else:
+        raise ValueError(f"Motor de lectura desconocido: {motor}")
+
+    manifiesto = cargar_manifiesto(root) if usar_manifiesto else {}
+
+    # Separamos los CSV que se pueden tomar del manifiesto de los que hay que parsear
+    vistos = {}  # entradas vigentes del manifiesto (solo los CSV que siguen existiendo)
+    pendientes = []
+    for subruta, subrelativa, firma in archivos:
+        entrada = manifiesto.get(subrelativa)
+        if entrada is not None and entrada["firma"] == firma:
+            vistos[subrelativa] = entrada
+        else:
+            pendientes.append((subruta, subrelativa, firma))
+
+    for (subruta, subrelativa, firma), parseado in zip(pendientes,
+                                                       _parsear_varios(pendientes, motor, trabajadores)):
+        if parseado is not None:
+            vistos[subrelativa] = {"firma": firma, "campos": parseado[0], "filas": parseado[1]}
+            if METRICAS_ACTIVAS:
+                _contar(csv_leidos=1, filas_leidas=len(parseado[1]), bytes_leidos=firma[1])
+    if METRICAS_ACTIVAS:
+        _contar(csv_desde_manifiesto=len(archivos) - len(pendientes))
+
+    # Si algo cambió (archivos nuevos, modificados o borrados) guardamos la foto nueva
+    if usar_manifiesto and (pendientes or len(vistos) != len(manifiesto)
+                            or os.path.exists(os.path.join(root, MANIFIESTO_LOG))):
+        guardar_manifiesto(root, vistos)
+
+    # Respetamos el orden del recorrido
+    return [(subruta, vistos[subrelativa]) for subruta, subrelativa, _ in archivos if subrelativa in vistos]
+
+
+def _listar_csv_recursivo(root):
+    """
+    Recorrido recursivo clásico (motor "serie").
+    - Devuelve una lista de tuplas (ruta, ruta relativa a root, firma) por cada CSV_FILE.
+    - Mecanismo recursivo: la función interna `recorrer(ruta)` se llama a sí misma
+    cuando encuentra un subdirectorio: `recorrer(subruta)` -> caso recursivo.
+    Caso base: cuando no hay subdirectorios o cuando se encuentra un CSV.
+    """
+    archivos = []
+    visitados = [0]
+
+    def recorrer(ruta, relativa):
+        visitados[0] += 1
+        try:
+            # Lista los nombres dentro de `ruta` (archivos y carpetas)
+            for elemento in os.listdir(ruta):
+                # Los nombres que empiezan con "." son datos internos (manifiesto, índices)
+                if elemento.startswith("."):
+                    continue
+                subruta = os.path.join(ruta, elemento)
+                subrelativa = os.path.join(relativa, elemento) if relativa else elemento
+                # Si es un directorio, llamo recursivamente
+                if os.path.isdir(subruta):
+                    recorrer(subruta, subrelativa)  #  llamada recursiva
+                elif elemento == CSV_FILE:
+                    archivos.append((subruta, subrelativa, _firma(subruta)))
+        except Exception:
+            # Ignoramos carpetas inaccesibles o errores puntuales de lectura
+            # Podríamos loguear el error en una solución más robusta.
+            pass
+
+    recorrer(root, "")  # inicio de la recursión desde la raíz
+    if METRICAS_ACTIVAS:
+        _contar(directorios_visitados=visitados[0])
+    return archivos
+
+
+def _listar_csv_scandir(root):
+    """
+    Recorrido iterativo con os.scandir (motores "hilos" y "procesos").
+    - Misma salida que _listar_csv_recursivo.
+    - os.scandir ya informa si cada entrada es carpeta (sin un stat por entrada);
+    solo se hace stat de los CSV, que se necesita para la firma del manifiesto.
+    - Usa una pila explícita en lugar de recursión: no hay límite de profundidad.
+    """
+    archivos = []
+    pila = [(root, "")]
+    visitados = 0
+    while pila:
+        ruta, relativa = pila.pop()
+        visitados += 1
+        try:
+            with os.scandir(ruta) as entradas:
+                subcarpetas = []
+                for entrada in entradas:
+                    if entrada.name.startswith("."):
+                        continue  # datos internos (manifiesto, índices)
+                    subrelativa = os.path.join(relativa, entrada.name) if relativa else entrada.name
+                    if entrada.is_dir():
+                        subcarpetas.append((entrada.path, subrelativa))
+                    elif entrada.name == CSV_FILE:
+                        st = entrada.stat()
+                        archivos.append((entrada.path, subrelativa, [st.st_mtime_ns, st.st_size]))
+        except OSError:
+            # Carpeta inaccesible: se ignora igual que en el motor recursivo
+            continue
+        # Se apilan al revés para visitar las subcarpetas en el orden del listado
+        pila.extend(reversed(subcarpetas))
+    if METRICAS_ACTIVAS:
+        _contar(directorios_visitados=visitados)
+    return archivos
+
+
+def _parsear_seguro(ruta):
+    """Parsea un CSV y devuelve None si falla (se usa dentro de los pools)."""
+    try:
+        return _parsear_csv(ruta)
+    except Exception:
+        return None
+
+
+def _parsear_varios(pendientes, motor, trabajadores=None):
+    """
+    Parsea los CSV de `pendientes` y devuelve sus resultados en el mismo orden.
+    - "serie": uno por uno en el proceso actual.
+    - "hilos": ThreadPoolExecutor (útil cuando el costo dominante es la E/S).
+    - "procesos": ProcessPoolExecutor (reparte también el parseo entre CPUs).
+    """
+    rutas = [p[0] for p in pendientes]
+    # Con pocos archivos el costo de levantar el pool supera al del parseo
+    if motor == "serie" or len(rutas) < 64:
+        return [_parsear_seguro(r) for r in rutas]
+
+    # Import local: solo se paga el costo de concurrent.futures si se usa un pool
+    from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+    trabajadores = trabajadores or TRABAJADORES_LECTURA or os.cpu_count() or 1
+    if motor == "hilos":
+        with ThreadPoolExecutor(max_workers=trabajadores) as pool:
+            return list(pool.map(_parsear_seguro, rutas))
+    # Con procesos conviene mandar lotes grandes para no pagar un envío por archivo
+    lote = max(1, len(rutas) // (trabajadores * 4))
+    with ProcessPoolExecutor(max_workers=trabajadores) as pool:
+        return list(pool.map(_parsear_seguro, rutas, chunksize=lote))
+
+
+# --------------------------- LECTURA EN STREAMING --------------------
+# Niveles de la jerarquía, en el orden de las carpetas: root/genero/autor/titulo
+NIVELES = ["genero", "autor", "titulo"]
+
+
+@_medido
+@_con_backend
+def iter_libros(root, genero=None, autor=None, titulo=None):
+    """
+    Generador: devuelve los libros de a uno, sin cargar toda la biblioteca en memoria.
+    - genero, autor, titulo: filtros opcionales (igualdad case-insensitive).
+    - Poda de carpetas: como genero/autor/titulo ya son nombres de carpeta, solo
+    se desciende a las subcarpetas que pueden coincidir. Por ejemplo, con
+    genero="Historia" únicamente se recorre root/Historia. El costo es
+    proporcional al subárbol que coincide, no a toda la biblioteca.
+    - Además de podar, se compara cada fila con los filtros (el CSV es la fuente
+    de verdad, por si un archivo contiene libros de otro nivel).
+    - Cada fila lleva "_origen" igual que en leer_toda_jerarquia.
+    - Recorrido iterativo con os.scandir (pila explícita, sin límite de profundidad).
+    """
+    filtros = {"genero": genero, "autor": autor, "titulo": titulo}
+    # Valores buscados normalizados por nivel (None = sin filtro en ese nivel)
+    buscados = [filtros[n].lower() if filtros[n] else None for n in NIVELES]
+    filtros_fila = [(n, filtros[n].lower()) for n in NIVELES if filtros[n]]
+
+    pila = [(root, 0)]
+    while pila:
+        ruta, nivel = pila.pop()
+        if METRICAS_ACTIVAS:
+            _contar(directorios_visitados=1)
+        subcarpetas = []
+        csv_path = None
+        try:
+            with os.scandir(ruta) as entradas:
+                for entrada in entradas:
+                    if entrada.name.startswith("."):
+                        continue  # datos internos (manifiesto, índices)
+                    if entrada.is_dir():
+                        # Poda: si este nivel tiene filtro, solo la carpeta que coincide
+                        if nivel < len(NIVELES) and buscados[nivel] is not None \
+                                and entrada.name.lower() != buscados[nivel]:
+                            continue
+                        subcarpetas.append((entrada.path, nivel + 1))
+                    elif entrada.name == CSV_FILE:
+                        csv_path = entrada.path
+        except OSError:
+            # Carpeta inaccesible: se ignora, igual que en leer_toda_jerarquia
+            continue
+
+        if csv_path is not None:
+            try:
+                with open(csv_path, "r", newline="", encoding="utf-8") as f:
+                    filas = 0
+                    for row in csv.DictReader(f):
+                        filas += 1
+                        if all(str(row.get(n, "")).lower() == v for n, v in filtros_fila):
+                            row["_origen"] = csv_path
+                            yield row
+                    if METRICAS_ACTIVAS:
+                        _contar(csv_leidos=1, filas_leidas=filas, bytes_leidos=os.fstat(f.fileno()).st_size)
+            except OSError:
+                pass
+        pila.extend(reversed(subcarpetas))
+
+
+# --------------------------- CATÁLOGO COMPACTO -----------------------
+class _TablaValores:
+    """
+    Codificación por diccionario: cada texto distinto se guarda una sola vez y
+    las filas guardan su número (id) en un array de enteros.
+    """
+    __slots__ = ("valores", "ids")
+
+    def __init__(self):
+        self.valores = []  # id -> texto
+        self.ids = {}      # texto -> id
+
+    def codificar(self, valor):
+        i = self.ids.get(valor)
+        if i is None:
+            i = self.ids[valor] = len(self.valores)
+            self.valores.append(valor)
+        return i
+
+
+class CatalogoCompacto:
+    """
+    Representación compacta y tipada de la biblioteca en memoria (alternativa
+    opcional a la lista de diccionarios de leer_toda_jerarquia).
+    - Guarda los datos por columnas:
+        precios: array("d") con el precio ya convertido a float (nan si es inválido)
+        anios: array("i") con el año ya convertido a int (ANIO_INVALIDO si es inválido)
+        generos, autores, titulos, origenes: array("I") con ids de tablas de
+        valores (cada género/autor/título/ruta de CSV se guarda una sola vez)
+        codigos: lista de strings (son únicos, no se pueden compartir)
+    - Los números se parsean una sola vez al cargar: ordenar_libros,
+    estadisticas y filtrar_libros usan directamente las columnas tipadas.
+    - Se puede recorrer y acceder por posición como una lista; cada elemento
+    es un LibroCompacto que se comporta como un diccionario de solo lectura.
+    """
+    __slots__ = ("codigos", "precios", "anios", "generos", "autores", "titulos", "origenes",
+                 "tabla_generos", "tabla_autores", "tabla_titulos", "tabla_origenes")
+
+    def __init__(self):
+        self.codigos = []
+        self.precios = array("d")
+        self.anios = array("i")
+        self.generos = array("I")
+        self.autores = array("I")
+        self.titulos = array("I")
+        self.origenes = array("I")
+        self.tabla_generos = _TablaValores()
+        self.tabla_autores = _TablaValores()
+        self.tabla_titulos = _TablaValores()
+        self.tabla_origenes = _TablaValores()
+
+    def agregar(self, codigo, titulo, autor, genero, precio, anio, origen):
+        """Agrega un libro; precio y anio pueden venir como texto (se convierten acá)."""
+        self.codigos.append(codigo)
+        self.titulos.append(self.tabla_titulos.codificar(titulo))
+        self.autores.append(self.tabla_autores.codificar(autor))
+        self.generos.append(self.tabla_generos.codificar(genero))
+        self.precios.append(_a_float(precio))
+        self.anios.append(_anio_o_invalido(anio))
+        self.origenes.append(self.tabla_origenes.codificar(origen))
+
+    @classmethod
+    def desde_libros(cls, libros):
+        """Construye el catálogo a partir de una lista de diccionarios (leer_toda_jerarquia)."""
+        catalogo = cls()
+        for l in libros:
+            catalogo.agregar(l.get("codigo_libro"), l.get("titulo"), l.get("autor"), l.get("genero"),
+                             l.get("precio"), l.get("anio"), l.get("_origen"))
+        return catalogo
+
+    def seleccionar(self, indices):
+        """
+        Devuelve un CatalogoCompacto nuevo con las filas `indices` (en ese orden).
+        Comparte las tablas de valores con el original: solo se copian las columnas.
+        """
+        nuevo = CatalogoCompacto.__new__(CatalogoCompacto)
+        nuevo.codigos = list(_tomar(self.codigos, indices))
+        for nombre in ("precios", "anios", "generos", "autores", "titulos", "origenes"):
+            columna = getattr(self, nombre)
+            setattr(nuevo, nombre, array(columna.typecode, _tomar(columna, indices)))
+        nuevo.tabla_generos = self.tabla_generos
+        nuevo.tabla_autores = self.tabla_autores
+        nuevo.tabla_titulos = self.tabla_titulos
+        nuevo.tabla_origenes = self.tabla_origenes
+        return nuevo
+
+    def __len__(self):
+        return len(self.codigos)
+
+    def __getitem__(self, i):
+        if i < 0:
+            i += len(self.codigos)
+        if not 0 <= i < len(self.codigos):
+            raise IndexError(i)
+        return LibroCompacto(self, i)
+
+    def __iter__(self):
+        for i in range(len(self.codigos)):
+            yield LibroCompacto(self, i)
+
+    def valor(self, i, clave):
+        """Devuelve el valor tipado de la columna `clave` para la fila `i`."""
+        if clave == "precio":
+            return self.precios[i]
+        if clave == "anio":
+            anio = self.anios[i]
+            return None if anio == ANIO_INVALIDO else anio
+        if clave == "genero":
+            return self.tabla_generos.valores[self.generos[i]]
+        if clave == "autor":
+            return self.tabla_autores.valores[self.autores[i]]
+        if clave == "titulo":
+            return self.tabla_titulos.valores[self.titulos[i]]
+        if clave == "codigo_libro":
+            return self.codigos[i]
+        if clave == "_origen":
+            return self.tabla_origenes.valores[self.origenes[i]]
+        raise KeyError(clave)
+
+    def columna_codificada(self, clave):
+        """Para genero/autor/titulo devuelve (array de ids, tabla de valores); si no, None."""
+        if clave == "genero":
+            return self.generos, self.tabla_generos
+        if clave == "autor":
+            return self.autores, self.tabla_autores
+        if clave == "titulo":
+            return self.titulos, self.tabla_titulos
+        return None
+
+
+class LibroCompacto:
+    """
+    Vista de solo lectura de una fila de CatalogoCompacto.
+    - Soporta libro["clave"], libro.get("clave") y dict(libro), como los
+    diccionarios de leer_toda_jerarquia (precio y anio ya vienen tipados; un
+    año inválido es None).
+    """
+    __slots__ = ("catalogo", "indice")
+
+    CLAVES = REQUIRED_FIELDS + ["_origen"]
+
+    def __init__(self, catalogo, indice):
+        self.catalogo = catalogo
+        self.indice = indice
+
+    def __getitem__(self, clave):
+        return self.catalogo.valor(self.indice, clave)
+
+    def get(self, clave, defecto=None):
+        try:
+            return self.catalogo.valor(self.indice, clave)
+        except KeyError:
+            return defecto
+
+    def keys(self):
+        return list(self.CLAVES)
+
+    def __repr__(self):
+        return f"LibroCompacto({dict(self)!r})"
+
+
+def libro_tipado(libro):
+    """
+    Copia de `libro` (diccionario de los CSV o LibroCompacto) con solo las columnas
+    de REQUIRED_FIELDS y precio/anio ya convertidos a número (inválidos -> None).
+    Sirve para exportar a JSON/CSV sin importar de dónde vino el libro.
+    """
+    datos = {c: libro.get(c) for c in REQUIRED_FIELDS}
+    precio = _a_float(datos["precio"])
+    datos["precio"] = None if precio != precio else precio
+    anio = _anio_o_invalido(datos["anio"])
+    datos["anio"] = None if anio == ANIO_INVALIDO else anio
+    return datos
+
+
+def _tomar(columna, indices):
+    """Devuelve los elementos de `columna` en las posiciones `indices` (itemgetter corre en C)."""
+    if len(indices) > 1:
+        return operator.itemgetter(*indices)(columna)
+    return [columna[i] for i in indices]
+
+
+def _a_float(valor):
+    try:
+        return float(valor)
+    except (TypeError, ValueError):
+        return math.nan
+
+
+def _a_int(valor):
+    try:
+        return int(float(valor))
+    except (TypeError, ValueError):
+        return 0
+
+
+# Año inválido en CatalogoCompacto.anios (array("i") no admite nan como los precios)
+ANIO_INVALIDO = -2 ** 31
+
+
+def _anio_o_invalido(valor):
+    try:
+        anio = int(float(valor))
+    except (TypeError, ValueError, OverflowError):
+        return ANIO_INVALIDO
+    return anio if ANIO_INVALIDO < anio < 2 ** 31 else ANIO_INVALIDO
+
+
+@_medido
+@_con_backend
+def cargar_catalogo_compacto(root, motor=None, trabajadores=None):
+    """
+    Lectura completa que devuelve un CatalogoCompacto en lugar de una lista de diccionarios.
+    - Usa el mismo recorrido y manifiesto que leer_toda_jerarquia, pero nunca arma
+    un diccionario por libro: las filas van directo a las columnas tipadas.
+    """
+    catalogo = CatalogoCompacto()
+    for subruta, entrada in _entradas_csv(root, motor, trabajadores):
+        campos = entrada["campos"]
+        try:
+            posiciones = [campos.index(c) for c in REQUIRED_FIELDS]
+        except ValueError:
+            continue  # CSV sin las columnas obligatorias
+        ic, it, ia, ig, ip, iy = posiciones
+        for fila in entrada["filas"]:
+            catalogo.agregar(fila[ic], fila[it], fila[ia], fila[ig], fila[ip], fila[iy], subruta)
+    return catalogo
+
+
+# --------------------------- MODIFICACIÓN ----------------------------
+def _preparar_reescritura(origen, temp, cambios):
+    """
+    Escribe en `temp` el contenido nuevo de `origen` aplicando `cambios` en una sola pasada.
+    - cambios: {codigo_libro: dict con los campos nuevos, o None para eliminar la fila}
+    - No toca el archivo original (eso lo hace el commit de aplicar_lote).
+    - Hace fsync del temporal: después del commit tiene que poder reemplazar al original.
+    - Retorna (campos, filas escritas, {codigo_libro: fila original afectada}).
+    """
+    afectadas = {}
+    escritas = []  # contenido final del CSV, para el manifiesto
+    # Abrimos archivo original para leer y temp para escribir
+    with open(origen, "r", newline="", encoding="utf-8") as infile, \
+        open(temp, "w", newline="", encoding="utf-8") as outfile:
+        reader = csv.DictReader(infile)
+        writer = csv.DictWriter(outfile, fieldnames=reader.fieldnames)
+        writer.writeheader()
+        for row in reader:
+            # Identificamos la fila mediante codigo_libro (único)
+            codigo = row["codigo_libro"]
+            if codigo in cambios:
+                afectadas[codigo] = dict(row)
+                if cambios[codigo] is None:
+                    continue  # fila eliminada: no se escribe
+                row.update(cambios[codigo])
+            # Escribimos la fila (modificada o no)
+            writer.writerow(row)
+            escritas.append([_texto_csv(row.get(c)) for c in reader.fieldnames])
+        outfile.flush()
+        os.fsync(outfile.fileno())
+        if METRICAS_ACTIVAS:
+            _contar(reescrituras_tmp=1, csv_leidos=1, csv_escritos=1,
+                    filas_leidas=len(escritas) + sum(1 for v in afectadas if cambios[v] is None),
+                    filas_escritas=len(escritas), bytes_leidos=os.fstat(infile.fileno()).st_size,
+                    bytes_escritos=outfile.tell())
+    return reader.fieldnames, escritas, afectadas
+
+
+def _escribir_journal(root, journal):
+    """Escribe el journal de forma durable (temporal + fsync + os.replace)."""
+    destino = os.path.join(root, JOURNAL_FILE)
+    temp = _ruta_temporal(destino)
+    with open(temp, "w", encoding="utf-8") as f:
+        f.write(json.dumps(journal, ensure_ascii=False))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp, destino)
+
+
+def _borrar_si_existe(ruta):
+    try:
+        os.remove(ruta)
+    except FileNotFoundError:
+        pass
+
+
+def _consolidar_operaciones(operaciones):
+    """
+    Agrupa las operaciones de aplicar_lote por código: {codigo: {campos} o None (eliminar)}.
+    Un update seguido de un delete queda como delete. Lanza ValueError si una
+    operación o columna no es válida.
+    """
+    por_codigo = {}
+    for op in operaciones:
+        tipo, codigo = op[0], op[1]
+        if tipo == "eliminar":
+            por_codigo[codigo] = None
+        elif tipo == "actualizar":
+            campos = {k: v for k, v in op[2].items() if v}
+            invalidos = set(campos) - set(CAMPOS_MODIFICABLES)
+            if invalidos:
+                raise ValueError(f"No se pueden modificar las columnas: {', '.join(sorted(invalidos))}")
+            if codigo in por_codigo and por_codigo[codigo] is None:
+                continue  # ya estaba marcado para eliminar
+            por_codigo.setdefault(codigo, {}).update(campos)
+        else:
+            raise ValueError(f"Operación desconocida: {tipo}")
+    return por_codigo
+
+
+@_medido
+@_con_backend
+def aplicar_lote(root, operaciones, versiones=None):
+    """
+    Aplica muchas modificaciones y bajas como una sola transacción.
+    - operaciones: iterable de tuplas
+        ("actualizar", codigo_libro, {"precio": ..., "anio": ...})
+        ("eliminar", codigo_libro)
+      Los valores deben venir validados (validar_numero / validar_anio).
+      Solo se aceptan las columnas de CAMPOS_MODIFICABLES.
+    - versiones: {codigo_libro: "_version"} opcional (ver leer_libros_por_codigo).
+      Concurrencia optimista: si ese libro cambió desde que se leyó (otra
+      _version_fila), la operación no se aplica y el código queda en "conflictos".
+      Los cambios a otros libros del mismo CSV no cuentan.
+    - Agrupa las operaciones por CSV de origen (usando el índice de códigos) y
+      reescribe cada archivo afectado exactamente una vez.
+    - Concurrencia entre procesos: un lote a la vez por biblioteca (bloqueo
+      "lote") y, mientras se reescriben, los CSV afectados quedan bloqueados
+      para las altas. Cada temporal tiene un nombre único.
+    - Journal (escritura anticipada):
+        1. se anotan los temporales a crear (estado "preparando");
+        2. se escriben todos los temporales;
+        3. commit: el journal pasa a "confirmado";
+        4. se reemplazan los originales, se actualizan manifiesto, agregados
+           e índices y se borra el journal.
+      Si el proceso se corta antes del paso 3, recuperar_journal descarta los
+      temporales; si se corta después, completa los reemplazos.
+    - Retorna un resumen: {"actualizados", "eliminados", "archivos", "no_encontrados", "conflictos"}.
+    """
+    por_codigo = _consolidar_operaciones(operaciones)
+    versiones = versiones or {}
+    with _bloqueo_nombrado(root, "lote"):
+        recuperar_journal(root)  # por si quedó un lote anterior sin terminar
+        ubicados = ubicar_codigos(root, por_codigo)
+        resumen = {"actualizados": 0, "eliminados": 0, "archivos": 0,
+                   "no_encontrados": [c for c in por_codigo if c not in ubicados], "conflictos": []}
+
+        # Agrupamos por archivo de origen
+        por_archivo = {}
+        for codigo, origen in ubicados.items():
+            por_archivo.setdefault(origen, {})[codigo] = por_codigo[codigo]
+        if not por_archivo:
+            return resumen
+
+        # Bloqueamos los CSV afectados (en orden de cubeta, así dos procesos nunca
+        # se esperan mutuamente) hasta terminar de reemplazarlos.
+        with contextlib.ExitStack() as bloqueos:
+            for cubeta in sorted({_cubeta_bloqueo(root, o) for o in por_archivo}):
+                bloqueos.enter_context(_bloqueo(os.path.join(root, BLOQUEOS_DIR, f"{cubeta:02x}.lock")))
+            _verificar_versiones(por_archivo, versiones, resumen)
+            if por_archivo:
+                _reescribir_lote(root, por_codigo, por_archivo, resumen)
+        return resumen
+
+
+def _verificar_versiones(por_archivo, versiones, resumen):
+    """
+    Quita de `por_archivo` los libros cuya versión esperada ya no coincide con la
+    de su fila actual (los anota en resumen["conflictos"]).
+    """
+    for origen in list(por_archivo):
+        esperadas = {c: versiones[c] for c in por_archivo[origen] if versiones.get(c) is not None}
+        if not esperadas:
+            continue
+        actuales = {row["codigo_libro"]: _version_fila(row) for row in _leer_filas_de(origen, esperadas)}
+        for codigo, version in esperadas.items():
+            if version != actuales.get(codigo):
+                resumen["conflictos"].append(codigo)
+                del por_archivo[origen][codigo]
+        if not por_archivo[origen]:
+            del por_archivo[origen]
+
+
+def _reescribir_lote(root, por_codigo, por_archivo, resumen):
+    """Pasos 1 a 4 de aplicar_lote (se llama con los bloqueos ya tomados)."""
+    # 1. Journal en estado "preparando" con los temporales que vamos a crear
+    reemplazos = [(_ruta_temporal(origen), origen) for origen in por_archivo]
+    journal = {
+        "estado": "preparando",
+        "reemplazos": [[os.path.relpath(t, root), os.path.relpath(o, root)] for t, o in reemplazos],
+        "desindexar": [],
+    }
+    _escribir_journal(root, journal)
+
+    # 2. Escribimos todos los temporales (los originales siguen intactos)
+    preparados = []
+    try:
+        for temp, origen in reemplazos:
+            campos, escritas, afectadas = _preparar_reescritura(origen, temp, por_archivo[origen])
+            preparados.append((temp, origen, campos, escritas, afectadas))
+    except Exception:
+        # Rollback: descartamos los temporales y el journal; nada cambió
+        for temp, _ in reemplazos:
+            _borrar_si_existe(temp)
+        _borrar_si_existe(os.path.join(root, JOURNAL_FILE))
+        raise
+
+    # 3. Commit
+    journal["estado"] = "confirmado"
+    for *_, afectadas in preparados:
+        for codigo, fila in afectadas.items():
+            if por_codigo[codigo] is None:
+                journal["desindexar"].append([codigo, fila.get("titulo") or "", fila.get("autor") or ""])
+    _escribir_journal(root, journal)
+
+    # 4. Aplicamos: reemplazo atómico de cada CSV, manifiesto e índices
+    cambios_manifiesto = []
+    for temp, origen, campos, escritas, afectadas in preparados:
+        os.replace(temp, origen)
+        cambios_manifiesto.append(_registrar_reescritura(root, origen, campos, escritas, registrar=False))
+        resumen["archivos"] += 1
+        for codigo in afectadas:
+            if por_codigo[codigo] is None:
+                resumen["eliminados"] += 1
+            else:
+                resumen["actualizados"] += 1
+        resumen["no_encontrados"].extend(c for c in por_archivo[origen] if c not in afectadas)
+    _registrar_en_manifiesto(root, *cambios_manifiesto)
+    # Agregados: sale la fila original y, si era una modificación, entra la nueva
+    quitar, agregar = [], []
+    for *_, afectadas in preparados:
+        for codigo, fila in afectadas.items():
+            quitar.append(_libro_agregado(fila))
+            if por_codigo[codigo] is not None:
+                agregar.append(_libro_agregado({**fila, **por_codigo[codigo]}))
+    _registrar_agregados(root, agregar, quitar)
+    desindexar_libros(root, journal["desindexar"])
+    _borrar_si_existe(os.path.join(root, JOURNAL_FILE))
+
+
+@_medido
+def recuperar_journal(root):
+    """
+    Recupera un lote interrumpido a partir de JOURNAL_FILE (si existe).
+    - "preparando": el commit no llegó a escribirse -> se borran los temporales (rollback).
+    - "confirmado": el commit ya estaba escrito -> se reemplazan los CSV cuyos
+      temporales siguen presentes y se quitan del índice los libros eliminados (roll forward).
+      Si el lote era una compactación, además se descartan los CSV ya unidos a
+      otros y se reconstruyen los índices. Los agregados se invalidan (se
+      reconstruyen en la próxima lectura).
+    - Retorna "rollback", "rollforward" o None si no había nada que recuperar.
+    - Toma el bloqueo "lote": nunca toca el journal de un lote que otro proceso
+    está aplicando en ese momento.
+    """
+    with _bloqueo_nombrado(root, "lote"):
+        return _recuperar_journal(root)
+
+
+def _recuperar_journal(root):
+    ruta = os.path.join(root, JOURNAL_FILE)
+    try:
+        with open(ruta, "r", encoding="utf-8") as f:
+            journal = json.load(f)
+    except FileNotFoundError:
+        return None
+    except ValueError:
+        # Journal ilegible: nunca llegó a confirmarse (se escribe con os.replace)
+        journal = {"estado": "preparando", "reemplazos": []}
+
+    if journal.get("estado") == "confirmado":
+        for temp, origen in journal["reemplazos"]:
+            temp, origen = os.path.join(root, temp), os.path.join(root, origen)
+            if os.path.exists(temp):
+                os.makedirs(os.path.dirname(origen), exist_ok=True)
+                os.replace(temp, origen)
+        for relativa, firma in journal.get("descartar", []):
+            fuente = os.path.join(root, relativa)
+            with _bloqueo_csv(root, fuente):
+                _descartar_fuente(fuente, firma)
+        desindexar_libros(root, journal.get("desindexar", []))
+        if journal.get("reindexar"):
+            reconstruir_indices(root)
+        # No se sabe si el lote llegó a anotar sus cambios: se reconstruyen al leerlos
+        _invalidar_agregados(root)
+        resultado = "rollforward"
+    else:
+        for temp, _ in journal.get("reemplazos", []):
+            _borrar_si_existe(os.path.join(root, temp))
+        resultado = "rollback"
+    _borrar_si_existe(ruta)
+    return resultado
+
+
+@_medido
+@_con_backend
+def limpiar_temporales(root):
+    """
+    Borra los archivos .tmp que hayan quedado sueltos en la biblioteca (por ejemplo
+    de versiones anteriores o de un corte de luz), siempre que no pertenezcan a un
+    lote pendiente (primero se llama a recuperar_journal).
+    - Mientras recorre tiene los bloqueos de lotes, índices, manifiesto y agregados
+    (cada uno de esos escritores crea su temporal con el suyo tomado), así no
+    borra el temporal de una escritura que otro proceso está haciendo.
+    - Retorna la lista de rutas borradas.
+    """
+    with _bloqueo_nombrado(root, "lote"), _bloqueo_nombrado(root, "indices"), \
+            _bloqueo_nombrado(root, "manifiesto"):
+        recuperar_journal(root)
+        # "agregados" después de recuperar_journal: va después de los bloqueos de CSV
+        with _bloqueo_nombrado(root, "agregados"):
+            borrados = []
+            for carpeta, _, archivos in os.walk(root):
+                for nombre in archivos:
+                    if nombre.endswith(".tmp"):
+                        ruta = os.path.join(carpeta, nombre)
+                        _borrar_si_existe(ruta)
+                        borrados.append(ruta)
+    return borrados
+
+
+# --------------------------- COMPACTACIÓN ----------------------------
+def medir_arbol(root):
+    """
+    Cuenta lo que ocupan los datos de la biblioteca en disco: {"csv", "archivos",
+    "carpetas", "bytes", "bytes_en_disco"} (este último en bloques asignados, lo
+    que de verdad cuestan los archivos chicos). No cuenta los archivos y carpetas
+    internos (los que empiezan con ".": índices, manifiesto, bloqueos).
+    """
+    medida = {"csv": 0, "archivos": 0, "carpetas": 0, "bytes": 0, "bytes_en_disco": 0}
+    for carpeta, subcarpetas, archivos in os.walk(root):
+        if carpeta == root:
+            subcarpetas[:] = [s for s in subcarpetas if not s.startswith(".")]
+            archivos = [a for a in archivos if not a.startswith(".")]
+        medida["carpetas"] += len(subcarpetas)
+        for nombre in archivos:
+            try:
+                st = os.stat(os.path.join(carpeta, nombre))
+            except OSError:
+                continue
+            medida["archivos"] += 1
+            medida["csv"] += nombre == CSV_FILE
+            medida["bytes"] += st.st_size
+            medida["bytes_en_disco"] += getattr(st, "st_blocks", 0) * 512 or st.st_size
+    return medida
+
+
+def _destino_fragmento(root, nivel, fila):
+    """CSV al que va una fila (en el orden de REQUIRED_FIELDS) con el nivel de fragmentación `nivel`."""
+    titulo, autor, genero = fila[1], fila[2], fila[3]
+    if nivel == "genero":
+        return os.path.join(root, genero, CSV_FILE)
+    if nivel == "autor":
+        return os.path.join(root, genero, autor, CSV_FILE)
+    return os.path.join(root, genero, autor, titulo, CSV_FILE)
+
+
+def _descartar_fuente(ruta, firma):
+    """
+    Borra un CSV cuyas filas ya se copiaron a otro al compactar (`firma`: la que
+    tenía entonces). Si después se le agregaron filas (las altas solo agregan al
+    final), conserva la cabecera y esas filas nuevas. Se llama con su bloqueo tomado.
+    - Si la firma cambió sin crecer, el archivo ya se recortó (una recuperación
+    que se vuelve a correr) y se deja como está.
+    """
+    try:
+        actual = _firma(ruta)
+    except OSError:
+        return
+    if actual == list(firma):
+        _borrar_si_existe(ruta)
+        return
+    if actual[1] <= firma[1]:
+        return
+    with open(ruta, "rb") as f:
+        cabecera = f.readline()
+        f.seek(firma[1])
+        nuevas = f.read()
+    temp = _ruta_temporal(ruta)
+    with open(temp, "wb") as f:
+        f.write(cabecera + nuevas)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp, ruta)
+
+
+def _borrar_carpetas_vacias(root):
+    """Borra (de abajo hacia arriba) las carpetas de datos que quedaron vacías. Retorna cuántas."""
+    borradas = 0
+    for carpeta, subcarpetas, archivos in os.walk(root, topdown=False):
+        relativa = os.path.relpath(carpeta, root)
+        if carpeta == root or relativa.startswith("."):
+            continue  # la raíz y las carpetas internas (.indices, .bloqueos) no se tocan
+        if not archivos:
+            try:
+                os.rmdir(carpeta)  # falla si todavía tiene subcarpetas con datos
+                borradas += 1
+            except OSError:
+                pass
+    return borradas
+
+
+@_medido
+@_con_backend
+def compactar_biblioteca(root, fragmentar=None):
+    """
+    Mantenimiento de la jerarquía de carpetas:
+    - Completa o deshace un lote interrumpido y borra los temporales .tmp sueltos.
+    - Borra los libros.csv sin libros (solo cabecera o vacíos), que dejan las bajas.
+    - fragmentar="autor" / "genero": reagrupa los libros en un solo libros.csv por
+    autor (root/genero/autor/libros.csv) o por género (root/genero/libros.csv), en
+    lugar de uno por título. Las lecturas ya recorren CSV en cualquier nivel y las
+    altas agregan al CSV fragmentado que exista (ver _ruta_csv); el nivel queda
+    guardado en FRAGMENTACION_FILE para los géneros/autores nuevos.
+    fragmentar="titulo" vuelve a la disposición de un CSV por título.
+    - Borra las carpetas que quedaron vacías.
+    - Reagrupar usa el mismo journal que aplicar_lote: primero se escriben los CSV
+    nuevos como temporales, se confirma y recién entonces se reemplazan y se
+    descartan los originales; un corte en el medio se completa o se deshace.
+    Después se reconstruyen los índices (los libros cambiaron de archivo).
+    - Mientras dura, tiene todos los bloqueos de escritura de la biblioteca.
+    - Retorna un resumen: {"antes", "despues" (ver medir_arbol), "temporales",
+      "csv_vacios", "csv_reagrupados", "fragmentos", "carpetas_borradas", "segundos"}.
+    """
+    if fragmentar is not None and fragmentar not in NIVELES_FRAGMENTACION:
+        raise ValueError(f"fragmentar debe ser uno de {NIVELES_FRAGMENTACION} (o None).")
+    inicio = time.perf_counter()
+    resumen = {"antes": medir_arbol(root), "temporales": 0, "csv_vacios": 0, "csv_reagrupados": 0,
+               "fragmentos": 0, "carpetas_borradas": 0}
+
+    # Orden de bloqueos: lote > índices > CSV (todas las cubetas) > manifiesto / agregados
+    with _bloqueo_nombrado(root, "lote"), _bloqueo_nombrado(root, "indices"), _bloqueo_todos_los_csv(root):
+        resumen["temporales"] = len(limpiar_temporales(root))
+        entradas = _entradas_csv(root)
+
+        # CSV sin libros: se borran directamente (no hay nada que perder)
+        cambios = []
+        for ruta, entrada in entradas:
+            if not entrada["filas"]:
+                _borrar_si_existe(ruta)
+                cambios.append({"op": "borrar", "ruta": os.path.relpath(ruta, root)})
+                resumen["csv_vacios"] += 1
+        _registrar_en_manifiesto(root, *cambios)
+
+        if fragmentar is not None:
+            _reagrupar(root, fragmentar, [(r, e) for r, e in entradas if e["filas"]], resumen)
+            if fragmentar == "titulo":
+                _borrar_si_existe(os.path.join(root, FRAGMENTACION_FILE))
+            else:
+                with open(os.path.join(root, FRAGMENTACION_FILE), "w", encoding="utf-8") as f:
+                    f.write(json.dumps({"nivel": fragmentar}))
+        resumen["carpetas_borradas"] = _borrar_carpetas_vacias(root)
+
+    resumen["despues"] = medir_arbol(root)
+    resumen["segundos"] = time.perf_counter() - inicio
+    return resumen
+
+
+def _reagrupar(root, nivel, entradas, resumen):
+    """
+    Mueve las filas de `entradas` (CSV con libros) al CSV de su nivel de
+    fragmentación (parte de compactar_biblioteca, con los bloqueos ya tomados).
+    - Los CSV con otras columnas o con filas sin género/autor/título se dejan como
+    están (y nunca se pisan).
+    """
+    # Destino de cada fila de cada CSV que se puede reagrupar
+    por_fuente = {}  # CSV origen -> (firma al leerlo, [(destino, fila), ...])
+    for ruta, entrada in entradas:
+        if entrada["campos"] != REQUIRED_FIELDS:
+            continue
+        filas = [[_texto_csv(v) for v in fila] for fila in entrada["filas"]]
+        if all(f[1] and f[2] and f[3] for f in filas):
+            por_fuente[ruta] = (entrada["firma"], [(_destino_fragmento(root, nivel, f), f) for f in filas])
+
+    # Los CSV que quedan como están no se pueden pisar: si algo iba a parar a
+    # uno de ellos, su origen también se deja como está (y así hasta que no cambie)
+    intactos = {ruta for ruta, _ in entradas} - set(por_fuente)
+    cambio = True
+    while cambio:
+        cambio = False
+        for ruta in list(por_fuente):
+            if any(destino in intactos for destino, _ in por_fuente[ruta][1]):
+                del por_fuente[ruta]
+                intactos.add(ruta)
+                cambio = True
+
+    destinos = {}  # CSV destino -> filas (en el orden del recorrido)
+    origenes = {}  # CSV destino -> CSV de donde vienen sus filas
+    for ruta, (_, filas) in por_fuente.items():
+        for destino, fila in filas:
+            destinos.setdefault(destino, []).append(fila)
+            origenes.setdefault(destino, set()).add(ruta)
+    # Un CSV que ya es el destino de todas sus filas, y de ninguna otra, no se reescribe
+    for ruta, (_, filas) in list(por_fuente.items()):
+        if origenes.get(ruta) == {ruta} and all(destino == ruta for destino, _ in filas):
+            del destinos[ruta]
+            del por_fuente[ruta]
+    if not destinos:
+        return
+    fuentes = {ruta: firma for ruta, (firma, _) in por_fuente.items()}
+
+    # 1. Journal "preparando": temporales a crear y CSV que se van a descartar
+    reemplazos = [(_ruta_temporal(destino), destino) for destino in destinos]
+    journal = {
+        "estado": "preparando",
+        "reemplazos": [[os.path.relpath(t, root), os.path.relpath(d, root)] for t, d in reemplazos],
+        "descartar": [[os.path.relpath(r, root), firma] for r, firma in fuentes.items() if r not in destinos],
+        "desindexar": [],
+        "reindexar": True,
+    }
+    _escribir_journal(root, journal)
+
+    # 2. Temporales con el contenido nuevo de cada destino
+    try:
+        for temp, destino in reemplazos:
+            os.makedirs(os.path.dirname(destino), exist_ok=True)
+            with open(temp, "w", newline="", encoding="utf-8") as f:
+                writer = csv.writer(f)
+                writer.writerow(REQUIRED_FIELDS)
+                writer.writerows(destinos[destino])
+                f.flush()
+                os.fsync(f.fileno())
+    except Exception:
+        for temp, _ in reemplazos:
+            _borrar_si_existe(temp)
+        _borrar_si_existe(os.path.join(root, JOURNAL_FILE))
+        raise
+
+    # 3. Commit y 4. aplicación: reemplazos, descartes, manifiesto e índices
+    journal["estado"] = "confirmado"
+    _escribir_journal(root, journal)
+    cambios = []
+    for temp, destino in reemplazos:
+        os.replace(temp, destino)
+        cambios.append(_registrar_reescritura(root, destino, REQUIRED_FIELDS, destinos[destino], registrar=False))
+    for relativa, firma in journal["descartar"]:
+        _descartar_fuente(os.path.join(root, relativa), firma)
+        cambios.append({"op": "borrar", "ruta": relativa})
+    _registrar_en_manifiesto(root, *cambios)
+    reconstruir_indices(root)
+    _borrar_si_existe(os.path.join(root, JOURNAL_FILE))
+    resumen["csv_reagrupados"] = len(fuentes)
+    resumen["fragmentos"] = len(destinos)
+
+
+@_medido
+def actualizar_por_codigo(root, codigo, nuevo_precio=None, nuevo_anio=None, version=None):
+    """
+    Update por código: modifica precio y/o año del libro `codigo`.
+    - Usa el índice de códigos para ubicar el CSV: solo se lee y reescribe ese archivo
+    (es un lote de una sola operación, con el mismo journal que aplicar_lote).
+    - Solo se modifican los campos con valor (None o vacío = no cambiar).
+    - version: "_version" del libro leído antes (opcional, ver aplicar_lote).
+    - Retorna True si el libro se actualizó.
+    """
+    # Aplicamos cambios solo a las columnas permitidas
+    try:
+        resumen = aplicar_lote(root, [("actualizar", codigo, {"precio": nuevo_precio, "anio": nuevo_anio})],
+                               {codigo: version})
+    except Exception as e:
+        print(f"Error al actualizar el libro: {e}")
+        return False
+    if resumen.get("conflictos"):
+        print(" El libro fue modificado por otro proceso; vuelva a intentarlo.")
+        return False
+    if not resumen["actualizados"]:
+        print(" Libro no encontrado.")
+        return False
+    print(" Libro actualizado correctamente.")
+    return True
+
+
+def actualizar_libro(root, titulo, nuevo_precio=None, nuevo_anio=None):
+    """
+    Update: Actualiza precio y/o año de un libro identificado por su título.
+    - Estrategia:
+        1. Buscar en el índice de títulos los códigos cuyo título coincide
+           (case-insensitive), sin leer la jerarquía completa.
+        2. Tomar el primero y delegar en actualizar_por_codigo, que reescribe
+           únicamente el CSV donde está ese libro.
+        3. Si ningún título coincide, se ofrecen los más parecidos (búsqueda
+           difusa con el índice de trigramas, ver buscar_libros) para elegir uno.
+    - Parámetros:
+        root: ruta raíz
+        titulo: título a buscar (string)
+        nuevo_precio: float o None
+        nuevo_anio: int o None
+    - Observación: si existen múltiples libros con el mismo título, se actualiza
+      el **primer** que se dio de alta (para elegir uno puntual, usar
+      actualizar_por_codigo).
+    """
+    codigos = codigos_por_titulo(root, titulo)
+    if codigos:
+        actualizar_por_codigo(root, codigos[0], nuevo_precio, nuevo_anio)
+        return
+    encontrado = _elegir_parecido(root, titulo, "modificar", " Libro no encontrado.")
+    if encontrado is None:
+        return
+    actualizar_por_codigo(root, encontrado["codigo_libro"], nuevo_precio, nuevo_anio, encontrado.get("_version"))
+
+
+def _elegir_libro(encontrados, encabezado, accion):
+    """Muestra los libros `encontrados` y pide elegir uno. Retorna el elegido o None (selección inválida)."""
+    print(f"\n{encabezado}")
+    for i, l in enumerate(encontrados, start=1):
+        print(f"{i}. {l['titulo']} - {l['autor']} ({l['genero']}) - {l['anio']}")
+    indice = input(f"Seleccione el número del libro a {accion}: ").strip()
+    if not indice.isdigit() or not (1 <= int(indice) <= len(encontrados)):
+        print("Selección inválida.")
+        return None
+    return encontrados[int(indice) - 1]
+
+
+def _elegir_parecido(root, titulo, accion, sin_resultados, cantidad=10):
+    """
+    Sin coincidencias para `titulo`: ofrece los `cantidad` títulos más parecidos
+    (errores de tipeo) y pide elegir uno. Retorna el libro elegido, o None si no
+    hay parecidos (imprime `sin_resultados`) o la selección no es válida.
+    """
+    parecidos = buscar_libros(root, titulo, ("titulo",), difuso=True, limite=cantidad)
+    encontrados = leer_libros_por_codigo(root, [r["codigo_libro"] for r in parecidos])
+    if not encontrados:
+        print(sin_resultados)
+        return None
+    return _elegir_libro(encontrados, f"No hay libros con el título '{titulo}'. Los más parecidos:", accion)
+
+
+# --------------------------- ELIMINACIÓN ------------------------------
+@_medido
+def eliminar_por_codigo(root, codigo, version=None):
+    """
+    Delete por código: elimina el libro `codigo` sin pedir confirmación.
+    - Usa el índice de códigos: solo se lee y reescribe el CSV que lo contiene.
+    - Quita el libro de los índices (aplicar_lote se encarga).
+    - version: "_version" del libro leído antes (opcional, ver aplicar_lote).
+    - Retorna True si el libro se eliminó.
+    """
+    try:
+        resumen = aplicar_lote(root, [("eliminar", codigo)], {codigo: version})
+    except Exception as e:
+        print(f"Error al eliminar el libro: {e}")
+        return False
+    if resumen.get("conflictos"):
+        print(" El libro fue modificado por otro proceso; vuelva a intentarlo.")
+        return False
+    if not resumen["eliminados"]:
+        print(" No se encontró un libro con ese código.")
+        return False
+    print(" Libro eliminado correctamente.")
+    return True
+
+
+def eliminar_libro(root, titulo):
+    """
+    Delete: Elimina un libro buscándolo por título (coincidencia parcial).
+    - Paso 1: buscar con el índice de trigramas los que contienen la cadena
+      `titulo` (sin distinguir mayúsculas ni tildes) y leer solo los CSV de esos libros.
+    - Si ninguno la contiene, ofrece los títulos más parecidos (errores de tipeo).
+    - Si hay múltiples coincidencias, pide al usuario seleccionar cuál eliminar.
+    - Antes de borrar pregunta confirmación 's'/'n'.
+    - Delega en eliminar_por_codigo, que reescribe solo el CSV de origen, con la
+      versión leída: si otro proceso modificó ese CSV entretanto, no se borra.
+    - Parámetros:
+        root: ruta raíz
+        titulo: cadena para buscar en 'titulo' de cada registro
+    """
+    encontrados = leer_libros_por_codigo(root, codigos_por_titulo_parcial(root, titulo))
+
+    if not encontrados:
+        # Ningún título contiene el texto: ¿hubo un error de tipeo?
+        encontrado = _elegir_parecido(root, titulo, "eliminar", " No se encontraron libros con ese título.")
+        if encontrado is None:
+            return
+    # Si hay varias coincidencias, mostramos opciones para seleccionar
+    elif len(encontrados) > 1:
+        encontrado = _elegir_libro(encontrados, "Se encontraron varios libros con ese título:", "eliminar")
+        if encontrado is None:
+            return
+    else:
+        encontrado = encontrados[0]
+
+    # Confirmación del usuario antes de eliminar
+    confirm = input(f"¿Seguro que desea eliminar '{encontrado['titulo']}'? (s/n): ").lower()
+    if confirm != "s":
+        print("Operación cancelada.")
+        return
+
+    # Si el CSV cambió mientras el usuario confirmaba, la baja se rechaza
+    eliminar_por_codigo(root, encontrado["codigo_libro"], encontrado.get("_version"))
+
+
+# --------------------------- ORDENAMIENTO Y ESTADÍSTICAS -------------
+# Columnas que se ordenan como números y columnas que siempre son texto
+CAMPOS_NUMERICOS = ("precio", "anio")
+CAMPOS_TEXTO = ("codigo_libro", "titulo", "autor", "genero", "_origen")
+
+
+class _Invertido:
+    """Envuelve un texto para invertir su orden (claves de texto descendentes)."""
+    __slots__ = ("valor",)
+
+    def __init__(self, valor):
+        self.valor = valor
+
+    def __lt__(self, otro):
+        return otro.valor < self.valor
+
+    def __eq__(self, otro):
+        return self.valor == otro.valor
+
+
+# Direcciones aceptadas en un criterio (campo, direccion) -> descendente
+DIRECCIONES_ORDEN = {"asc": False, "ascendente": False, "desc": True, "descendente": True}
+
+
+def _es_direccion(valor):
+    return isinstance(valor, str) and valor.lower() in DIRECCIONES_ORDEN
+
+
+def _normalizar_claves(clave):
+    """
+    Convierte la especificación de orden a una lista de (campo, descendente).
+    Acepta "precio", "-precio" (descendente), ("precio", "desc") o una lista (o
+    tupla) de ellas. Una tupla de dos elementos es (campo, direccion) solo si el
+    segundo es una dirección de DIRECCIONES_ORDEN: ("genero", "precio") son dos claves.
+    Lanza ValueError si un criterio (campo, direccion) tiene otra dirección.
+    """
+    if isinstance(clave, str) or (isinstance(clave, tuple) and len(clave) == 2 and _es_direccion(clave[1])):
+        clave = [clave]
+    claves = []
+    for c in clave:
+        if isinstance(c, (tuple, list)):
+            if len(c) != 2 or not _es_direccion(c[1]):
+                raise ValueError(f"Criterio de orden inválido: {c!r} (se espera (campo, 'asc' o 'desc')).")
+            claves.append((c[0], DIRECCIONES_ORDEN[c[1].lower()]))
+        elif c.startswith("-"):
+            claves.append((c[1:], True))
+        else:
+            claves.append((c, False))
+    return claves
+
+
+def _valor_ordenable(campo, valor, desc):
+    """
+    Clave tipada de un valor, calculada una sola vez por fila.
+    - precio/anio: número (los inválidos o vacíos quedan al final).
+    - genero/autor/titulo/...: texto en minúsculas.
+    - Otras columnas: número si se puede convertir, si no texto (los números primero).
+    Devuelve una tupla (grupo, valor) comparable entre filas.
+    """
+    if campo not in CAMPOS_TEXTO:
+        numero = _a_float(valor)
+        if numero == numero:  # no es nan
+            return (0, -numero if desc else numero)
+        if campo in CAMPOS_NUMERICOS:
+            return (2, 0.0)  # inválido: siempre al final
+    texto = "" if valor is None else str(valor).lower()
+    return (1, _Invertido(texto) if desc else texto)
+
+
+def _funcion_clave(claves):
+    """Devuelve la función libro -> clave tipada compuesta (una tupla por criterio)."""
+    if len(claves) == 1:
+        campo, desc = claves[0]
+        return lambda l: _valor_ordenable(campo, l.get(campo), desc)
+    return lambda l: tuple(_valor_ordenable(campo, l.get(campo), desc) for campo, desc in claves)
+
+
+@_medido
+def ordenar_libros(libros, clave, limite=None, externo=False, tam_bloque=100000, carpeta_temporal=None):
+    """
+    Ordena libros por una o varias claves.
+    - clave: "precio", "-precio" (descendente), ("precio", "desc") o una lista de
+      criterios, por ejemplo ["genero", "-precio"] (género ascendente y, dentro de
+      cada género, precio descendente). Una tupla como ("genero", "precio") también
+      es una lista de criterios (ver _normalizar_claves).
+    - Las claves se calculan una sola vez por libro y ya tipadas: precio y anio como
+      números (los vacíos/inválidos al final), género/autor/título como texto sin
+      distinguir mayúsculas. No se reordena dos veces si un valor no es numérico.
+    - limite=N: devuelve solo los N primeros (ej. los 10 más baratos) con un heap
+      (heapq.nsmallest): memoria O(N), sirve también para generadores como iter_libros.
+    - externo=True: ordenamiento externo por mezcla para bibliotecas que no entran en
+      memoria. Ordena bloques de `tam_bloque` libros, los guarda como corridas
+      temporales en disco (carpeta_temporal o la del sistema) y los mezcla con
+      heapq.merge. Devuelve un generador (los libros se producen de a uno).
+    - En los demás casos retorna una lista nueva ordenada; no modifica la original.
+    - Con un CatalogoCompacto se ordena por las columnas ya tipadas y se devuelve
+    otro CatalogoCompacto con las filas en ese orden.
+    """
+    claves = _normalizar_claves(clave)
+    if isinstance(libros, CatalogoCompacto):
+        return _ordenar_catalogo(libros, claves, limite)
+
+    clave_de = _funcion_clave(claves)
+    if limite is not None:
+        return heapq.nsmallest(limite, libros, key=clave_de)
+    if externo:
+        return _ordenar_externo(libros, clave_de, tam_bloque, carpeta_temporal)
+    return sorted(libros, key=clave_de)
+
+
+def _ordenar_catalogo(catalogo, claves, limite=None):
+    """
+    Ordena un CatalogoCompacto: arma una columna de claves por criterio y ordena índices.
+    - genero/autor/titulo: se ordenan una vez los valores distintos de la tabla y cada
+    fila usa el puesto (rango) de su valor; el descendente es el rango negativo.
+    - precio/anio: se usan las columnas numéricas (inválidos al final, como en _valor_ordenable).
+    """
+    n = len(catalogo)
+    columnas = []
+    for campo, desc in claves:
+        codificada = catalogo.columna_codificada(campo)
+        if codificada is not None:
+            ids, tabla = codificada
+            textos = [str(v).lower() for v in tabla.valores]
+            rango = [0] * len(textos)
+            puesto, anterior = -1, None
+            for j in sorted(range(len(textos)), key=textos.__getitem__):
+                if textos[j] != anterior:
+                    puesto, anterior = puesto + 1, textos[j]
+                rango[j] = -puesto if desc else puesto
+            columnas.append(list(map(rango.__getitem__, ids)))
+        elif campo == "precio":
+            infinito = math.inf
+            columnas.append([infinito if v != v else (-v if desc else v) for v in catalogo.precios])
+        elif campo == "anio":
+            infinito = math.inf
+            columnas.append([infinito if v == ANIO_INVALIDO else (-v if desc else v) for v in catalogo.anios])
+        else:
+            columnas.append([_valor_ordenable(campo, catalogo.valor(i, campo), desc) for i in range(n)])
+
+    if len(columnas) == 1:
+        clave_de = columnas[0].__getitem__
+    else:
+        clave_de = list(zip(*columnas)).__getitem__
+    if limite is not None:
+        indices = heapq.nsmallest(limite, range(n), key=clave_de)
+    else:
+        indices = sorted(range(n), key=clave_de)
+    return catalogo.seleccionar(indices)
+
+
+def _ordenar_externo(libros, clave_de, tam_bloque, carpeta_temporal=None):
+    """
+    Ordenamiento externo por mezcla (generador).
+    1. Lee los libros en bloques de `tam_bloque`, ordena cada bloque en memoria y lo
+       guarda en un archivo temporal (una "corrida") junto con su clave ya calculada.
+    2. Mezcla todas las corridas con heapq.merge, leyendo un libro por corrida a la vez.
+    Si todo entra en un solo bloque no se escribe nada en disco.
+    Las corridas se borran al terminar (o si se abandona el generador).
+    """
+    corridas = []
+    try:
+        bloque = []
+        for l in libros:
+            bloque.append((clave_de(l), l))
+            if len(bloque) >= tam_bloque:
+                corridas.append(_volcar_corrida(bloque, carpeta_temporal))
+                bloque = []
+        if not corridas:
+            bloque.sort(key=operator.itemgetter(0))
+            for _, l in bloque:
+                yield l
+            return
+        if bloque:
+            corridas.append(_volcar_corrida(bloque, carpeta_temporal))
+        bloque = None
+        for _, l in heapq.merge(*(_leer_corrida(r) for r in corridas), key=operator.itemgetter(0)):
+            yield l
+    finally:
+        for ruta in corridas:
+            _borrar_si_existe(ruta)
+
+
+def _volcar_corrida(bloque, carpeta_temporal=None):
+    """Ordena `bloque` y lo guarda en un archivo temporal (pickle por elemento). Retorna la ruta."""
+    bloque.sort(key=operator.itemgetter(0))
+    descriptor, ruta = tempfile.mkstemp(suffix=".corrida", dir=carpeta_temporal)
+    with os.fdopen(descriptor, "wb") as f:
+        for elemento in bloque:
+            pickle.dump(elemento, f, protocol=pickle.HIGHEST_PROTOCOL)
+    return ruta
+
+
+def _leer_corrida(ruta):
+    """Devuelve de a uno los (clave, libro) de una corrida."""
+    with open(ruta, "rb") as f:
+        while True:
+            try:
+                yield pickle.load(f)
+            except EOFError:
+                return
+
+
+class _CuantilP2:
+    """
+    Estimador P² (Jain y Chlamtac, 1985) de un cuantil en streaming.
+    - Mantiene solo 5 marcadores: memoria constante sin importar cuántos valores lleguen.
+    - Mientras hay menos de 5 valores el cuantil es exacto.
+    """
+    __slots__ = ("p", "q", "n", "deseadas", "incrementos")
+
+    def __init__(self, p):
+        self.p = p
+        self.q = []  # alturas de los marcadores (o los primeros valores, ordenados)
+        self.n = [0, 1, 2, 3, 4]
+        self.deseadas = [0, 2 * p, 4 * p, 2 + 2 * p, 4]
+        self.incrementos = [0, p / 2, p, (1 + p) / 2, 1]
+
+    def agregar(self, x):
+        q, n = self.q, self.n
+        if len(q) < 5:
+            q.append(x)
+            q.sort()
+            return
+        # Ubicamos la celda k tal que q[k] <= x < q[k+1] (ajustando los extremos)
+        if x < q[0]:
+            q[0] = x
+            k = 0
+        elif x >= q[4]:
+            q[4] = x
+            k = 3
+        else:
+            k = 0
+            while x >= q[k + 1]:
+                k += 1
+        for i in range(k + 1, 5):
+            n[i] += 1
+        for i in range(5):
+            self.deseadas[i] += self.incrementos[i]
+        # Ajustamos los marcadores intermedios si se alejaron de su posición deseada
+        for i in (1, 2, 3):
+            d = self.deseadas[i] - n[i]
+            if (d >= 1 and n[i + 1] - n[i] > 1) or (d <= -1 and n[i - 1] - n[i] < -1):
+                d = 1 if d > 0 else -1
+                nuevo = q[i] + d / (n[i + 1] - n[i - 1]) * (
+                    (n[i] - n[i - 1] + d) * (q[i + 1] - q[i]) / (n[i + 1] - n[i])
+                    + (n[i + 1] - n[i] - d) * (q[i] - q[i - 1]) / (n[i] - n[i - 1]))
+                if not q[i - 1] < nuevo < q[i + 1]:
+                    # La parábola se sale del intervalo: usamos interpolación lineal
+                    nuevo = q[i] + d * (q[i + d] - q[i]) / (n[i + d] - n[i])
+                q[i] = nuevo
+                n[i] += d
+
+    def valor(self):
+        q = self.q
+        if not q:
+            return None
+        if len(q) < 5 or self.n[4] < 5:
+            # Pocos datos: cuantil exacto con interpolación lineal
+            pos = self.p * (len(q) - 1)
+            i = int(pos)
+            return q[i] if i + 1 >= len(q) else q[i] + (q[i + 1] - q[i]) * (pos - i)
+        return q[2]
+
+
+class _Acumulador:
+    """
+    Estadísticas de precio de un grupo en una sola pasada.
+    - cantidad/mínimo/máximo/suma directos; media y varianza con el método de Welford
+    (numéricamente estable, sin guardar los valores).
+    - Cuantiles aproximados opcionales con _CuantilP2 (memoria acotada).
+    """
+    __slots__ = ("total", "cantidad", "media", "m2", "minimo", "maximo", "suma", "cuantiles")
+
+    def __init__(self, cuantiles=()):
+        self.total = 0     # libros del grupo (con o sin precio válido)
+        self.cantidad = 0  # libros con precio válido
+        self.media = 0.0
+        self.m2 = 0.0
+        self.minimo = None
+        self.maximo = None
+        self.suma = 0.0
+        self.cuantiles = {p: _CuantilP2(p) for p in cuantiles}
+
+    def agregar(self, precio):
+        self.total += 1
+        if precio is None:
+            return
+        self.cantidad += 1
+        delta = precio - self.media
+        self.media += delta / self.cantidad
+        self.m2 += delta * (precio - self.media)
+        self.suma += precio
+        if self.minimo is None or precio < self.minimo:
+            self.minimo = precio
+        if self.maximo is None or precio > self.maximo:
+            self.maximo = precio
+        for estimador in self.cuantiles.values():
+            estimador.agregar(precio)
+
+    def resultado(self):
+        varianza = self.m2 / (self.cantidad - 1) if self.cantidad > 1 else 0.0
+        datos = {
+            "total": self.total,
+            "cantidad": self.cantidad,
+            "minimo": self.minimo,
+            "maximo": self.maximo,
+            "suma": self.suma,
+            "promedio": self.media if self.cantidad else None,
+            "varianza": varianza,
+            "desvio": math.sqrt(varianza),
+        }
+        for p, estimador in self.cuantiles.items():
+            datos[_nombre_cuantil(p)] = estimador.valor()
+        return datos
+
+
+# Cuantiles que calcula estadisticas() por defecto: mediana y percentil 90
+CUANTILES = (0.5, 0.9)
+
+
+def _nombre_cuantil(p):
+    return "mediana" if p == 0.5 else f"p{round(p * 100)}"
+
+
+def _precios_y_claves(libros, atributos):
+    """
+    Genera (clave de grupo, precio float o None) por cada libro, en una sola pasada.
+    - Con un CatalogoCompacto lee las columnas tipadas; con diccionarios parsea
+    el precio una vez por libro.
+    """
+    if isinstance(libros, CatalogoCompacto):
+        columnas = []
+        for a in atributos:
+            codificada = libros.columna_codificada(a)
+            if codificada is not None:
+                ids, tabla = codificada
+                columnas.append(map(tabla.valores.__getitem__, ids))
+            elif a == "anio":
+                # Mismo grupo que _a_int con diccionarios (año inválido -> 0)
+                columnas.append(0 if v == ANIO_INVALIDO else v for v in libros.anios)
+            else:
+                columnas.append(libros.valor(i, a) for i in range(len(libros)))
+        claves = zip(*columnas) if columnas else itertools.repeat(())
+        for clave, precio in zip(claves, libros.precios):
+            yield clave, (None if precio != precio else precio)  # nan != nan
+        return
+    for l in libros:
+        clave = tuple(_a_int(l.get(a)) if a == "anio" else l.get(a) for a in atributos)
+        try:
+            precio = float(l["precio"]) if l.get("precio") else None
+        except ValueError:
+            precio = None
+        yield clave, precio
+
+
+@_medido
+def calcular_estadisticas(libros, agrupar_por=None, cuantiles=CUANTILES):
+    """
+    Motor de estadísticas de precio en una sola pasada (streaming).
+    - libros: cualquier iterable de libros (lista, iter_libros, CatalogoCompacto);
+    no se materializa la colección: se puede pasar directamente iter_libros(root).
+    - agrupar_por: None, "genero", "autor", "anio" o una tupla de esos atributos.
+    - cuantiles: cuantiles aproximados a calcular (por defecto mediana y p90), con
+    memoria acotada por grupo. Pasar () para omitirlos.
+    - Retorna {"global": {...}, "grupos": {valor: {...}}} donde cada {...} tiene
+    total, cantidad (con precio), minimo, maximo, suma, promedio, varianza, desvio
+    y los cuantiles pedidos ("mediana", "p90", ...). Con una tupla de atributos
+    las claves de "grupos" son tuplas.
+    """
+    if agrupar_por is None:
+        atributos = ()
+    elif isinstance(agrupar_por, str):
+        atributos = (agrupar_por,)
+    else:
+        atributos = tuple(agrupar_por)
+
+    general = _Acumulador(cuantiles)
+    grupos = {}
+    for clave, precio in _precios_y_claves(libros, atributos):
+        general.agregar(precio)
+        if atributos:
+            acumulador = grupos.get(clave)
+            if acumulador is None:
+                acumulador = grupos[clave] = _Acumulador(cuantiles)
+            acumulador.agregar(precio)
+
+    simple = len(atributos) == 1
+    return {
+        "global": general.resultado(),
+        "grupos": {(clave[0] if simple else clave): a.resultado() for clave, a in grupos.items()},
+    }
+
+
+@_medido
+def estadisticas(libros, agrupar_por=None):
+    """
+    Calcula y muestra estadísticas sobre `libros` (usa calcular_estadisticas).
+    - Muestra: total, mínimo, máximo, promedio, desvío, mediana y p90 de 'precio'.
+    - Con agrupar_por ("genero", "autor" o "anio") muestra además una línea por grupo.
+    - Acepta cualquier iterable, por ejemplo iter_libros(root): una sola pasada.
+    - Si no hay precios validables, muestra un mensaje.
+    - Retorna el resultado estructurado de calcular_estadisticas.
+    """
+    resultado = calcular_estadisticas(libros, agrupar_por)
+    _mostrar_estadisticas(resultado, agrupar_por)
+    return resultado
+
+
+def _mostrar_estadisticas(resultado, agrupar_por):
+    """Imprime un resultado con la forma de calcular_estadisticas (o agregados_biblioteca)."""
+    general = resultado["global"]
+    if not general["cantidad"]:
+        print("No hay precios cargados para calcular estadísticas.")
+        return
+    print(f"Total de libros: {general['total']}")
+    print(f"Precio mínimo: ${general['minimo']:.2f}")
+    print(f"Precio máximo: ${general['maximo']:.2f}")
+    print(f"Promedio de precios: ${general['promedio']:.2f}")
+    print(f"Desvío estándar: ${general['desvio']:.2f}")
+    print(f"Mediana (aprox.): ${general['mediana']:.2f}")
+    print(f"Percentil 90 (aprox.): ${general['p90']:.2f}")
+    if agrupar_por:
+        print(f"\n--- Por {agrupar_por} ---")
+        for clave in sorted(resultado["grupos"], key=str):
+            g = resultado["grupos"][clave]
+            if g["cantidad"]:
+                print(f"{clave}: {g['total']} libros | mín ${g['minimo']:.2f} | máx ${g['maximo']:.2f} "
+                      f"| prom ${g['promedio']:.2f} | mediana ${g['mediana']:.2f}")
+
+
+# --------------------------- ESTADÍSTICAS MATERIALIZADAS -------------
+# Cada dimensión guarda {clave: grupo} ("" es la clave del grupo global) y cada
+# grupo es un diccionario de _grupo_vacio(). Los escritores anotan sus altas y
+# bajas en AGREGADOS_LOG como [genero, autor, precio o None, anio].
+AGRUPACIONES_MATERIALIZADAS = (None, "genero", "autor")
+# Más grupos con extremos por recalcular que esto: una sola pasada por toda la biblioteca
+EXTREMOS_POR_GRUPO_MAXIMO = 16
+# Mientras se escriben las fotos existe esta marca: si el programa se corta en el
+# medio, fotos y log pueden no corresponderse y se reconstruyen en la próxima lectura.
+AGREGADOS_MARCA = "volcando"
+
+
+def _grupo_vacio():
+    return {
+        "total": 0,             # libros del grupo (con o sin precio válido)
+        "cantidad": 0,          # libros con precio válido
+        "suma": 0.0,
+        "media": 0.0,           # media y suma de desvíos al cuadrado (Welford),
+        "m2": 0.0,              # igual que _Acumulador
+        "minimo": None,
+        "maximo": None,
+        "recalcular": False,    # una baja se llevó el mínimo o el máximo
+        "precios": {},          # histograma: barra (ver _cubeta_precio) -> cantidad
+        "anios": {},            # histograma: año -> cantidad
+    }
+
+
+def _precio_agregado(valor):
+    """Precio como float (None si falta o no es un número finito)."""
+    try:
+        precio = float(valor) if valor else None
+    except (TypeError, ValueError):
+        return None
+    return precio if precio is not None and math.isfinite(precio) else None
+
+
+def _libro_agregado(libro):
+    """Libro (diccionario) -> [genero, autor, precio, anio] para el log de agregados."""
+    return [libro.get("genero") or "", libro.get("autor") or "",
+            _precio_agregado(libro.get("precio")), _a_int(libro.get("anio"))]
+
+
+def _fila_agregada(fila):
+    """Igual que _libro_agregado, para una fila en el orden de REQUIRED_FIELDS."""
+    return [fila[3], fila[2], _precio_agregado(fila[4]), _a_int(fila[5])]
+
+
+def _cubeta_precio(precio):
+    """Barra del histograma de precios: floor(log(precio) en base RAZON_HISTOGRAMA), como texto."""
+    if precio is None:
+        return None
+    return str(math.floor(math.log(precio, RAZON_HISTOGRAMA))) if precio > 0 else "-inf"
+
+
+def _sumar_en_histograma(histograma, clave, signo):
+    cantidad = histograma.get(clave, 0) + signo
+    if cantidad:
+        histograma[clave] = cantidad
+    else:
+        histograma.pop(clave, None)
+
+
+def _sumar_a_grupo(grupo, precio, anio, signo):
+    """Suma (signo=1) o resta (signo=-1) un libro de un grupo."""
+    grupo["total"] += signo
+    _sumar_en_histograma(grupo["anios"], str(anio), signo)
+    if precio is None:
+        return
+    grupo["cantidad"] += signo
+    grupo["suma"] += signo * precio
+    if grupo["cantidad"] > 0:
+        # Welford (y su inversa para las bajas): sin restar sumas de cuadrados grandes
+        media = grupo["media"] + signo * (precio - grupo["media"]) / grupo["cantidad"]
+        grupo["m2"] = max(0.0, grupo["m2"] + signo * (precio - grupo["media"]) * (precio - media))
+        grupo["media"] = media
+    _sumar_en_histograma(grupo["precios"], _cubeta_precio(precio), signo)
+    if signo > 0:
+        if grupo["minimo"] is None or precio < grupo["minimo"]:
+            grupo["minimo"] = precio
+        if grupo["maximo"] is None or precio > grupo["maximo"]:
+            grupo["maximo"] = precio
+    elif grupo["cantidad"] <= 0:
+        grupo.update(suma=0.0, media=0.0, m2=0.0, minimo=None, maximo=None, recalcular=False)
+    elif grupo["minimo"] is None or precio <= grupo["minimo"] or precio >= grupo["maximo"]:
+        # Sin los valores no sabemos cuál es el nuevo extremo: se recalcula al leer
+        grupo["recalcular"] = True
+
+
+def _aplicar_agregados(agregados, agregar=(), quitar=()):
+    """Aplica altas y bajas ([genero, autor, precio, anio]) a las dimensiones cargadas en `agregados`."""
+    for signo, libros in ((-1, quitar), (1, agregar)):
+        for genero, autor, precio, anio in libros:
+            for dimension, grupos in agregados.items():
+                clave = "" if dimension == "global" else (genero if dimension == "genero" else autor)
+                grupo = grupos.get(clave)
+                if grupo is None:
+                    grupo = grupos[clave] = _grupo_vacio()
+                _sumar_a_grupo(grupo, precio, anio, signo)
+                if clave and grupo["total"] <= 0:
+                    del grupos[clave]  # el género/autor se quedó sin libros
+
+
+def _agregados_desde_libros(libros):
+    """Agregados de todas las dimensiones a partir de una pasada por `libros`."""
+    agregados = {d: {} for d in DIMENSIONES_AGREGADOS}
+    agregados["global"][""] = _grupo_vacio()
+    _aplicar_agregados(agregados, agregar=(_libro_agregado(l) for l in libros))
+    return agregados
+
+
+def _ruta_agregados(root, nombre):
+    return os.path.join(root, AGREGADOS_DIR, nombre)
+
+
+def _cargar_agregados(root, dimensiones):
+    """
+    Fotos de `dimensiones` con el log ya aplicado (se llama con el bloqueo
+    "agregados" tomado). Retorna None si todavía no se construyeron o si un
+    volcado quedó a medias.
+    """
+    if os.path.exists(_ruta_agregados(root, AGREGADOS_MARCA)):
+        return None
+    agregados = {}
+    for dimension in dimensiones:
+        try:
+            with open(_ruta_agregados(root, f"{dimension}.json"), "r", encoding="utf-8") as f:
+                agregados[dimension] = json.loads(f.read())
+        except (OSError, ValueError):
+            return None
+        if any("m2" not in g for g in agregados[dimension].values()):
+            return None  # fotos de una versión anterior (con suma de cuadrados)
+    try:
+        with open(_ruta_agregados(root, AGREGADOS_LOG), "r", encoding="utf-8") as f:
+            for linea in f:
+                try:
+                    cambio = json.loads(linea)
+                except ValueError:
+                    continue  # línea cortada por un corte del programa
+                _aplicar_agregados(agregados, cambio.get("agregar", ()), cambio.get("quitar", ()))
+    except FileNotFoundError:
+        pass
+    return agregados
+
+
+def _guardar_agregados(root, agregados):
+    """
+    Escribe las fotos de todas las dimensiones y vacía el log (con el bloqueo
+    "agregados" tomado). Cada foto va a un temporal y se reemplaza con os.replace;
+    la marca AGREGADOS_MARCA cubre el tramo en que fotos y log no se corresponden.
+    """
+    os.makedirs(os.path.join(root, AGREGADOS_DIR), exist_ok=True)
+    marca = _ruta_agregados(root, AGREGADOS_MARCA)
+    temp = None
+    try:
+        open(marca, "w").close()
+        # "global" al final: los escritores solo anotan si su foto existe
+        for dimension in reversed(DIMENSIONES_AGREGADOS):
+            destino = _ruta_agregados(root, f"{dimension}.json")
+            temp = _ruta_temporal(destino)
+            with open(temp, "w", encoding="utf-8") as f:
+                f.write(json.dumps(agregados[dimension], ensure_ascii=False, separators=(",", ":")))
+            os.replace(temp, destino)
+        temp = None
+        _borrar_si_existe(_ruta_agregados(root, AGREGADOS_LOG))
+        os.remove(marca)
+    except OSError:
+        if temp is not None:
+            _borrar_si_existe(temp)
+
+
+def _registrar_agregados(root, agregar=(), quitar=()):
+    """
+    Anota altas/bajas en el log de agregados (O(1): no reescribe las fotos).
+    - La llaman los escritores con el bloqueo del CSV todavía tomado, así una
+    reconstrucción nunca cuenta un libro dos veces ni lo pierde.
+    - Si los agregados no existen no anota nada (se construyen al leerlos).
+    - Si no puede escribir, los invalida: mejor reconstruirlos que mostrar datos viejos.
+    """
+    if not agregar and not quitar:
+        return
+    try:
+        with _bloqueo_nombrado(root, "agregados"):
+            if not os.path.exists(_ruta_agregados(root, "global.json")):
+                return
+            with open(_ruta_agregados(root, AGREGADOS_LOG), "a", encoding="utf-8") as f:
+                f.write(json.dumps({"agregar": agregar, "quitar": quitar},
+                                   ensure_ascii=False, separators=(",", ":")) + "\n")
+    except OSError:
+        _invalidar_agregados(root)
+
+
+def _invalidar_agregados(root):
+    """Descarta los agregados: la próxima lectura los reconstruye con una pasada completa."""
+    try:
+        with _bloqueo_nombrado(root, "agregados"):
+            _borrar_si_existe(_ruta_agregados(root, "global.json"))
+    except OSError:
+        pass
+
+
+def _recalcular_extremos(root, agregados):
+    """
+    Recalcula mínimo y máximo de los grupos marcados por una baja.
+    - Pocos grupos: se lee solo su parte de la biblioteca (iter_libros poda por
+    género o autor). Muchos: una sola pasada por toda la biblioteca.
+    - El global sale de los géneros (ya corregidos).
+    """
+    pendientes = {d: {c for c, g in agregados[d].items() if g["recalcular"]} for d in ("genero", "autor")}
+    if sum(len(c) for c in pendientes.values()) > EXTREMOS_POR_GRUPO_MAXIMO:
+        libros = iter_libros(root)
+    else:
+        libros = itertools.chain(
+            itertools.chain.from_iterable(iter_libros(root, genero=g) for g in pendientes["genero"]),
+            itertools.chain.from_iterable(iter_libros(root, autor=a) for a in pendientes["autor"]))
+    extremos = {}
+    for libro in libros:
+        precio = _precio_agregado(libro.get("precio"))
+        if precio is None:
+            continue
+        for dimension in ("genero", "autor"):
+            clave = libro.get(dimension)
+            if clave in pendientes[dimension]:
+                actual = extremos.get((dimension, clave))
+                extremos[dimension, clave] = (precio, precio) if actual is None else \
+                    (min(actual[0], precio), max(actual[1], precio))
+    for dimension, claves in pendientes.items():
+        for clave in claves:
+            grupo = agregados[dimension][clave]
+            grupo["minimo"], grupo["maximo"] = extremos.get((dimension, clave), (None, None))
+            grupo["recalcular"] = False
+
+    general = agregados["global"].setdefault("", _grupo_vacio())
+    if general["recalcular"]:
+        con_precio = [g for g in agregados["genero"].values() if g["minimo"] is not None]
+        general["minimo"] = min((g["minimo"] for g in con_precio), default=None)
+        general["maximo"] = max((g["maximo"] for g in con_precio), default=None)
+        general["recalcular"] = False
+
+
+def _leer_agregados(root, dimensiones):
+    """
+    Agregados al día de `dimensiones` (None si hay que reconstruirlos).
+    Si algún grupo leído tiene extremos por recalcular o el log pasó
+    AGREGADOS_LOG_MAXIMO, carga todas las dimensiones, las corrige y vuelca el
+    log a las fotos. Todo con el bloqueo "agregados": los escritores que
+    terminen mientras tanto anotan sus cambios después de la corrección.
+    """
+    with _bloqueo_nombrado(root, "agregados"):
+        agregados = _cargar_agregados(root, dimensiones)
+        if agregados is None:
+            return None
+        pendiente = any(g["recalcular"] for grupos in agregados.values() for g in grupos.values())
+        try:
+            volcar = os.path.getsize(_ruta_agregados(root, AGREGADOS_LOG)) > AGREGADOS_LOG_MAXIMO
+        except OSError:
+            volcar = False
+        if pendiente or volcar:
+            agregados = _cargar_agregados(root, DIMENSIONES_AGREGADOS)
+            if agregados is None:
+                return None
+            _recalcular_extremos(root, agregados)
+            _guardar_agregados(root, agregados)
+        return agregados
+
+
+def _reconstruir_agregados(root):
+    """Pasada completa por la biblioteca sin escrituras en curso; guarda y retorna los agregados."""
+    # Orden de bloqueos: lote > CSV (todas las cubetas) > agregados
+    with _bloqueo_nombrado(root, "lote"), _bloqueo_todos_los_csv(root), _bloqueo_nombrado(root, "agregados"):
+        agregados = _agregados_desde_libros(iter_libros(root))
+        _guardar_agregados(root, agregados)
+    return agregados
+
+
+def _valor_en_posicion(grupo, barras, posicion, cantidad):
+    """
+    Valor estimado del precio en `posicion` (0 = el más barato) según el histograma.
+    - La primera y la última posición son el mínimo y el máximo exactos.
+    - Dentro de una barra los precios se suponen repartidos de forma pareja.
+    """
+    if posicion == 0 and grupo["minimo"] is not None:
+        return grupo["minimo"]
+    if posicion == cantidad - 1 and grupo["maximo"] is not None:
+        return grupo["maximo"]
+    acumulado = 0
+    for barra, n in barras:
+        if posicion < acumulado + n:
+            break
+        acumulado += n
+    # La barra "-inf" (precios <= 0) va de 0.0 a 0.0
+    desde, hasta = RAZON_HISTOGRAMA ** barra, RAZON_HISTOGRAMA ** (barra + 1)
+    valor = desde + (hasta - desde) * (posicion - acumulado + 0.5) / n
+    if grupo["minimo"] is not None:
+        valor = min(max(valor, grupo["minimo"]), grupo["maximo"])
+    return valor
+
+
+def _cuantil_histograma(grupo, p):
+    """
+    Cuantil `p` aproximado a partir del histograma de precios.
+    - Misma interpolación que _CuantilP2.valor con pocos datos: posición p*(n-1)
+    e interpolación lineal entre los valores de las dos posiciones vecinas.
+    """
+    barras = sorted((float(b), n) for b, n in grupo["precios"].items() if n > 0)
+    if not barras:
+        return None
+    cantidad = sum(n for _, n in barras)
+    pos = p * (cantidad - 1)
+    i = int(pos)
+    valor = _valor_en_posicion(grupo, barras, i, cantidad)
+    if i + 1 >= cantidad:
+        return valor
+    siguiente = _valor_en_posicion(grupo, barras, i + 1, cantidad)
+    return valor + (siguiente - valor) * (pos - i)
+
+
+def _resultado_grupo(grupo):
+    """Grupo materializado -> mismas claves que calcular_estadisticas, más "anios" ({año: libros})."""
+    n = grupo["cantidad"]
+    varianza = grupo["m2"] / (n - 1) if n > 1 else 0.0
+    datos = {
+        "total": grupo["total"],
+        "cantidad": n,
+        "minimo": grupo["minimo"],
+        "maximo": grupo["maximo"],
+        "suma": grupo["suma"],
+        "promedio": grupo["media"] if n > 0 else None,
+        "varianza": varianza,
+        "desvio": math.sqrt(varianza),
+    }
+    for p in CUANTILES:
+        datos[_nombre_cuantil(p)] = _cuantil_histograma(grupo, p)
+    datos["anios"] = {int(a): n for a, n in sorted(grupo["anios"].items(), key=lambda x: int(x[0]))}
+    return datos
+
+
+def _resultado_agregados(agregados, agrupar_por):
+    grupos = agregados[agrupar_por] if agrupar_por else {}
+    return {
+        "global": _resultado_grupo(agregados["global"].get("", _grupo_vacio())),
+        "grupos": {clave: _resultado_grupo(g) for clave, g in grupos.items()},
+    }
+
+
+@_medido
+@_con_backend
+def agregados_biblioteca(root, agrupar_por=None):
+    """
+    Estadísticas de precio de toda la biblioteca sin leer los CSV.
+    - Se mantienen en cada escritura: alta_libro, alta_libros_bulk y aplicar_lote
+    (actualizar/eliminar) anotan sus cambios en AGREGADOS_LOG con costo O(1).
+    - Leer cuesta O(grupos): el global y los géneros son unos pocos; por autor,
+    uno por autor. No depende de la cantidad de libros.
+    - Una baja que se lleva el mínimo o el máximo de un grupo lo marca: en la
+    próxima lectura se recalcula leyendo solo los libros de ese grupo.
+    - La primera vez (o después de un lote recuperado) se construyen con una
+    pasada completa.
+    - agrupar_por: None, "genero" o "autor" (para "anio" o tuplas usar
+    calcular_estadisticas con iter_libros). Lanza ValueError con otro valor.
+    - Retorna lo mismo que calcular_estadisticas, con "mediana" y "p90" interpolados
+    en el histograma de precios (ver RAZON_HISTOGRAMA) y además "anios": {año: libros}
+    en cada grupo.
+    """
+    if agrupar_por not in AGRUPACIONES_MATERIALIZADAS:
+        raise ValueError(f"agrupar_por debe ser uno de {AGRUPACIONES_MATERIALIZADAS}.")
+    dimensiones = ("global",) + ((agrupar_por,) if agrupar_por else ())
+    agregados = _leer_agregados(root, dimensiones)
+    if agregados is None:
+        agregados = _reconstruir_agregados(root)
+    return _resultado_agregados(agregados, agrupar_por)
+
+
+@_medido
+def estadisticas_biblioteca(root, agrupar_por=None):
+    """
+    Muestra las estadísticas de toda la biblioteca (mismo formato que estadisticas).
+    - Sin agrupar, por género o por autor usa agregados_biblioteca (no lee los CSV);
+    por año recorre la biblioteca con iter_libros.
+    - Retorna el resultado estructurado.
+    """
+    if agrupar_por in AGRUPACIONES_MATERIALIZADAS:
+        resultado = agregados_biblioteca(root, agrupar_por)
+    else:
+        resultado = calcular_estadisticas(iter_libros(root), agrupar_por)
+    _mostrar_estadisticas(resultado, agrupar_por)
+    return resultado
+
+
+def _diferencias_grupo(dimension, clave, guardado, real):
+    """Campos en que un grupo materializado no coincide con el calculado (textos)."""
+    nombre = "global" if dimension == "global" else f"{dimension} {clave!r}"
+    if guardado is None:
+        return [f"{nombre}: falta en los agregados"]
+    if real is None:
+        return [f"{nombre}: sobra en los agregados"]
+    diferencias = []
+    for campo in ("total", "cantidad", "minimo", "maximo", "suma", "media", "m2", "precios", "anios"):
+        a, b = guardado.get(campo), real[campo]
+        if campo in ("suma", "media", "m2"):
+            # media y m2 dependen del orden de altas y bajas (redondeo)
+            iguales = a is not None and math.isclose(a, b, rel_tol=1e-6, abs_tol=1e-6)
+        else:
+            iguales = a == b
+        if not iguales:
+            detalle = "histograma distinto" if isinstance(b, dict) else f"{a} (real: {b})"
+            diferencias.append(f"{nombre}: {campo} {detalle}")
+    return diferencias
+
+
+@_medido
+@_con_backend
+def verificar_agregados(root, reparar=False):
+    """
+    Compara los agregados materializados con una pasada completa por la biblioteca.
+    - Mientras compara tiene los bloqueos de escritura (lote y todos los CSV):
+    ambos lados corresponden al mismo estado.
+    - Retorna una lista de diferencias en texto (vacía si están al día), por ejemplo
+    "genero 'Historia': minimo 120.0 (real: 130.0)".
+    - Con reparar=True, si hay diferencias guarda los agregados recién calculados.
+    """
+    with _bloqueo_nombrado(root, "lote"), _bloqueo_todos_los_csv(root):
+        guardados = _leer_agregados(root, DIMENSIONES_AGREGADOS)
+        reales = _agregados_desde_libros(iter_libros(root))
+        if guardados is None:
+            diferencias = ["los agregados no están construidos (se construyen en la próxima lectura)"]
+        else:
+            diferencias = []
+            for dimension in DIMENSIONES_AGREGADOS:
+                for clave in sorted(set(guardados[dimension]) | set(reales[dimension])):
+                    diferencias.extend(_diferencias_grupo(dimension, clave, guardados[dimension].get(clave),
+                                                          reales[dimension].get(clave)))
+        if reparar and diferencias:
+            with _bloqueo_nombrado(root, "agregados"):
+                _guardar_agregados(root, reales)
+    return diferencias
+
+
+@_medido
+@_con_backend
+def reconstruir_agregados(root):
+    """Reconstruye los agregados con una pasada completa. Retorna la cantidad de libros."""
+    return _reconstruir_agregados(root)["global"][""]["total"]
+
+
+# --------------------------- FILTRO ----------------------------------
+@_medido
+def filtrar_libros(libros, atributo, valor):
+    """
+    Filtra la lista `libros` por `atributo == valor` (comparación case-insensitive).
+    - Parámetros:
+        libros: lista de diccionarios (resultado de leer_toda_jerarquia) o cualquier
+            iterable de libros, por ejemplo el generador iter_libros
+        atributo: nombre de la columna (ej. 'genero', 'autor', 'anio')
+        valor: valor buscado (string)
+    - Retorna: lista con coincidencias (puede estar vacía).
+    - Imprime mensaje si no encuentra coincidencias.
+    - Con un CatalogoCompacto, para genero/autor/titulo se buscan primero los ids
+    que coinciden en la tabla de valores y luego se compara la columna de enteros;
+    el resultado es otro CatalogoCompacto.
+    - Con un MotorConsultas la búsqueda usa sus índices en memoria (para consultas
+    por rango o combinadas ver MotorConsultas.consultar y consultar_libros).
+    - precio y anio se comparan como números con cualquiera de los tres ("10.00"
+    encuentra 10); un valor no numérico no encuentra nada (no es un error).
+    """
+    resultado = []
+    numerico = atributo in ("precio", "anio")
+    buscado = _a_float(valor) if numerico else None
+    codificada = libros.columna_codificada(atributo) if isinstance(libros, CatalogoCompacto) else None
+    if numerico and math.isnan(buscado):
+        pass  # ningún precio/año es igual a un valor que no es un número
+    elif isinstance(libros, MotorConsultas):
+        resultado = libros.consultar((atributo, "=", buscado if numerico else valor))
+    elif codificada is not None:
+        ids, tabla = codificada
+        buscados = {i for i, v in enumerate(tabla.valores) if str(v).lower() == str(valor).lower()}
+        resultado = libros.seleccionar([i for i, x in enumerate(ids) if x in buscados])
+    elif isinstance(libros, CatalogoCompacto) and numerico:
+        # Comparación numérica sobre la columna tipada ("1500" == "1500.0")
+        columna = libros.precios if atributo == "precio" else libros.anios
+        resultado = libros.seleccionar([i for i, x in enumerate(columna) if x == buscado and x != ANIO_INVALIDO])
+    elif numerico:
+        # Igual que con el catálogo: "1500.00" en el CSV coincide con "1500"
+        resultado = [l for l in libros if _a_float(l.get(atributo)) == buscado]
+    else:
+        for l in libros:
+            if str(l.get(atributo, "")).lower() == str(valor).lower():
+                resultado.append(l)
+    if not resultado:
+        print(f"No se encontraron libros con {atributo} = {valor}.")
+    return resultado
+
+
+# --------------------------- CONSULTAS COMPUESTAS --------------------
+# Operadores de comparación admitidos en una condición (campo, operador, valor[, hasta])
+OPERADORES_CONSULTA = ("=", "!=", "<", "<=", ">", ">=", "entre", "prefijo")
+
+
+class MotorConsultas:
+    """
+    Motor de consultas compuestas sobre una biblioteca ya cargada en memoria
+    (lista de diccionarios o CatalogoCompacto).
+    - Al crearlo arma índices en memoria, una sola vez:
+        precio, anio: listas ordenadas de valores (búsqueda con bisect)
+        genero, autor: diccionarios valor en minúsculas -> posiciones
+    - Una condición es una tupla:
+        ("precio", "entre", 1000, 5000)   ambos extremos incluidos
+        ("anio", ">=", 1990)              también "=", "!=", "<", "<=", ">"
+        ("genero", "=", "Historia")       texto sin distinguir mayúsculas
+        ("autor", "prefijo", "Tol")
+      y se combinan con ("y", c1, c2, ...) / ("o", c1, c2, ...), anidables.
+    - Planificador: en un "y" se estima cuántas filas devuelve cada condición
+    con su índice (con bisect el conteo es exacto) y se resuelve solo la más
+    selectiva; el resto se verifica sobre esos candidatos. Sin índice útil se
+    recorre todo, como filtrar_libros.
+    - Es una foto de `libros`: si la biblioteca cambia hay que crear otro motor.
+    """
+
+    CAMPOS_ORDENADOS = ("precio", "anio")
+    CAMPOS_HASH = ("genero", "autor")
+
+    def __init__(self, libros):
+        self.libros = libros
+        self.total = len(libros)
+        compacto = isinstance(libros, CatalogoCompacto)
+        self.ordenados = {}
+        for campo in self.CAMPOS_ORDENADOS:
+            if compacto:
+                columna = libros.precios if campo == "precio" else \
+                    [math.nan if v == ANIO_INVALIDO else v for v in libros.anios]
+            else:
+                columna = [_a_float(l.get(campo)) for l in libros]
+            posiciones = sorted((i for i, v in enumerate(columna) if v == v), key=columna.__getitem__)
+            self.ordenados[campo] = ([columna[i] for i in posiciones], posiciones)
+        self.hash = {}
+        for campo in self.CAMPOS_HASH:
+            grupos = {}
+            codificada = libros.columna_codificada(campo) if compacto else None
+            if codificada is not None:
+                ids, tabla = codificada
+                por_id = {}
+                for i, x in enumerate(ids):
+                    por_id.setdefault(x, []).append(i)
+                for x, posiciones in por_id.items():
+                    grupos.setdefault(str(tabla.valores[x]).lower(), []).extend(posiciones)
+            else:
+                for i, l in enumerate(libros):
+                    grupos.setdefault(str(l.get(campo, "")).lower(), []).append(i)
+            self.hash[campo] = (grupos, sorted(grupos))
+
+    # ---- planificación ----
+    def _rango(self, campo, operador, valor, hasta=None):
+        """(desde, hasta) de posiciones en la lista ordenada de `campo` que cumplen la condición."""
+        valores = self.ordenados[campo][0]
+        x = _a_float(valor)
+        if operador == "=":
+            return bisect.bisect_left(valores, x), bisect.bisect_right(valores, x)
+        if operador == "<":
+            return 0, bisect.bisect_left(valores, x)
+        if operador == "<=":
+            return 0, bisect.bisect_right(valores, x)
+        if operador == ">":
+            return bisect.bisect_right(valores, x), len(valores)
+        if operador == ">=":
+            return bisect.bisect_left(valores, x), len(valores)
+        return bisect.bisect_left(valores, x), bisect.bisect_right(valores, _a_float(hasta))
+
+    def _claves_hash(self, campo, operador, valor):
+        """Claves del índice hash de `campo` que cumplen la condición (igualdad o prefijo)."""
+        grupos, claves = self.hash[campo]
+        buscado = str(valor).lower()
+        if operador == "=":
+            return [buscado] if buscado in grupos else []
+        encontradas = []
+        for j in range(bisect.bisect_left(claves, buscado), len(claves)):
+            if not claves[j].startswith(buscado):
+                break
+            encontradas.append(claves[j])
+        return encontradas
+
+    def _indexable(self, condicion):
+        campo, operador = condicion[0], condicion[1]
+        if campo in self.ordenados:
+            return operador not in ("!=", "prefijo")
+        if campo in self.hash:
+            return operador in ("=", "prefijo")
+        return False
+
+    def estimar(self, condicion):
+        """Cantidad de filas que devolvería `condicion` según los índices (total si no hay índice)."""
+        tipo = condicion[0]
+        if tipo == "y":
+            return min(self.estimar(c) for c in condicion[1:])
+        if tipo == "o":
+            return min(self.total, sum(self.estimar(c) for c in condicion[1:]))
+        if not self._indexable(condicion):
+            return self.total
+        campo = condicion[0]
+        if campo in self.ordenados:
+            desde, hasta = self._rango(*condicion)
+            return max(0, hasta - desde)
+        grupos = self.hash[campo][0]
+        return sum(len(grupos[k]) for k in self._claves_hash(*condicion))
+
+    def explicar(self, condicion):
+        """Describe el plan elegido para `condicion` (útil para ver qué índice se usa)."""
+        tipo = condicion[0]
+        if tipo == "y":
+            elegida = min(condicion[1:], key=self.estimar)
+            return (f"y: resolver [{self.explicar(elegida)}] y verificar "
+                    f"{len(condicion) - 2} condiciones sobre {self.estimar(elegida)} candidatos")
+        if tipo == "o":
+            return "o: unión de " + ", ".join(f"[{self.explicar(c)}]" for c in condicion[1:])
+        if self._indexable(condicion):
+            indice = "ordenado" if condicion[0] in self.ordenados else "hash"
+            return f"índice {indice} de {condicion[0]} ({self.estimar(condicion)} filas)"
+        return f"recorrido completo para {condicion[0]} ({self.total} filas)"
+
+    # ---- ejecución ----
+    def _posiciones(self, condicion):
+        """Posiciones (en cualquier orden, sin repetir) de las filas que cumplen `condicion`."""
+        tipo = condicion[0]
+        if tipo == "y":
+            resto = list(condicion[1:])
+            elegida = min(resto, key=self.estimar)
+            resto.remove(elegida)
+            candidatos = self._posiciones(elegida)
+            if not resto:
+                return candidatos
+            verificar = ("y", *resto) if len(resto) > 1 else resto[0]
+            return [i for i in candidatos if self.cumple(i, verificar)]
+        if tipo == "o":
+            if self.estimar(condicion) >= self.total:
+                return [i for i in range(self.total) if self.cumple(i, condicion)]
+            unidas = set()
+            for c in condicion[1:]:
+                unidas.update(self._posiciones(c))
+            return list(unidas)
+        if not self._indexable(condicion):
+            return [i for i in range(self.total) if self.cumple(i, condicion)]
+        campo = condicion[0]
+        if campo in self.ordenados:
+            desde, hasta = self._rango(*condicion)
+            return self.ordenados[campo][1][desde:hasta]
+        grupos = self.hash[campo][0]
+        return [i for k in self._claves_hash(*condicion) for i in grupos[k]]
+
+    def cumple(self, i, condicion):
+        """True si la fila `i` cumple `condicion` (se evalúa directamente sobre la fila)."""
+        tipo = condicion[0]
+        if tipo == "y":
+            return all(self.cumple(i, c) for c in condicion[1:])
+        if tipo == "o":
+            return any(self.cumple(i, c) for c in condicion[1:])
+        campo, operador, valor = condicion[0], condicion[1], condicion[2]
+        actual = self.libros[i].get(campo)
+        if campo in CAMPOS_NUMERICOS:
+            actual, valor = _a_float(actual), _a_float(valor)
+            if actual != actual:
+                return operador == "!="
+        else:
+            actual, valor = str(actual if actual is not None else "").lower(), str(valor).lower()
+        if operador == "=":
+            return actual == valor
+        if operador == "!=":
+            return actual != valor
+        if operador == "<":
+            return actual < valor
+        if operador == "<=":
+            return actual <= valor
+        if operador == ">":
+            return actual > valor
+        if operador == ">=":
+            return actual >= valor
+        if operador == "prefijo":
+            return str(actual).startswith(valor)
+        hasta = _a_float(condicion[3]) if campo in CAMPOS_NUMERICOS else str(condicion[3]).lower()
+        return valor <= actual <= hasta
+
+    def consultar(self, condicion):
+        """
+        Devuelve los libros que cumplen `condicion`, en el orden original.
+        - Con una lista de diccionarios retorna una lista; con un CatalogoCompacto,
+        otro CatalogoCompacto (como filtrar_libros).
+        """
+        _validar_condicion(condicion)
+        posiciones = sorted(self._posiciones(condicion))
+        if isinstance(self.libros, CatalogoCompacto):
+            return self.libros.seleccionar(posiciones)
+        return [self.libros[i] for i in posiciones]
+
+
+def _validar_condicion(condicion):
+    """Lanza ValueError si `condicion` no tiene la forma esperada por MotorConsultas."""
+    if not isinstance(condicion, tuple) or not condicion:
+        raise ValueError(f"Condición inválida: {condicion!r}")
+    if condicion[0] in ("y", "o"):
+        if len(condicion) < 2:
+            raise ValueError(f"'{condicion[0]}' necesita al menos una condición.")
+        for c in condicion[1:]:
+            _validar_condicion(c)
+        return
+    if len(condicion) < 3 or condicion[1] not in OPERADORES_CONSULTA:
+        raise ValueError(f"Condición inválida: {condicion!r}")
+    if condicion[1] == "entre" and len(condicion) != 4:
+        raise ValueError("'entre' necesita dos valores: (campo, 'entre', desde, hasta).")
+    if condicion[1] == "prefijo" and condicion[0] in CAMPOS_NUMERICOS:
+        raise ValueError(f"'prefijo' solo se aplica a columnas de texto, no a {condicion[0]}.")
+    if condicion[0] in CAMPOS_NUMERICOS:
+        # Un valor no numérico sería nan: con bisect coincidiría con todas las filas
+        for valor in condicion[2:]:
+            if _a_float(valor) != _a_float(valor):
+                raise ValueError(f"{condicion[0]} necesita un valor numérico, no {valor!r}.")
+
+
+# campo operador valor, ej. "precio>=1000", "genero = Historia", "autor^=Tol"
+_PATRON_CONDICION = re.compile(r"^\s*(\w+)\s*(\^=|!=|>=|<=|=|<|>)\s*(.*?)\s*$")
+# lo que tiene que seguir a un "&" o "|" para que separe condiciones
+_INICIO_CONDICION = re.compile(r"\s*(\w+\s*(\^=|!=|>=|<=|=|<|>)|$)")
+
+
+def _partir_consulta(texto):
+    """
+    Separa la consulta en alternativas ("|") de términos ("&"). Un "&" o "|" solo
+    separa si afuera de comillas y si lo sigue otra condición (campo y operador);
+    si no, es parte del valor: "titulo=Crimen & castigo" es una sola condición.
+    """
+    alternativas, terminos, actual = [], [], []
+    en_comillas = False
+    for i, caracter in enumerate(texto):
+        if caracter == '"':
+            en_comillas = not en_comillas
+        elif caracter in "&|" and not en_comillas and _INICIO_CONDICION.match(texto, i + 1):
+            terminos.append("".join(actual))
+            actual = []
+            if caracter == "|":
+                alternativas.append(terminos)
+                terminos = []
+            continue
+        actual.append(caracter)
+    if en_comillas:
+        raise ValueError(f"Faltan cerrar comillas en la consulta: '{texto.strip()}'")
+    terminos.append("".join(actual))
+    alternativas.append(terminos)
+    return alternativas
+
+
+def parsear_consulta(texto):
+    """
+    Convierte una consulta escrita en texto a la tupla que usa MotorConsultas.
+    - Condiciones: campo=valor, campo!=valor, campo<valor (<=, >, >=),
+      campo=desde..hasta (rango incluido) y campo^=texto (empieza con).
+    - "&" une condiciones con "y"; "|" con "o" ("&" tiene prioridad).
+      Ej.: "precio=1000..5000 & anio>=1990 & genero=Historia"
+    - Un valor puede tener "&" o "|" mientras no los siga otra condición
+      ("titulo=Crimen & castigo"); entre comillas se toma tal cual, sin rangos ni
+      separadores ('titulo="A & b=c"', 'titulo="1..2"'). No admite comillas adentro.
+    - Lanza ValueError si alguna condición no se puede interpretar (también si
+      precio o anio no tienen un valor numérico).
+    """
+    alternativas = []
+    for terminos in _partir_consulta(texto):
+        condiciones = []
+        for termino in terminos:
+            coincidencia = _PATRON_CONDICION.match(termino)
+            if not coincidencia or not coincidencia.group(3).strip('"'):
+                raise ValueError(f"No se entiende la condición: '{termino.strip()}'")
+            campo, operador, valor = coincidencia.groups()
+            literal = len(valor) >= 2 and valor[0] == valor[-1] == '"'
+            if literal:
+                valor = valor[1:-1]
+            elif '"' in valor:
+                raise ValueError(f"Las comillas tienen que encerrar todo el valor: '{termino.strip()}'")
+            if operador == "^=":
+                condiciones.append((campo, "prefijo", valor))
+            elif operador == "=" and ".." in valor and not literal:
+                desde, hasta = valor.split("..", 1)
+                condiciones.append((campo, "entre", desde.strip(), hasta.strip()))
+            else:
+                condiciones.append((campo, operador, valor))
+        alternativas.append(condiciones[0] if len(condiciones) == 1 else ("y", *condiciones))
+    condicion = alternativas[0] if len(alternativas) == 1 else ("o", *alternativas)
+    _validar_condicion(condicion)
+    return condicion
+
+
+@_medido
+def consultar_libros(libros, consulta):
+    """
+    Atajo para una consulta suelta: `consulta` puede ser texto (ver parsear_consulta)
+    o una tupla de condiciones. `libros` puede ser un MotorConsultas ya armado (lo
+    conveniente si se hacen varias consultas) o la lista/catálogo, en cuyo caso se
+    arma el motor en el momento.
+    """
+    motor = libros if isinstance(libros, MotorConsultas) else MotorConsultas(libros)
+    condicion = parsear_consulta(consulta) if isinstance(consulta, str) else consulta
+    return motor.consultar(condicion)
+
+
+@_medido
+@_con_backend
+def consultar_biblioteca(root, consulta):
+    """
+    Consulta compuesta directamente sobre una biblioteca guardada (ver parsear_consulta).
+    - Jerarquía de CSV: carga el catálogo compacto y usa MotorConsultas.
+    - SQLite: la condición se traduce a SQL y la resuelven los índices de la base.
+    """
+    return consultar_libros(cargar_catalogo_compacto(root), consulta)
+
+
+@_medido
+def copiar_biblioteca(origen, destino, lote=100000):
+    """
+    Importa/exporta: copia todos los libros de la biblioteca `origen` a `destino`.
+    Cualquiera de las dos puede ser una carpeta de CSV o un archivo SQLite, por
+    ejemplo copiar_biblioteca("./biblioteca", "biblioteca.db") para migrar.
+    - Se lee en streaming (iter_libros) y se escribe con alta_libros_bulk
+    conservando los codigo_libro.
+    - Retorna el resumen de alta_libros_bulk.
+    """
+    inicializar_root(destino)
+    return alta_libros_bulk(destino, iter_libros(origen), lote, conservar_codigos=True)
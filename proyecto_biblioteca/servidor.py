@@ -0,0 +1,479 @@
+# ============================================================
+# Servicio HTTP/JSON local de la biblioteca (asyncio)
+# ============================================================
+# Expone las mismas operaciones que el menú de Sistema_de_persistencia_avanzada.py
+# (alta, lectura, modificación, baja, ordenamiento, estadísticas y filtro) para
+# que varios clientes las usen a la vez sin volver a leer toda la jerarquía en
+# cada pedido. Solo usa la biblioteca estándar.
+#
+# Uso (desde proyecto_biblioteca/):
+#     python servidor.py [ROOT] [--host 127.0.0.1] [--puerto 8080] [--trabajadores N]
+# ROOT puede ser una carpeta de CSV o un archivo .db (igual que el menú).
+#
+# Rutas (todas responden JSON; los errores son {"error": "mensaje"}):
+#     GET    /salud                               estado del servicio y del caché
+#     GET    /libros?desde=0&limite=100           listado (paginado opcional)
+#     GET    /libros/<codigo>                     un libro, con su "_version"
+#     POST   /libros                              alta: un objeto o una lista de objetos
+#     PATCH  /libros/<codigo>                     {"precio", "anio", "version"}
+#     DELETE /libros/<codigo>                     cuerpo opcional {"version"}
+#     GET    /ordenar?clave=genero,-precio&limite=10
+#     GET    /estadisticas?agrupar=genero
+#     GET    /filtrar?atributo=autor&valor=Tolkien
+#     GET    /filtrar?consulta=precio%3D1000..5000%20%26%20anio>%3D1990
+#     GET    /metricas                            métricas de funciones_jerarquia
+#
+# Caché:
+# - Las lecturas (listado, ordenar, estadísticas, filtrar) usan un único
+#   CatalogoCompacto en memoria, compartido por todos los pedidos; el
+#   MotorConsultas se arma recién con el primer filtro.
+# - Toda escritura hecha por el servicio invalida el caché. Además, antes de
+#   usarlo se compara la firma del manifiesto (o del archivo SQLite): si otro
+#   proceso escribió la biblioteca (p. ej. el menú), el caché se recarga.
+# - La E/S de archivos y los cálculos pesados corren en un pool de hilos
+#   (run_in_executor), así el bucle de eventos sigue atendiendo conexiones.
+import argparse
+import asyncio
+import concurrent.futures
+import functools
+import json
+import os
+import sys
+import urllib.parse
+import uuid
+
+import funciones_jerarquia as fcs
+
+# Tamaño máximo del cuerpo de un pedido (altas en lote incluidas)
+MAX_CUERPO = 64 * 1024 * 1024
+
+MENSAJES_HTTP = {
+    200: "OK", 201: "Created", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+    409: "Conflict", 413: "Payload Too Large", 500: "Internal Server Error",
+}
+
+
+class ErrorHTTP(Exception):
+    """Error que se responde al cliente con el código `estado` y {"error": mensaje}."""
+
+    def __init__(self, estado, mensaje):
+        super().__init__(mensaje)
+        self.estado = estado
+
+
+# --------------------------- CACHÉ ----------------------------------
+def firma_biblioteca(root):
+    """
+    Firma barata (solo os.stat) que cambia con cada escritura de cualquier proceso.
+    - Carpetas de CSV: todas las escrituras agregan una línea al log del manifiesto
+    (o lo compactan en la foto), así que alcanza con las firmas de esos dos archivos.
+    - SQLite: el archivo de la base y su WAL.
+    No detecta CSV editados a mano (para eso está la opción "v" del menú).
+    """
+    if fcs.es_sqlite(root):
+        rutas = (root, root + "-wal")
+    else:
+        rutas = (os.path.join(root, fcs.MANIFIESTO_FILE), os.path.join(root, fcs.MANIFIESTO_LOG))
+    firma = []
+    for ruta in rutas:
+        try:
+            firma.append(fcs._firma(ruta))
+        except OSError:
+            firma.append(None)
+    return firma
+
+
+class CacheCatalogo:
+    """
+    Catálogo compacto "caliente" compartido por todos los pedidos.
+    - obtener(): devuelve el catálogo; si no está cargado (o la biblioteca cambió)
+    lo carga en el pool de hilos. Los pedidos que llegan durante una carga
+    esperan esa misma carga (no se lee la biblioteca dos veces).
+    - invalidar(): lo descarta; lo llama el servicio después de cada escritura.
+    - generacion: cuenta las invalidaciones. Una carga que empezó antes de una
+    invalidación entrega su resultado a quienes la esperaban, pero no queda
+    guardada: el siguiente pedido ya ve la escritura.
+    - memorizar(): guarda además los resultados de las lecturas (estadísticas,
+    ordenamientos, filtros) calculados sobre el catálogo vigente; se descartan
+    junto con él. Como mucho MAX_RESULTADOS por carga (se olvidan los más viejos).
+    """
+
+    MAX_RESULTADOS = 256
+
+    def __init__(self, root, ejecutar):
+        self.root = root
+        self.ejecutar = ejecutar  # corrutina que corre una función en el pool
+        self.catalogo = None
+        self.firma = None
+        self.motor = None
+        self.generacion = 0
+        self.cargas = 0
+        self.resultados = {}
+        self._carga = None
+
+    def invalidar(self):
+        self.generacion += 1
+        self.catalogo = None
+        self.motor = None
+        self.resultados = {}
+        self._carga = None
+
+    async def obtener(self):
+        if self.catalogo is not None and firma_biblioteca(self.root) != self.firma:
+            self.invalidar()  # la escribió otro proceso
+        if self.catalogo is not None:
+            return self.catalogo
+        if self._carga is None:
+            self._carga = asyncio.ensure_future(self._cargar())
+        # shield: si un cliente se desconecta, la carga sigue para los demás
+        return await asyncio.shield(self._carga)
+
+    async def _cargar(self):
+        generacion = self.generacion
+        tarea = self._carga
+        # La firma se toma antes de leer: si algo cambia durante la carga, la
+        # próxima comparación lo detecta (a lo sumo se recarga una vez de más).
+        firma = firma_biblioteca(self.root)
+        try:
+            catalogo = await self.ejecutar(fcs.cargar_catalogo_compacto, self.root)
+        finally:
+            if self._carga is tarea:
+                self._carga = None
+        if generacion == self.generacion:
+            self.catalogo, self.firma, self.motor, self.resultados = catalogo, firma, None, {}
+            self.cargas += 1
+        return catalogo
+
+    async def memorizar(self, clave, funcion):
+        """
+        Devuelve funcion(catalogo) calculada una sola vez por carga y `clave`: los
+        pedidos iguales que llegan mientras se calcula esperan ese mismo cálculo.
+        """
+        catalogo = await self.obtener()
+        # Los resultados de esta carga; si el catálogo ya quedó viejo no se guardan
+        resultados = self.resultados if self.catalogo is catalogo else {}
+        tarea = resultados.get(clave)
+        if tarea is None:
+            while len(resultados) >= self.MAX_RESULTADOS:
+                resultados.pop(next(iter(resultados)))
+            tarea = resultados[clave] = asyncio.ensure_future(self.ejecutar(funcion, catalogo))
+        try:
+            return await asyncio.shield(tarea)
+        except Exception:
+            if resultados.get(clave) is tarea:
+                del resultados[clave]  # los errores no se guardan
+            raise
+
+    async def obtener_motor(self):
+        """MotorConsultas sobre el catálogo vigente (se arma una vez por carga)."""
+        catalogo = await self.obtener()
+        motor = self.motor
+        if motor is None or motor.libros is not catalogo:
+            motor = await self.ejecutar(fcs.MotorConsultas, catalogo)
+            if self.catalogo is catalogo:
+                self.motor = motor
+        return motor
+
+
+# --------------------------- CONVERSIONES ---------------------------
+def libros_a_json(libros, desde=0, limite=None):
+    hasta = len(libros) if limite is None else min(len(libros), desde + limite)
+    return [fcs.libro_tipado(libros[i]) for i in range(desde, hasta)]
+
+
+def _entero(parametros, nombre, defecto=None):
+    valor = parametros.get(nombre)
+    if valor is None or valor == "":
+        return defecto
+    if not valor.isdigit():
+        raise ErrorHTTP(400, f"'{nombre}' debe ser un entero no negativo.")
+    return int(valor)
+
+
+def _version(valor):
+    """Acepta la "_version" tal como la devuelve GET /libros/<codigo> (texto)."""
+    if valor is None:
+        return None
+    if not isinstance(valor, str) or not valor:
+        raise ErrorHTTP(400, "'version' debe ser la \"_version\" devuelta al leer el libro.")
+    return valor
+
+
+# --------------------------- SERVICIO -------------------------------
+class ServicioBiblioteca:
+    """
+    Servidor HTTP/1.1 mínimo sobre asyncio (conexiones persistentes, cuerpos JSON).
+    - Cada conexión se atiende en una corrutina; las operaciones de
+    funciones_jerarquia corren en un ThreadPoolExecutor de `trabajadores` hilos.
+    - Las escrituras usan los mismos bloqueos entre procesos que el resto del
+    sistema, así que el menú u otros servicios pueden escribir a la vez.
+    """
+
+    def __init__(self, root, trabajadores=None):
+        self.root = root
+        self.pool = concurrent.futures.ThreadPoolExecutor(max_workers=trabajadores,
+                                                          thread_name_prefix="biblioteca")
+        self.cache = CacheCatalogo(root, self.ejecutar)
+        self.pedidos = 0
+        self.rutas = {
+            ("GET", "salud"): self.salud,
+            ("GET", "libros"): self.listar,
+            ("POST", "libros"): self.alta,
+            ("GET", "ordenar"): self.ordenar,
+            ("GET", "estadisticas"): self.estadisticas,
+            ("GET", "filtrar"): self.filtrar,
+            ("GET", "metricas"): self.metricas,
+        }
+        self.rutas_libro = {"GET": self.leer, "PATCH": self.actualizar, "DELETE": self.eliminar}
+
+    async def ejecutar(self, funcion, *args, **kwargs):
+        """Corre una función bloqueante en el pool de hilos."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.pool, functools.partial(funcion, *args, **kwargs))
+
+    # ---- lecturas (caché) ----
+    async def salud(self, parametros, cuerpo):
+        catalogo = self.cache.catalogo
+        return 200, {
+            "estado": "ok",
+            "backend": "sqlite" if fcs.es_sqlite(self.root) else "csv",
+            "pedidos": self.pedidos,
+            "cache": {"cargado": catalogo is not None, "libros": len(catalogo) if catalogo is not None else None,
+                      "cargas": self.cache.cargas, "generacion": self.cache.generacion},
+        }
+
+    async def listar(self, parametros, cuerpo):
+        catalogo = await self.cache.obtener()
+        desde = _entero(parametros, "desde", 0)
+        limite = _entero(parametros, "limite")
+        libros = await self.ejecutar(libros_a_json, catalogo, desde, limite)
+        return 200, {"total": len(catalogo), "desde": desde, "libros": libros}
+
+    async def ordenar(self, parametros, cuerpo):
+        clave = tuple(c.strip() for c in parametros.get("clave", "precio").split(",") if c.strip())
+        limite = _entero(parametros, "limite")
+
+        def calcular(catalogo):
+            ordenados = fcs.ordenar_libros(catalogo, list(clave), limite)
+            return {"total": len(ordenados), "libros": libros_a_json(ordenados)}
+
+        try:
+            return 200, await self.cache.memorizar(("ordenar", clave, limite), calcular)
+        except (KeyError, ValueError) as e:
+            raise ErrorHTTP(400, f"Clave de orden inválida: {e}")
+
+    async def estadisticas(self, parametros, cuerpo):
+        agrupar = parametros.get("agrupar") or None
+        if agrupar not in (None, "genero", "autor", "anio"):
+            raise ErrorHTTP(400, "'agrupar' debe ser genero, autor o anio.")
+
+        if agrupar in fcs.AGRUPACIONES_MATERIALIZADAS:
+            # Estadísticas materializadas: se leen de disco sin recorrer el catálogo
+            return 200, await self.ejecutar(fcs.agregados_biblioteca, self.root, agrupar)
+
+        def calcular(catalogo):
+            resultado = fcs.calcular_estadisticas(catalogo, agrupar)
+            resultado["grupos"] = {str(k): v for k, v in resultado["grupos"].items()}
+            return resultado
+
+        return 200, await self.cache.memorizar(("estadisticas", agrupar), calcular)
+
+    async def filtrar(self, parametros, cuerpo):
+        if parametros.get("consulta"):
+            try:
+                condicion = fcs.parsear_consulta(parametros["consulta"])
+            except ValueError as e:
+                raise ErrorHTTP(400, str(e))
+        elif parametros.get("atributo") and "valor" in parametros:
+            condicion = (parametros["atributo"], "=", parametros["valor"])
+        else:
+            raise ErrorHTTP(400, "Indique 'consulta' o 'atributo' y 'valor'.")
+        motor = await self.cache.obtener_motor()
+
+        def calcular(catalogo):
+            m = motor if motor.libros is catalogo else fcs.MotorConsultas(catalogo)
+            resultado = m.consultar(condicion)
+            return {"total": len(resultado), "libros": libros_a_json(resultado)}
+
+        try:
+            return 200, await self.cache.memorizar(("filtrar", repr(condicion)), calcular)
+        except (KeyError, ValueError) as e:
+            raise ErrorHTTP(400, f"Consulta inválida: {e}")
+
+    async def metricas(self, parametros, cuerpo):
+        return 200, fcs.obtener_metricas()
+
+    # ---- un libro (lectura directa, sin caché: trae "_version") ----
+    async def leer(self, codigo, parametros, cuerpo):
+        encontrados = await self.ejecutar(fcs.leer_libros_por_codigo, self.root, [codigo])
+        if not encontrados:
+            raise ErrorHTTP(404, "No se encontró un libro con ese código.")
+        libro = fcs.libro_tipado(encontrados[0])
+        libro["_version"] = encontrados[0].get("_version")
+        return 200, libro
+
+    # ---- escrituras (invalidan el caché) ----
+    async def alta(self, parametros, cuerpo):
+        registros = cuerpo if isinstance(cuerpo, list) else [cuerpo]
+        if not registros or not all(isinstance(r, dict) for r in registros):
+            raise ErrorHTTP(400, "Se espera un libro (objeto JSON) o una lista de libros.")
+        # Los códigos se asignan acá para poder devolverlos; alta_libros_bulk valida
+        # cada registro igual que el alta del menú y no imprime por fila.
+        nuevos = [dict(r, codigo_libro=str(uuid.uuid4())) for r in registros]
+        try:
+            resumen = await self.ejecutar(fcs.alta_libros_bulk, self.root, nuevos, conservar_codigos=True)
+        finally:
+            self.cache.invalidar()
+        rechazados = {numero for numero, _ in resumen["errores"]}
+        codigos = [n["codigo_libro"] for numero, n in enumerate(nuevos, start=1) if numero not in rechazados]
+        errores = [{"registro": numero, "error": mensaje} for numero, mensaje in resumen["errores"]]
+        if not codigos:
+            return 400, {"error": "Ningún libro es válido.", "errores": errores}
+        return 201, {"codigos": codigos, "errores": errores}
+
+    async def actualizar(self, codigo, parametros, cuerpo):
+        if not isinstance(cuerpo, dict):
+            raise ErrorHTTP(400, "Se espera un objeto JSON con 'precio' y/o 'anio'.")
+        cambios = {}
+        try:
+            if cuerpo.get("precio") not in (None, ""):
+                cambios["precio"] = fcs.validar_numero(str(cuerpo["precio"]))
+            if cuerpo.get("anio") not in (None, ""):
+                cambios["anio"] = fcs.validar_anio(str(cuerpo["anio"]))
+        except ValueError as e:
+            raise ErrorHTTP(400, str(e))
+        if not cambios:
+            raise ErrorHTTP(400, "Indique 'precio' y/o 'anio'.")
+        version = _version(cuerpo.get("version"))
+        return await self._aplicar(("actualizar", codigo, cambios), codigo, version, "actualizados")
+
+    async def eliminar(self, codigo, parametros, cuerpo):
+        version = _version(cuerpo.get("version")) if isinstance(cuerpo, dict) else None
+        return await self._aplicar(("eliminar", codigo), codigo, version, "eliminados")
+
+    async def _aplicar(self, operacion, codigo, version, contador):
+        try:
+            resumen = await self.ejecutar(fcs.aplicar_lote, self.root, [operacion], {codigo: version})
+        finally:
+            self.cache.invalidar()
+        if resumen["conflictos"]:
+            raise ErrorHTTP(409, "El libro fue modificado por otro proceso; vuelva a leerlo.")
+        if not resumen[contador]:
+            raise ErrorHTTP(404, "No se encontró un libro con ese código.")
+        return 200, {contador: resumen[contador]}
+
+    # ---- HTTP ----
+    async def despachar(self, metodo, destino, cuerpo):
+        """Resuelve un pedido. Retorna (estado, datos serializables)."""
+        url = urllib.parse.urlsplit(destino)
+        partes = [urllib.parse.unquote(p) for p in url.path.strip("/").split("/") if p]
+        parametros = dict(urllib.parse.parse_qsl(url.query, keep_blank_values=True))
+        try:
+            cuerpo = json.loads(cuerpo) if cuerpo else None
+        except ValueError:
+            raise ErrorHTTP(400, "El cuerpo no es JSON válido.")
+        if len(partes) == 2 and partes[0] == "libros":
+            manejador = self.rutas_libro.get(metodo)
+            if manejador is None:
+                raise ErrorHTTP(405, f"Método {metodo} no permitido en /libros/<codigo>.")
+            return await manejador(partes[1], parametros, cuerpo)
+        if len(partes) == 1 and (metodo, partes[0]) in self.rutas:
+            return await self.rutas[(metodo, partes[0])](parametros, cuerpo)
+        if len(partes) == 1 and any(ruta == partes[0] for _, ruta in self.rutas):
+            raise ErrorHTTP(405, f"Método {metodo} no permitido en /{partes[0]}.")
+        raise ErrorHTTP(404, f"Ruta desconocida: {url.path}")
+
+    async def atender(self, reader, writer):
+        """Atiende una conexión: uno o más pedidos HTTP/1.1 seguidos (keep-alive)."""
+        try:
+            while True:
+                linea = await reader.readline()
+                if not linea.strip():
+                    break
+                try:
+                    metodo, destino, version = linea.decode("latin-1").split()
+                except ValueError:
+                    await self._responder(writer, 400, {"error": "Pedido HTTP inválido."}, False)
+                    break
+                encabezados = {}
+                while True:
+                    h = await reader.readline()
+                    if h in (b"\r\n", b"\n", b""):
+                        break
+                    nombre, _, valor = h.decode("latin-1").partition(":")
+                    encabezados[nombre.strip().lower()] = valor.strip()
+                mantener = version == "HTTP/1.1" and encabezados.get("connection", "").lower() != "close"
+                largo = int(encabezados.get("content-length") or 0)
+                if largo > MAX_CUERPO:
+                    await self._responder(writer, 413, {"error": "Cuerpo demasiado grande."}, False)
+                    break
+                cuerpo = await reader.readexactly(largo) if largo else b""
+
+                self.pedidos += 1
+                try:
+                    estado, datos = await self.despachar(metodo.upper(), destino, cuerpo)
+                except ErrorHTTP as e:
+                    estado, datos = e.estado, {"error": str(e)}
+                except Exception as e:
+                    estado, datos = 500, {"error": f"{type(e).__name__}: {e}"}
+                await self._responder(writer, estado, datos, mantener)
+                if not mantener:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    @staticmethod
+    async def _responder(writer, estado, datos, mantener):
+        cuerpo = json.dumps(datos, ensure_ascii=False).encode("utf-8")
+        encabezados = (f"HTTP/1.1 {estado} {MENSAJES_HTTP.get(estado, '')}\r\n"
+                       f"Content-Type: application/json; charset=utf-8\r\n"
+                       f"Content-Length: {len(cuerpo)}\r\n"
+                       f"Connection: {'keep-alive' if mantener else 'close'}\r\n\r\n")
+        writer.write(encabezados.encode("latin-1") + cuerpo)
+        await writer.drain()
+
+    async def servir(self, host="127.0.0.1", puerto=8080, precargar=True, listo=None):
+        """
+        Escucha en host:puerto hasta que se cancele la tarea.
+        - precargar: carga el catálogo antes de aceptar pedidos (el primero no paga la lectura).
+        - listo: asyncio.Event opcional que se marca cuando el servidor ya acepta conexiones.
+        """
+        fcs.inicializar_root(self.root)
+        if precargar:
+            await self.cache.obtener()
+        servidor = await asyncio.start_server(self.atender, host, puerto)
+        if listo is not None:
+            listo.set()
+        try:
+            async with servidor:
+                await servidor.serve_forever()
+        finally:
+            self.pool.shutdown(wait=False)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Servicio HTTP/JSON local de la biblioteca.")
+    parser.add_argument("root", nargs="?", default=os.environ.get("BIBLIOTECA_ROOT", "./biblioteca"),
+                        help="carpeta de la biblioteca o archivo .db")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--puerto", type=int, default=8080)
+    parser.add_argument("--trabajadores", type=int, default=None,
+                        help="hilos para E/S y cálculos (por defecto, los de ThreadPoolExecutor)")
+    parser.add_argument("--sin-precarga", action="store_true", help="cargar el catálogo con el primer pedido")
+    args = parser.parse_args()
+
+    fcs.activar_metricas(os.environ.get("BIBLIOTECA_METRICAS") == "1")
+    servicio = ServicioBiblioteca(args.root, args.trabajadores)
+    print(f"Biblioteca: {args.root} ({'SQLite' if fcs.es_sqlite(args.root) else 'carpetas CSV'})")
+    print(f"Escuchando en http://{args.host}:{args.puerto}/ (Ctrl+C para salir)")
+    try:
+        asyncio.run(servicio.servir(args.host, args.puerto, precargar=not args.sin_precarga))
+    except KeyboardInterrupt:
+        print("\nServicio detenido.")
+        sys.exit(0)
+
+
+if __name__ == "__main__":
+    main()
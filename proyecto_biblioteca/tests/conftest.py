@@ -0,0 +1,53 @@
+"""
+Fixtures compartidas por las pruebas. Se ejecutan desde proyecto_biblioteca/:
+    python -m pytest -q
+"""
+import os
+import random
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import funciones_jerarquia as fcs  # noqa: E402
+
+GENEROS = ("Historia", "Ficción", "Ciencia", "Poesía")
+AUTORES = tuple(f"Autor {i}" for i in range(12))
+
+
+def registros(cantidad=150, semilla=1):
+    """Libros de prueba reproducibles (mismo formato que acepta alta_libros_bulk)."""
+    rnd = random.Random(semilla)
+    return [{
+        "genero": rnd.choice(GENEROS),
+        "autor": rnd.choice(AUTORES),
+        "titulo": f"Titulo {rnd.randrange(60)}",
+        "precio": f"{rnd.uniform(100, 9000):.2f}",
+        "anio": rnd.randint(1900, 2024),
+    } for _ in range(cantidad)]
+
+
+def _crear_biblioteca(root):
+    fcs.inicializar_root(root)
+    fcs.alta_libros_bulk(root, registros())
+    fcs.codigos_por_titulo(root, "")
+    fcs.agregados_biblioteca(root)
+    return root
+
+
+@pytest.fixture
+def biblioteca(tmp_path):
+    """Biblioteca de carpetas con 150 libros, índices y agregados ya construidos."""
+    return _crear_biblioteca(str(tmp_path / "biblioteca"))
+
+
+@pytest.fixture(scope="session")
+def biblioteca_lectura(tmp_path_factory):
+    """La misma biblioteca, compartida por las pruebas que solo leen (no escribir en ella)."""
+    return _crear_biblioteca(str(tmp_path_factory.mktemp("lectura") / "biblioteca"))
+
+
+def codigos(libros):
+    """codigo_libro de cada libro, en orden (lista de diccionarios o CatalogoCompacto)."""
+    return [libros[i]["codigo_libro"] for i in range(len(libros))]
@@ -0,0 +1,98 @@
+"""Estadísticas materializadas contra una pasada completa (calcular_estadisticas)."""
+import json
+import math
+import os
+
+import pytest
+
+import funciones_jerarquia as fcs
+
+
+def _comparar(root, agrupar_por):
+    materializado = fcs.agregados_biblioteca(root, agrupar_por)
+    real = fcs.calcular_estadisticas(fcs.iter_libros(root), agrupar_por)
+    assert set(materializado["grupos"]) == set(real["grupos"])
+    for a, b in [(materializado["global"], real["global"])] + \
+            [(materializado["grupos"][k], real["grupos"][k]) for k in real["grupos"]]:
+        for campo in ("total", "cantidad", "minimo", "maximo"):
+            assert a[campo] == b[campo], campo
+        assert math.isclose(a["promedio"], b["promedio"])
+        assert math.isclose(a["desvio"], b["desvio"], rel_tol=1e-6, abs_tol=1e-6)
+
+
+@pytest.mark.parametrize("agrupar_por", [None, "genero", "autor"])
+def test_al_dia_despues_de_bajas_de_minimo_y_maximo(biblioteca, agrupar_por):
+    libros = sorted(fcs.iter_libros(biblioteca), key=lambda l: float(l["precio"]))
+    fcs.aplicar_lote(biblioteca, [("eliminar", libros[0]["codigo_libro"]),
+                                  ("actualizar", libros[-1]["codigo_libro"], {"precio": 150.0})])
+    _comparar(biblioteca, agrupar_por)
+    assert fcs.verificar_agregados(biblioteca) == []
+
+
+def test_alta_de_un_genero_nuevo_y_su_baja(biblioteca):
+    codigo = fcs.alta_libro(biblioteca, "Teatro", "Lorca", "Bodas de sangre", 50.0, 1933)
+    assert fcs.agregados_biblioteca(biblioteca, "genero")["grupos"]["Teatro"]["total"] == 1
+    assert fcs.agregados_biblioteca(biblioteca)["global"]["minimo"] == 50.0
+    fcs.aplicar_lote(biblioteca, [("eliminar", codigo)])
+    assert "Teatro" not in fcs.agregados_biblioteca(biblioteca, "genero")["grupos"]
+    _comparar(biblioteca, "autor")
+
+
+def test_verificar_detecta_y_repara(biblioteca):
+    agregados = fcs._leer_agregados(biblioteca, fcs.DIMENSIONES_AGREGADOS)
+    agregados["genero"]["Historia"]["total"] += 3
+    with fcs._bloqueo_nombrado(biblioteca, "agregados"):
+        fcs._guardar_agregados(biblioteca, agregados)
+    assert fcs.verificar_agregados(biblioteca, reparar=True)
+    assert fcs.verificar_agregados(biblioteca) == []
+
+
+def _biblioteca_con_precios(root, precios):
+    fcs.inicializar_root(root)
+    fcs.alta_libros_bulk(root, [{"genero": "Historia", "autor": "Autor", "titulo": f"Titulo {i}",
+                                 "precio": precio, "anio": 2000} for i, precio in enumerate(precios)])
+    return root
+
+
+@pytest.mark.parametrize("nombre", ["biblioteca", "biblioteca.db"])
+def test_cuantiles_interpolados_como_calcular_estadisticas(tmp_path, nombre):
+    root = _biblioteca_con_precios(str(tmp_path / nombre), [5, 10])
+    materializado = fcs.agregados_biblioteca(root)["global"]
+    real = fcs.calcular_estadisticas(fcs.iter_libros(root))["global"]
+    assert (materializado["mediana"], materializado["p90"]) == (7.5, 9.5)
+    assert (real["mediana"], real["p90"]) == (7.5, 9.5)
+    assert materializado["varianza"] == real["varianza"] == 12.5
+
+
+def test_cuantiles_aproximados_de_una_biblioteca(biblioteca):
+    materializado = fcs.agregados_biblioteca(biblioteca)["global"]
+    precios = sorted(float(l["precio"]) for l in fcs.iter_libros(biblioteca))
+    for nombre, p in (("mediana", 0.5), ("p90", 0.9)):
+        pos = p * (len(precios) - 1)
+        i = int(pos)
+        exacto = precios[i] + (precios[i + 1] - precios[i]) * (pos - i)
+        assert math.isclose(materializado[nombre], exacto, rel_tol=0.05), nombre
+
+
+@pytest.mark.parametrize("nombre", ["biblioteca", "biblioteca.db"])
+def test_varianza_estable_con_precios_grandes(tmp_path, nombre):
+    root = _biblioteca_con_precios(str(tmp_path / nombre), [1e8 + 1, 1e8 + 2, 1e8 + 3, 1e8 + 4])
+    fcs.agregados_biblioteca(root)
+    codigo = max(fcs.iter_libros(root), key=lambda l: float(l["precio"]))["codigo_libro"]
+    fcs.aplicar_lote(root, [("eliminar", codigo)])
+    materializado = fcs.agregados_biblioteca(root)["global"]
+    assert math.isclose(materializado["varianza"], 1.0, rel_tol=1e-6)
+    assert math.isclose(materializado["promedio"], 1e8 + 2)
+
+
+def test_fotos_sin_m2_se_reconstruyen(biblioteca):
+    ruta = os.path.join(biblioteca, fcs.AGREGADOS_DIR, "global.json")
+    with open(ruta, "r", encoding="utf-8") as f:
+        foto = json.loads(f.read())
+    for grupo in foto.values():
+        del grupo["media"], grupo["m2"]
+        grupo["suma_cuadrados"] = 0.0
+    with open(ruta, "w", encoding="utf-8") as f:
+        f.write(json.dumps(foto))
+    _comparar(biblioteca, None)
+    assert fcs.verificar_agregados(biblioteca) == []
@@ -0,0 +1,48 @@
+"""alta_libros_bulk: validación por registro y una escritura por CSV."""
+import collections
+import csv
+import json
+
+import pytest
+
+import funciones_jerarquia as fcs
+from conftest import registros
+
+
+def _por_titulo(libros):
+    return collections.Counter((l["genero"], l["autor"], l["titulo"]) for l in libros)
+
+
+@pytest.mark.parametrize("lote", [100000, 40])
+def test_agrupa_por_titulo_y_rechaza_los_invalidos(tmp_path, lote):
+    root = str(tmp_path / "biblioteca")
+    fcs.inicializar_root(root)
+    fcs.codigos_por_titulo(root, "")  # índices ya construidos: el alta masiva los mantiene
+    validos = registros()
+    invalidos = [dict(validos[0], precio="abc"), dict(validos[0], anio=3000), dict(validos[0], titulo="  ")]
+    resumen = fcs.alta_libros_bulk(root, validos + invalidos, lote=lote)
+
+    assert resumen["libros"] == 150
+    assert [numero for numero, _ in resumen["errores"]] == [151, 152, 153]
+    libros = fcs.leer_toda_jerarquia(root)
+    assert _por_titulo(libros) == _por_titulo(validos)
+    assert len({l["codigo_libro"] for l in libros}) == 150
+    if lote > len(validos):
+        assert resumen["archivos"] == len(_por_titulo(validos))  # un CSV abierto una vez por título
+    assert not any(fcs.verificar_indices(root).values())
+
+
+@pytest.mark.parametrize("formato", ["csv", "jsonl"])
+def test_importa_desde_archivo(tmp_path, formato):
+    root = str(tmp_path / "biblioteca")
+    fcs.inicializar_root(root)
+    origen = tmp_path / f"libros.{formato}"
+    with open(origen, "w", newline="", encoding="utf-8") as f:
+        if formato == "csv":
+            writer = csv.DictWriter(f, fieldnames=["genero", "autor", "titulo", "precio", "anio"])
+            writer.writeheader()
+            writer.writerows(registros(30))
+        else:
+            f.writelines(json.dumps(r, ensure_ascii=False) + "\n" for r in registros(30))
+    assert fcs.alta_libros_bulk(root, str(origen))["libros"] == 30
+    assert _por_titulo(fcs.leer_toda_jerarquia(root)) == _por_titulo(registros(30))
@@ -0,0 +1,70 @@
+"""aplicar_lote: modificaciones, bajas y concurrencia optimista con versiones."""
+import funciones_jerarquia as fcs
+from conftest import codigos, registros
+
+
+def _libros(root):
+    return {l["codigo_libro"]: l for l in fcs.iter_libros(root)}
+
+
+def test_actualiza_y_elimina_en_un_solo_lote(biblioteca):
+    antes = _libros(biblioteca)
+    a, b, c = list(antes)[:3]
+    resumen = fcs.aplicar_lote(biblioteca, [
+        ("actualizar", a, {"precio": 1234.5}),
+        ("eliminar", b),
+        ("actualizar", c, {"anio": 1999}),
+        ("eliminar", "no-existe"),
+    ])
+    despues = _libros(biblioteca)
+    assert resumen["actualizados"] == 2 and resumen["eliminados"] == 1
+    assert resumen["no_encontrados"] == ["no-existe"]
+    assert float(despues[a]["precio"]) == 1234.5
+    assert b not in despues
+    assert despues[c]["anio"] == "1999"
+    assert len(despues) == len(antes) - 1
+
+
+def test_version_vieja_es_un_conflicto(biblioteca):
+    codigo = next(iter(_libros(biblioteca)))
+    version = fcs.leer_libros_por_codigo(biblioteca, [codigo])[0]["_version"]
+    fcs.aplicar_lote(biblioteca, [("actualizar", codigo, {"precio": 10.0})])  # otro proceso lo modifica
+
+    resumen = fcs.aplicar_lote(biblioteca, [("actualizar", codigo, {"precio": 20.0})], {codigo: version})
+    assert resumen["conflictos"] == [codigo]
+    assert resumen["actualizados"] == 0
+    assert float(_libros(biblioteca)[codigo]["precio"]) == 10.0
+
+
+def test_version_al_dia_se_aplica(biblioteca):
+    codigo = next(iter(_libros(biblioteca)))
+    version = fcs.leer_libros_por_codigo(biblioteca, [codigo])[0]["_version"]
+    resumen = fcs.aplicar_lote(biblioteca, [("eliminar", codigo)], {codigo: version})
+    assert resumen["eliminados"] == 1 and resumen["conflictos"] == []
+
+
+def test_cambios_a_otros_libros_del_mismo_csv_no_son_conflicto(biblioteca):
+    codigo = next(iter(_libros(biblioteca)))
+    leido = fcs.leer_libros_por_codigo(biblioteca, [codigo])[0]
+    vecinos = [c for c, l in _libros(biblioteca).items() if l["_origen"] == leido["_origen"] and c != codigo]
+    # Otro proceso agrega un libro al mismo CSV y modifica un vecino
+    assert fcs.alta_libro(biblioteca, leido["genero"], leido["autor"], leido["titulo"], "1.5", "2001")
+    if vecinos:
+        fcs.aplicar_lote(biblioteca, [("actualizar", vecinos[0], {"precio": 1.0})])
+
+    resumen = fcs.aplicar_lote(biblioteca, [("actualizar", codigo, {"precio": 20.0})],
+                               {codigo: leido["_version"]})
+    assert resumen["conflictos"] == [] and resumen["actualizados"] == 1
+
+
+def test_versiones_en_sqlite(tmp_path):
+    root = str(tmp_path / "biblioteca.db")
+    fcs.inicializar_root(root)
+    fcs.alta_libros_bulk(root, registros(20))
+    a, b = [l["codigo_libro"] for l in fcs.leer_toda_jerarquia(root)[:2]]
+    version_a, version_b = (l["_version"] for l in fcs.leer_libros_por_codigo(root, [a, b]))
+    fcs.aplicar_lote(root, [("actualizar", a, {"precio": 10.0})])
+
+    resumen = fcs.aplicar_lote(root, [("eliminar", a), ("eliminar", b)], {a: version_a, b: version_b})
+    assert resumen["conflictos"] == [a] and resumen["eliminados"] == 1
+    assert codigos(fcs.leer_libros_por_codigo(root, [a, b])) == [a]
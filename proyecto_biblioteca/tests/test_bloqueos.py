@@ -0,0 +1,84 @@
+"""Varios procesos escribiendo la misma biblioteca (bloqueos entre procesos)."""
+import collections
+import contextlib
+import io
+import multiprocessing
+import os
+import threading
+
+import pytest
+
+import funciones_jerarquia as fcs
+
+PROCESOS = 4
+ALTAS = 15
+
+
+def _escritor(root, n):
+    with contextlib.redirect_stdout(io.StringIO()):
+        for i in range(ALTAS):
+            fcs.alta_libro(root, "Historia", "Compartido", "Mismo titulo", 100.0 + n * ALTAS + i, 2000)
+        # Cada proceso además reescribe el CSV compartido (baja del primero de los suyos)
+        suyos = [l for l in fcs.iter_libros(root, titulo="Mismo titulo")
+                 if n * ALTAS <= float(l["precio"]) - 100.0 < (n + 1) * ALTAS]
+        fcs.aplicar_lote(root, [("eliminar", min(suyos, key=lambda l: float(l["precio"]))["codigo_libro"])])
+
+
+def test_altas_y_lotes_concurrentes_no_pierden_filas(biblioteca):
+    procesos = [multiprocessing.Process(target=_escritor, args=(biblioteca, n)) for n in range(PROCESOS)]
+    for p in procesos:
+        p.start()
+    for p in procesos:
+        p.join(60)
+        assert p.exitcode == 0
+
+    filas = [l for l in fcs.iter_libros(biblioteca, titulo="Mismo titulo")]
+    assert len(filas) == PROCESOS * (ALTAS - 1)
+    assert max(collections.Counter(l["codigo_libro"] for l in filas).values()) == 1
+    assert not any(fcs.verificar_indices(biblioteca).values())
+    assert fcs.verificar_agregados(biblioteca) == []
+
+
+def _guardar_manifiesto(root):
+    fcs.guardar_manifiesto(root, fcs.cargar_manifiesto(root))
+
+
+def _guardar_agregados(root):
+    agregados = fcs._leer_agregados(root, fcs.DIMENSIONES_AGREGADOS)
+    with fcs._bloqueo_nombrado(root, "agregados"):
+        fcs._guardar_agregados(root, agregados)
+
+
+@pytest.mark.parametrize("guardar", [_guardar_manifiesto, _guardar_agregados])
+def test_limpiar_temporales_no_borra_un_temporal_en_uso(biblioteca, monkeypatch, guardar):
+    bloqueo_nombrado = fcs._bloqueo_nombrado
+    reemplazar = os.replace
+    limpiados = []
+    hilos = []
+
+    def limpiar_antes_del_bloqueo(root, nombre):
+        # Justo antes de que el escritor tome su bloqueo no debe haber temporales suyos
+        if not hilos:
+            hilos.append(None)
+            limpiados.extend(fcs.limpiar_temporales(root))
+            hilos.pop()
+        return bloqueo_nombrado(root, nombre)
+
+    def limpiar_antes_del_replace(origen, destino):
+        # El temporal ya está escrito: otro hilo intenta limpiar y tiene que esperar
+        if origen.endswith(".tmp") and not hilos:
+            hilo = threading.Thread(target=lambda: limpiados.extend(fcs.limpiar_temporales(biblioteca)))
+            hilos.append(hilo)
+            hilo.start()
+            hilo.join(0.5)
+            assert hilo.is_alive() and os.path.exists(origen)
+        reemplazar(origen, destino)
+
+    monkeypatch.setattr(fcs, "_bloqueo_nombrado", limpiar_antes_del_bloqueo)
+    monkeypatch.setattr(os, "replace", limpiar_antes_del_replace)
+    guardar(biblioteca)
+    hilos[0].join(10)
+    monkeypatch.undo()
+    assert not hilos[0].is_alive()
+    assert limpiados == []
+    assert fcs.verificar_agregados(biblioteca) == []
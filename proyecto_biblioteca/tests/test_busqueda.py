@@ -0,0 +1,27 @@
+"""buscar_libros con altas y bajas que todavía están en el log de trigramas."""
+import os
+
+import funciones_jerarquia as fcs
+
+
+def _codigos(resultados):
+    return {r["codigo_libro"] for r in resultados}
+
+
+def test_alta_y_baja_con_log_pendiente(biblioteca):
+    codigo = fcs.alta_libro(biblioteca, "Ficción", "Ursula Le Guin", "Los desposeídos", 2500.0, 1974)
+    log = os.path.join(biblioteca, fcs.INDICES_DIR, fcs.TRIGRAMAS_LOG)
+    assert os.path.getsize(log) > 0  # el título nuevo todavía no se volcó a las cubetas
+
+    assert codigo in _codigos(fcs.buscar_libros(biblioteca, "desposeidos"))        # sin tilde
+    assert codigo in _codigos(fcs.buscar_libros(biblioteca, "le guin", campos=("autor",)))
+    assert codigo in _codigos(fcs.buscar_libros(biblioteca, "los desposeidso", difuso=True))
+
+    fcs.aplicar_lote(biblioteca, [("eliminar", codigo)])
+    assert codigo not in _codigos(fcs.buscar_libros(biblioteca, "desposeidos", difuso=True))
+    assert not any(fcs.verificar_indices(biblioteca).values())
+
+
+def test_subcadena_encuentra_los_mismos_que_un_recorrido(biblioteca):
+    esperado = {l["codigo_libro"] for l in fcs.iter_libros(biblioteca) if "lo 1" in l["titulo"].lower()}
+    assert _codigos(fcs.buscar_libros(biblioteca, "LO 1", campos=("titulo",))) == esperado
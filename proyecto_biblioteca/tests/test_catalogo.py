@@ -0,0 +1,66 @@
+"""CatalogoCompacto se comporta como la lista de diccionarios, también con valores inválidos."""
+import funciones_jerarquia as fcs
+from conftest import codigos
+
+LIBROS = [
+    {"codigo_libro": "a", "titulo": "A", "autor": "X", "genero": "G", "precio": "30", "anio": "2000"},
+    {"codigo_libro": "b", "titulo": "B", "autor": "X", "genero": "G", "precio": "10", "anio": "xx"},
+    {"codigo_libro": "c", "titulo": "C", "autor": "Y", "genero": "G", "precio": "nada", "anio": "1999"},
+]
+
+
+def test_misma_biblioteca_que_la_lectura_completa(biblioteca):
+    libros = fcs.leer_toda_jerarquia(biblioteca)
+    catalogo = fcs.cargar_catalogo_compacto(biblioteca)
+    assert len(catalogo) == len(libros)
+    for libro, fila in zip(libros, catalogo):
+        assert fila["codigo_libro"] == libro["codigo_libro"]
+        assert fila["titulo"] == libro["titulo"]
+        assert fila["_origen"] == libro["_origen"]
+        assert fila["precio"] == float(libro["precio"])
+        assert fila["anio"] == int(libro["anio"])
+    assert catalogo[-1]["codigo_libro"] == libros[-1]["codigo_libro"]
+
+
+def test_ordenar_y_filtrar_como_con_diccionarios(biblioteca):
+    libros = fcs.leer_toda_jerarquia(biblioteca)
+    catalogo = fcs.CatalogoCompacto.desde_libros(libros)
+    for clave in ("precio", "anio", "autor"):
+        assert codigos(fcs.ordenar_libros(catalogo, clave)) == codigos(fcs.ordenar_libros(libros, clave)), clave
+    assert codigos(fcs.filtrar_libros(catalogo, "genero", "historia")) == \
+        codigos(fcs.filtrar_libros(libros, "genero", "historia"))
+    assert codigos(fcs.filtrar_libros(catalogo, "anio", libros[0]["anio"])) == \
+        codigos(fcs.filtrar_libros(libros, "anio", libros[0]["anio"]))
+
+
+def test_seleccionar_comparte_tablas(biblioteca):
+    catalogo = fcs.cargar_catalogo_compacto(biblioteca)
+    parte = catalogo.seleccionar([3, 0])
+    assert codigos(parte) == [catalogo[3]["codigo_libro"], catalogo[0]["codigo_libro"]]
+    assert parte.tabla_autores is catalogo.tabla_autores
+    assert dict(parte[1]) == dict(catalogo[0])
+
+
+
+def test_anio_invalido_ordena_al_final_como_con_diccionarios():
+    catalogo = fcs.CatalogoCompacto.desde_libros(LIBROS)
+    for clave in ("anio", "-anio", "precio", "-precio"):
+        assert codigos(fcs.ordenar_libros(catalogo, clave)) == codigos(fcs.ordenar_libros(LIBROS, clave)), clave
+    assert codigos(fcs.ordenar_libros(catalogo, "anio")) == ["c", "a", "b"]
+
+
+def test_vista_de_fila_con_valores_invalidos():
+    catalogo = fcs.CatalogoCompacto.desde_libros(LIBROS)
+    assert catalogo[1]["anio"] is None
+    assert catalogo[0]["anio"] == 2000
+    assert fcs.libro_tipado(catalogo[1])["anio"] is None
+    assert fcs.libro_tipado(LIBROS[1])["anio"] is None
+    assert fcs.libro_tipado(catalogo[2])["precio"] is None
+
+
+def test_consultas_y_estadisticas_por_anio_iguales():
+    catalogo = fcs.CatalogoCompacto.desde_libros(LIBROS)
+    for condicion in (("anio", "<", 2010), ("anio", "!=", 2000), ("anio", ">=", 0)):
+        assert codigos(fcs.MotorConsultas(catalogo).consultar(condicion)) == \
+            codigos(fcs.MotorConsultas(LIBROS).consultar(condicion)), condicion
+    assert fcs.calcular_estadisticas(catalogo, "anio") == fcs.calcular_estadisticas(LIBROS, "anio")
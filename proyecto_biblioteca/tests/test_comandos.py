@@ -0,0 +1,74 @@
+"""Línea de comandos (comandos.py): subcomandos sueltos y scripts por stdin."""
+import csv
+import io
+import json
+import os
+import subprocess
+import sys
+
+import comandos
+import funciones_jerarquia as fcs
+
+CARPETA = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _comandos(root, *argumentos, entrada=None):
+    return subprocess.run([sys.executable, "comandos.py", "--root", root, *argumentos], cwd=CARPETA,
+                          input=entrada, capture_output=True, text=True, timeout=60)
+
+
+def test_add_y_list(tmp_path):
+    root = str(tmp_path / "biblioteca")
+    alta = _comandos(root, "add", "--genero", "Ficción", "--autor", "Tolkien", "--titulo", "El Hobbit",
+                     "--precio", "1500", "--anio", "1937")
+    assert alta.returncode == 0, alta.stderr
+    codigo = json.loads(alta.stdout)["codigo_libro"]
+
+    listado = _comandos(root, "list")
+    datos = json.loads(listado.stdout)
+    assert datos["total"] == 1
+    assert datos["libros"][0]["codigo_libro"] == codigo
+    assert datos["libros"][0]["precio"] == 1500.0
+
+    tabla = list(csv.reader(io.StringIO(_comandos(root, "--formato", "csv", "list").stdout)))
+    assert tabla[0] == fcs.REQUIRED_FIELDS and tabla[1][0] == codigo
+
+
+def test_datos_invalidos_salen_con_error(tmp_path):
+    resultado = _comandos(str(tmp_path / "biblioteca"), "add", "--genero", "Ficción")
+    assert resultado.returncode == 1
+    assert resultado.stdout == "" and "Faltan datos" in resultado.stderr
+
+
+def test_script_por_stdin(biblioteca):
+    codigo = fcs.leer_toda_jerarquia(biblioteca)[0]["codigo_libro"]
+    entrada = "\n".join([
+        "# comentario",
+        "list --limite 1",
+        f"update {codigo} --precio 99.5",
+        "comando-que-no-existe",
+        "",
+        f"filter --atributo codigo_libro --valor {codigo}",
+        "stats --agrupar genero",
+    ]) + "\n"
+    resultado = _comandos(biblioteca, "script", "-", entrada=entrada)
+    assert resultado.returncode == 1
+    assert "línea 4" in resultado.stderr
+    salidas = [json.loads(l) for l in resultado.stdout.splitlines()]
+    assert len(salidas) == 4
+    assert salidas[0]["total"] == 150
+    assert salidas[1]["actualizados"] == 1
+    assert salidas[2]["libros"][0]["precio"] == 99.5
+    assert salidas[3]["global"]["cantidad"] == 150
+
+
+def test_script_carga_la_biblioteca_una_vez_por_escritura(biblioteca, monkeypatch, capsys):
+    codigo = fcs.leer_toda_jerarquia(biblioteca)[0]["codigo_libro"]
+    monkeypatch.setattr(sys, "stdin", io.StringIO(
+        "list\nsort --clave=-precio --limite 3\nstats\n"
+        f"delete {codigo}\nlist\nfilter --consulta \"anio>=1900\"\n"))
+    sesion = comandos.Sesion(biblioteca)
+    assert comandos.ejecutar_script(sesion, "-", "json") == 0
+    assert sesion.cargas == 2
+    salidas = [json.loads(l) for l in capsys.readouterr().out.splitlines()]
+    assert [s.get("total") for s in salidas] == [150, 3, None, None, 149, 149]
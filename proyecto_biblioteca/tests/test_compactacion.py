@@ -0,0 +1,49 @@
+"""compactar_biblioteca: reagrupar CSV sin perder ni duplicar libros, aun con un corte en el medio."""
+import collections
+import os
+
+import pytest
+
+import funciones_jerarquia as fcs
+
+
+def _conteo(root):
+    return collections.Counter(l["codigo_libro"] for l in fcs.iter_libros(root))
+
+
+def test_fragmentar_por_autor_y_volver(biblioteca):
+    antes = _conteo(biblioteca)
+    resumen = fcs.compactar_biblioteca(biblioteca, fragmentar="autor")
+    assert resumen["despues"]["csv"] < resumen["antes"]["csv"]
+    assert _conteo(biblioteca) == antes
+    assert not any(fcs.verificar_indices(biblioteca).values())
+
+    codigo = fcs.alta_libro(biblioteca, "Historia", "Autor 1", "Titulo nuevo", 300.0, 2000)
+    destino = fcs.ubicar_codigo(biblioteca, codigo)
+    assert destino == os.path.join(biblioteca, "Historia", "Autor 1", fcs.CSV_FILE)
+
+    fcs.compactar_biblioteca(biblioteca, fragmentar="titulo")
+    assert _conteo(biblioteca) == antes + collections.Counter([codigo])
+    assert fcs.verificar_agregados(biblioteca) == []
+
+
+def test_corte_despues_del_commit_no_duplica(biblioteca, monkeypatch):
+    antes = _conteo(biblioteca)
+    reemplazar = os.replace
+    llamadas = []
+
+    def cortar_al_tercer_csv(origen, destino):
+        if os.path.basename(destino) == fcs.CSV_FILE:
+            llamadas.append(destino)
+            if len(llamadas) == 3:
+                raise KeyboardInterrupt
+        reemplazar(origen, destino)
+
+    monkeypatch.setattr(os, "replace", cortar_al_tercer_csv)
+    with pytest.raises(KeyboardInterrupt):
+        fcs.compactar_biblioteca(biblioteca, fragmentar="genero")
+    monkeypatch.undo()
+
+    assert fcs.recuperar_journal(biblioteca) == "rollforward"
+    assert _conteo(biblioteca) == antes  # ni perdidos ni duplicados
+    assert not any(fcs.verificar_indices(biblioteca).values())
@@ -0,0 +1,114 @@
+"""MotorConsultas (índices en memoria) contra filtrar_libros y un recorrido directo."""
+import pytest
+
+import funciones_jerarquia as fcs
+from conftest import AUTORES, GENEROS, codigos
+
+
+@pytest.fixture
+def libros(biblioteca_lectura):
+    return fcs.leer_toda_jerarquia(biblioteca_lectura)
+
+
+@pytest.fixture(params=["dict", "compacto"])
+def motor(request, biblioteca_lectura, libros):
+    base = libros if request.param == "dict" else fcs.cargar_catalogo_compacto(biblioteca_lectura)
+    return fcs.MotorConsultas(base)
+
+
+@pytest.mark.parametrize("atributo,valor", [
+    ("genero", "historia"), ("genero", GENEROS[1]), ("autor", AUTORES[3]), ("autor", "Nadie"),
+])
+def test_igualdad_como_filtrar_libros(libros, motor, atributo, valor):
+    esperado = sorted(codigos(fcs.filtrar_libros(libros, atributo, valor)))
+    assert sorted(codigos(motor.consultar((atributo, "=", valor)))) == esperado
+
+
+def test_anio_igual_como_filtrar_libros(libros, motor):
+    anio = libros[0]["anio"]
+    esperado = sorted(codigos(fcs.filtrar_libros(libros, "anio", anio)))
+    assert sorted(codigos(motor.consultar(("anio", "=", anio)))) == esperado
+
+
+@pytest.mark.parametrize("atributo,valor", [
+    ("precio", lambda l: l["precio"] + "0"), ("anio", lambda l: f"{l['anio']}.0"),
+    ("genero", lambda l: l["genero"].upper()), ("precio", lambda l: "diez"), ("anio", lambda l: "abc"),
+], ids=["precio", "anio", "genero", "precio-texto", "anio-texto"])
+def test_filtrar_libros_igual_en_los_tres_contenedores(biblioteca_lectura, libros, atributo, valor, capsys):
+    valor = valor(libros[0])
+    catalogo = fcs.cargar_catalogo_compacto(biblioteca_lectura)
+    resultados = [sorted(codigos(fcs.filtrar_libros(base, atributo, valor)))
+                  for base in (libros, catalogo, fcs.MotorConsultas(catalogo))]
+    esperado = sorted(l["codigo_libro"] for l in libros
+                      if fcs._a_float(l[atributo]) == fcs._a_float(valor)
+                      or str(l[atributo]).lower() == valor.lower())
+    assert resultados == [esperado] * 3
+    if not esperado:
+        assert capsys.readouterr().out.count("No se encontraron libros") == 3
+    else:
+        assert libros[0]["codigo_libro"] in esperado
+
+
+@pytest.mark.parametrize("condicion,cumple", [
+    (("precio", "entre", 1000, 5000), lambda l: 1000 <= float(l["precio"]) <= 5000),
+    (("anio", ">=", 1990), lambda l: int(l["anio"]) >= 1990),
+    (("anio", "<", 1950), lambda l: int(l["anio"]) < 1950),
+    (("autor", "prefijo", "autor 1"), lambda l: l["autor"].lower().startswith("autor 1")),
+    (("genero", "!=", "Historia"), lambda l: l["genero"] != "Historia"),
+    (("y", ("precio", ">", 3000), ("genero", "=", "Ciencia"), ("anio", "<=", 2000)),
+     lambda l: float(l["precio"]) > 3000 and l["genero"] == "Ciencia" and int(l["anio"]) <= 2000),
+    (("o", ("autor", "=", AUTORES[0]), ("precio", "<", 500)),
+     lambda l: l["autor"] == AUTORES[0] or float(l["precio"]) < 500),
+])
+def test_condiciones_compuestas_como_recorrido(libros, motor, condicion, cumple):
+    esperado = sorted(l["codigo_libro"] for l in libros if cumple(l))
+    assert sorted(codigos(motor.consultar(condicion))) == esperado
+
+
+def test_parsear_consulta():
+    assert fcs.parsear_consulta("precio=1000..5000 & genero=Historia") == \
+        ("y", ("precio", "entre", "1000", "5000"), ("genero", "=", "Historia"))
+    with pytest.raises(ValueError):
+        fcs.parsear_consulta("precio")
+
+
+@pytest.mark.parametrize("texto, esperado", [
+    ("titulo=Crimen & castigo", ("titulo", "=", "Crimen & castigo")),
+    ("titulo=Crimen & castigo | autor^=Dos",
+     ("o", ("titulo", "=", "Crimen & castigo"), ("autor", "prefijo", "Dos"))),
+    ("titulo=Blanco | Negro & anio>1900",
+     ("y", ("titulo", "=", "Blanco | Negro"), ("anio", ">", "1900"))),
+    ('titulo="A & b=c" & genero=Historia',
+     ("y", ("titulo", "=", "A & b=c"), ("genero", "=", "Historia"))),
+    ('titulo="1..2"', ("titulo", "=", "1..2")),
+])
+def test_parsear_consulta_con_separadores_en_el_valor(texto, esperado):
+    assert fcs.parsear_consulta(texto) == esperado
+
+
+@pytest.mark.parametrize("texto", ['titulo="abierto', 'titulo=a"b"', "genero=Historia &", 'titulo=""'])
+def test_parsear_consulta_rechaza_comillas_y_separadores_sueltos(texto):
+    with pytest.raises(ValueError):
+        fcs.parsear_consulta(texto)
+
+
+def test_prefijo_sobre_numero_es_error(motor):
+    with pytest.raises(ValueError):
+        motor.consultar(("precio", "prefijo", "12"))
+
+
+@pytest.mark.parametrize("condicion", [
+    ("anio", "=", "abc"), ("precio", ">=", "xyz"), ("precio", "entre", "10", "mil"),
+    ("y", ("genero", "=", "Historia"), ("anio", "<", "")),
+])
+def test_valor_numerico_invalido_es_error_y_no_toda_la_biblioteca(libros, motor, condicion):
+    # filtrar_libros no encuentra nada con un año inválido; el motor no puede devolver más
+    assert fcs.filtrar_libros(libros, "anio", "abc") == []
+    with pytest.raises(ValueError):
+        motor.consultar(condicion)
+
+
+@pytest.mark.parametrize("texto", ["precio=abc", "anio>=19x0", "precio=1..dos"])
+def test_parsear_consulta_rechaza_numeros_invalidos(texto):
+    with pytest.raises(ValueError):
+        fcs.parsear_consulta(texto)
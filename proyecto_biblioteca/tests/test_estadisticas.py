@@ -0,0 +1,49 @@
+"""calcular_estadisticas (una sola pasada) contra un cálculo directo con statistics."""
+import math
+import statistics
+
+import pytest
+
+import funciones_jerarquia as fcs
+
+
+def _esperado(precios):
+    return {
+        "cantidad": len(precios),
+        "minimo": min(precios),
+        "maximo": max(precios),
+        "promedio": statistics.fmean(precios),
+        "desvio": statistics.stdev(precios),
+    }
+
+
+@pytest.mark.parametrize("agrupar_por", [None, "genero", ("genero", "autor")])
+def test_grupos_como_un_calculo_directo(biblioteca, agrupar_por):
+    libros = fcs.leer_toda_jerarquia(biblioteca)
+    resultado = fcs.calcular_estadisticas(fcs.iter_libros(biblioteca), agrupar_por)
+    atributos = (agrupar_por,) if isinstance(agrupar_por, str) else (agrupar_por or ())
+    por_grupo = {}
+    for l in libros:
+        clave = tuple(l[a] for a in atributos)
+        por_grupo.setdefault(clave[0] if len(clave) == 1 else clave, []).append(float(l["precio"]))
+    grupos = resultado["grupos"] if atributos else {(): resultado["global"]}
+    assert set(grupos) == set(por_grupo)
+    for clave, precios in por_grupo.items():
+        if len(precios) < 2:
+            continue
+        for campo, valor in _esperado(precios).items():
+            assert math.isclose(grupos[clave][campo], valor, rel_tol=1e-9), (clave, campo)
+    assert resultado["global"]["total"] == len(libros)
+
+
+def test_mismo_resultado_con_catalogo_compacto(biblioteca):
+    libros = fcs.leer_toda_jerarquia(biblioteca)
+    catalogo = fcs.CatalogoCompacto.desde_libros(libros)
+    assert fcs.calcular_estadisticas(catalogo, "autor") == fcs.calcular_estadisticas(libros, "autor")
+
+
+def test_cuantiles_aproximados():
+    libros = [{"precio": str(p)} for p in range(1, 1001)]
+    resultado = fcs.calcular_estadisticas(libros)["global"]
+    assert abs(resultado["mediana"] - 500.5) < 25
+    assert abs(resultado["p90"] - 900.1) < 25
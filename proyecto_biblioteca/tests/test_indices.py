@@ -0,0 +1,56 @@
+"""Índices persistentes de codigo_libro y título."""
+import os
+import shutil
+
+import funciones_jerarquia as fcs
+
+
+def _por_codigo(root):
+    return {l["codigo_libro"]: l for l in fcs.leer_toda_jerarquia(root)}
+
+
+def test_indices_iguales_a_un_recorrido(biblioteca):
+    libros = _por_codigo(biblioteca)
+    for codigo, libro in libros.items():
+        assert os.path.samefile(fcs.ubicar_codigo(biblioteca, codigo), libro["_origen"])
+    titulo = next(iter(libros.values()))["titulo"]
+    esperado = sorted(c for c, l in libros.items() if l["titulo"] == titulo)
+    assert sorted(fcs.codigos_por_titulo(biblioteca, titulo.upper())) == esperado
+    assert not any(fcs.verificar_indices(biblioteca).values())
+
+
+def test_alta_actualizar_y_eliminar_mantienen_los_indices(biblioteca):
+    fcs.alta_libro(biblioteca, "Teatro", "Lorca", "Bodas de sangre", "50.00", 1933)
+    [codigo] = fcs.codigos_por_titulo(biblioteca, "bodas de sangre")
+    assert fcs.ubicar_codigo(biblioteca, codigo).startswith(os.path.join(biblioteca, "Teatro"))
+
+    assert fcs.actualizar_por_codigo(biblioteca, codigo, "75.00")
+    assert _por_codigo(biblioteca)[codigo]["precio"] == "75.00"
+
+    assert fcs.eliminar_por_codigo(biblioteca, codigo)
+    assert codigo not in _por_codigo(biblioteca)
+    assert fcs.ubicar_codigo(biblioteca, codigo) is None
+    assert fcs.codigos_por_titulo(biblioteca, "Bodas de sangre") == []
+    assert not fcs.eliminar_por_codigo(biblioteca, codigo)
+    assert not any(fcs.verificar_indices(biblioteca).values())
+
+
+def test_indices_borrados_se_reconstruyen(biblioteca):
+    libros = _por_codigo(biblioteca)
+    shutil.rmtree(os.path.join(biblioteca, fcs.INDICES_DIR))
+    codigo = next(iter(libros))
+    assert os.path.samefile(fcs.ubicar_codigo(biblioteca, codigo), libros[codigo]["_origen"])
+    assert not any(fcs.verificar_indices(biblioteca).values())
+
+
+def test_alta_guardada_aunque_falle_el_indice(biblioteca, monkeypatch, capsys):
+    def fallar(*args, **kwargs):
+        raise OSError("disco lleno")
+
+    monkeypatch.setattr(fcs, "indexar_libro", fallar)
+    codigo = fcs.alta_libro(biblioteca, "Teatro", "Lorca", "Yerma", "40.00", 1934)
+    assert codigo is not None
+    assert "agregado correctamente" in capsys.readouterr().out
+    monkeypatch.undo()
+    assert fcs.codigos_por_titulo(biblioteca, "yerma") == [codigo]
+    assert not any(fcs.verificar_indices(biblioteca).values())
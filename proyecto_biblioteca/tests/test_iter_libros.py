@@ -0,0 +1,53 @@
+"""iter_libros: filtros por nivel y poda de carpetas."""
+import os
+
+import pytest
+
+import funciones_jerarquia as fcs
+
+
+@pytest.fixture
+def visitadas(monkeypatch):
+    """Carpetas que se listan durante la prueba."""
+    rutas = []
+    scandir = os.scandir
+
+    def registrar(ruta="."):
+        rutas.append(os.path.normpath(ruta))
+        return scandir(ruta)
+
+    monkeypatch.setattr(os, "scandir", registrar)
+    return rutas
+
+
+def _codigos(libros):
+    return sorted(l["codigo_libro"] for l in libros)
+
+
+def test_sin_filtros_es_toda_la_biblioteca(biblioteca):
+    assert _codigos(fcs.iter_libros(biblioteca)) == _codigos(fcs.leer_toda_jerarquia(biblioteca))
+
+
+@pytest.mark.parametrize("filtros", [
+    {"genero": "historia"}, {"autor": "Autor 3"}, {"genero": "Ciencia", "autor": "AUTOR 5"},
+    {"titulo": "Titulo 7"}, {"genero": "No existe"},
+])
+def test_filtros_como_un_recorrido(biblioteca, filtros):
+    esperado = [l for l in fcs.leer_toda_jerarquia(biblioteca)
+                if all(l[campo].lower() == valor.lower() for campo, valor in filtros.items())]
+    assert _codigos(fcs.iter_libros(biblioteca, **filtros)) == _codigos(esperado)
+
+
+def test_poda_solo_recorre_el_subarbol_del_filtro(biblioteca, visitadas):
+    libros = list(fcs.iter_libros(biblioteca, genero="Historia", autor="Autor 1"))
+    assert libros and all(l["genero"] == "Historia" and l["autor"] == "Autor 1" for l in libros)
+    subarbol = os.path.normpath(os.path.join(biblioteca, "Historia", "Autor 1"))
+    assert visitadas[:2] == [os.path.normpath(biblioteca), os.path.normpath(os.path.join(biblioteca, "Historia"))]
+    assert all(r.startswith(subarbol) for r in visitadas[2:])
+
+
+def test_es_un_generador(biblioteca, visitadas):
+    libros = fcs.iter_libros(biblioteca)
+    assert visitadas == []  # nada se lee hasta pedir el primer libro
+    next(libros)
+    assert len(visitadas) < 5
@@ -0,0 +1,65 @@
+"""Journal de aplicar_lote: un corte antes del commit se deshace, después se completa."""
+import os
+
+import pytest
+
+import funciones_jerarquia as fcs
+
+
+def _un_libro(root):
+    return next(fcs.iter_libros(root))
+
+
+def test_rollback_si_el_commit_no_llego_a_escribirse(biblioteca, monkeypatch):
+    libro = _un_libro(biblioteca)
+    with open(libro["_origen"], encoding="utf-8") as f:
+        original = f.read()
+    escribir = fcs._escribir_journal
+
+    def cortar_en_el_commit(root, journal):
+        if journal["estado"] == "confirmado":
+            raise KeyboardInterrupt  # el programa se corta antes del commit
+        escribir(root, journal)
+
+    monkeypatch.setattr(fcs, "_escribir_journal", cortar_en_el_commit)
+    with pytest.raises(KeyboardInterrupt):
+        fcs.aplicar_lote(biblioteca, [("eliminar", libro["codigo_libro"])])
+    monkeypatch.undo()
+
+    carpeta = os.path.dirname(libro["_origen"])
+    assert any(n.endswith(".tmp") for n in os.listdir(carpeta))
+    assert fcs.recuperar_journal(biblioteca) == "rollback"
+    assert not any(n.endswith(".tmp") for n in os.listdir(carpeta))
+    assert not os.path.exists(os.path.join(biblioteca, fcs.JOURNAL_FILE))
+    with open(libro["_origen"], encoding="utf-8") as f:
+        assert f.read() == original
+    assert fcs.verificar_agregados(biblioteca) == []
+
+
+def test_rollforward_si_el_commit_ya_estaba_escrito(biblioteca, monkeypatch):
+    libro = _un_libro(biblioteca)
+    reemplazar = os.replace
+
+    def cortar_al_reemplazar(origen, destino):
+        if os.path.basename(destino) == fcs.CSV_FILE:
+            raise KeyboardInterrupt  # corte después del commit, antes de reemplazar el CSV
+        reemplazar(origen, destino)
+
+    monkeypatch.setattr(os, "replace", cortar_al_reemplazar)
+    with pytest.raises(KeyboardInterrupt):
+        fcs.aplicar_lote(biblioteca, [("eliminar", libro["codigo_libro"])])
+    monkeypatch.undo()
+
+    # Todavía no se aplicó: el libro sigue en su CSV
+    assert libro["codigo_libro"] in {l["codigo_libro"] for l in fcs.iter_libros(biblioteca)}
+    assert fcs.recuperar_journal(biblioteca) == "rollforward"
+    assert libro["codigo_libro"] not in {l["codigo_libro"] for l in fcs.iter_libros(biblioteca)}
+    assert libro["codigo_libro"] not in fcs.codigos_por_titulo(biblioteca, libro["titulo"])
+    assert not any(problemas for problemas in fcs.verificar_indices(biblioteca).values())
+    # Los agregados se invalidaron y se reconstruyen con el estado final
+    assert fcs.agregados_biblioteca(biblioteca)["global"]["total"] == 149
+    assert fcs.verificar_agregados(biblioteca) == []
+
+
+def test_sin_journal_no_hay_nada_que_recuperar(biblioteca):
+    assert fcs.recuperar_journal(biblioteca) is None
@@ -0,0 +1,75 @@
+"""Manifiesto de lectura: solo se vuelven a parsear los CSV que cambiaron."""
+import csv
+import os
+
+import pytest
+
+import funciones_jerarquia as fcs
+
+
+@pytest.fixture
+def parseados(monkeypatch):
+    """Rutas que leer_toda_jerarquia parsea (las demás salen del manifiesto)."""
+    rutas = []
+    parsear = fcs._parsear_csv
+
+    def contar(ruta):
+        rutas.append(ruta)
+        return parsear(ruta)
+
+    monkeypatch.setattr(fcs, "_parsear_csv", contar)
+    return rutas
+
+
+def _clave(libros):
+    return sorted((l["codigo_libro"], l["precio"], l["_origen"]) for l in libros)
+
+
+def _cualquier_csv(root):
+    return next(l["_origen"] for l in fcs.leer_toda_jerarquia(root))
+
+
+def test_segunda_lectura_sale_del_manifiesto(biblioteca, parseados):
+    primera = fcs.leer_toda_jerarquia(biblioteca)
+    assert len(primera) == 150
+    parseados.clear()
+    assert _clave(fcs.leer_toda_jerarquia(biblioteca)) == _clave(primera)
+    assert parseados == []
+
+
+def test_alta_no_obliga_a_parsear_de_nuevo(biblioteca, parseados):
+    fcs.leer_toda_jerarquia(biblioteca)
+    fcs.alta_libro(biblioteca, "Historia", "Autor 1", "Titulo 1", "99.5", 2001)
+    parseados.clear()
+    libros = fcs.leer_toda_jerarquia(biblioteca)
+    assert len(libros) == 151
+    assert parseados == []  # la fila nueva se tomó del log del manifiesto
+
+
+def test_edicion_externa_se_vuelve_a_parsear(biblioteca, parseados):
+    fcs.leer_toda_jerarquia(biblioteca)
+    ruta = _cualquier_csv(biblioteca)
+    # Otro programa agrega una fila al CSV sin pasar por el manifiesto
+    with open(ruta, "a", newline="", encoding="utf-8") as f:
+        csv.writer(f).writerow(["externo-1", "Titulo X", "Autor X", "Historia", "10.00", "1999"])
+    parseados.clear()
+    libros = fcs.leer_toda_jerarquia(biblioteca)
+    assert parseados == [ruta]
+    assert "externo-1" in {l["codigo_libro"] for l in libros}
+    assert len(libros) == 151
+
+
+def test_csv_borrado_desaparece_de_la_lectura(biblioteca):
+    libros = fcs.leer_toda_jerarquia(biblioteca)
+    ruta = _cualquier_csv(biblioteca)
+    os.remove(ruta)
+    restantes = fcs.leer_toda_jerarquia(biblioteca)
+    assert len(restantes) == len([l for l in libros if l["_origen"] != ruta])
+    assert all(l["_origen"] != ruta for l in restantes)
+
+
+def test_manifiesto_danado_se_reconstruye(biblioteca):
+    esperado = _clave(fcs.leer_toda_jerarquia(biblioteca))
+    with open(os.path.join(biblioteca, fcs.MANIFIESTO_FILE), "w", encoding="utf-8") as f:
+        f.write("{no es json")
+    assert _clave(fcs.leer_toda_jerarquia(biblioteca)) == esperado
@@ -0,0 +1,51 @@
+import builtins
+
+import pytest
+
+import funciones_jerarquia as fcs
+
+
+@pytest.fixture
+def metricas():
+    fcs.reiniciar_metricas()
+    fcs.activar_metricas(True)
+    yield
+    fcs.activar_metricas(False)
+    fcs.reiniciar_metricas()
+
+
+def test_apagadas_no_registran_nada(biblioteca):
+    fcs.reiniciar_metricas()
+    fcs.leer_toda_jerarquia(biblioteca)
+    assert fcs.obtener_metricas() == {"activas": False, "funciones": {}, "contadores": {}}
+
+
+def test_llamadas_y_contadores_de_lectura(biblioteca, metricas):
+    archivos = len({l["_origen"] for l in fcs.leer_toda_jerarquia(biblioteca)})
+    fcs.reiniciar_metricas()
+    fcs.leer_toda_jerarquia(biblioteca, usar_manifiesto=False)
+    fcs.leer_toda_jerarquia(biblioteca)
+    datos = fcs.obtener_metricas()
+    assert datos["funciones"]["leer_toda_jerarquia"]["llamadas"] == 2
+    assert datos["contadores"]["csv_leidos"] == archivos
+    assert datos["contadores"]["filas_leidas"] == 150
+    assert datos["contadores"]["csv_desde_manifiesto"] == archivos
+
+
+def test_generador_se_mide_al_recorrerlo(biblioteca, metricas):
+    libros = fcs.iter_libros(biblioteca, genero="Historia")
+    assert "iter_libros" not in fcs.obtener_metricas()["funciones"]
+    list(libros)
+    assert fcs.obtener_metricas()["funciones"]["iter_libros"]["llamadas"] == 1
+
+
+def test_la_espera_de_confirmacion_no_se_mide_como_latencia(biblioteca, metricas, monkeypatch):
+    titulo = next(l["titulo"] for l in fcs.leer_toda_jerarquia(biblioteca)
+                  if len(fcs.codigos_por_titulo_parcial(biblioteca, l["titulo"])) == 1)
+    monkeypatch.setattr(builtins, "input", lambda *a: "s")
+    fcs.reiniciar_metricas()
+    fcs.eliminar_libro(biblioteca, titulo)
+    funciones = fcs.obtener_metricas()["funciones"]
+    assert "eliminar_libro" not in funciones
+    assert funciones["eliminar_por_codigo"]["llamadas"] == 1
+    assert funciones["codigos_por_titulo_parcial"]["llamadas"] == 1
@@ -0,0 +1,22 @@
+"""Motores de lectura: "hilos" y "procesos" devuelven lo mismo que "serie"."""
+import pytest
+
+import funciones_jerarquia as fcs
+
+
+def _filas(libros):
+    return sorted(tuple(sorted(l.items())) for l in libros)
+
+
+@pytest.mark.parametrize("motor", ["hilos", "procesos"])
+@pytest.mark.parametrize("usar_manifiesto", [False, True])
+def test_mismas_filas_y_origen_que_serie(biblioteca, motor, usar_manifiesto):
+    serie = fcs.leer_toda_jerarquia(biblioteca, motor="serie", usar_manifiesto=False)
+    libros = fcs.leer_toda_jerarquia(biblioteca, motor=motor, trabajadores=2, usar_manifiesto=usar_manifiesto)
+    assert len(libros) == 150
+    assert _filas(libros) == _filas(serie)
+
+
+def test_motor_desconocido(biblioteca):
+    with pytest.raises(ValueError):
+        fcs.leer_toda_jerarquia(biblioteca, motor="cohetes")
@@ -0,0 +1,63 @@
+"""ordenar_libros da el mismo orden con diccionarios, catálogo compacto y orden externo."""
+import pytest
+
+import funciones_jerarquia as fcs
+from conftest import codigos
+
+
+def _esperado(libros, claves):
+    ordenados = list(libros)
+    for campo in reversed(claves):
+        desc = campo.startswith("-")
+        campo = campo.lstrip("-")
+        convertir = float if campo == "precio" else int if campo == "anio" else str.lower
+        ordenados.sort(key=lambda l: convertir(l[campo]), reverse=desc)
+    return [l["codigo_libro"] for l in ordenados]
+
+
+@pytest.mark.parametrize("claves", [
+    ["precio", "codigo_libro"],
+    ["genero", "-precio", "codigo_libro"],
+    ["-anio", "titulo", "codigo_libro"],
+])
+def test_mismo_orden_en_todos_los_modos(biblioteca_lectura, tmp_path, claves):
+    libros = fcs.leer_toda_jerarquia(biblioteca_lectura)
+    catalogo = fcs.cargar_catalogo_compacto(biblioteca_lectura)
+    esperado = _esperado(libros, claves)
+    assert codigos(fcs.ordenar_libros(libros, claves)) == esperado
+    assert codigos(fcs.ordenar_libros(catalogo, claves)) == esperado
+    externo = fcs.ordenar_libros(iter(libros), claves, externo=True, tam_bloque=16,
+                                 carpeta_temporal=str(tmp_path))
+    assert [l["codigo_libro"] for l in externo] == esperado
+
+
+def test_top_k(biblioteca_lectura):
+    libros = fcs.leer_toda_jerarquia(biblioteca_lectura)
+    esperado = _esperado(libros, ["-precio", "codigo_libro"])[:5]
+    assert codigos(fcs.ordenar_libros(libros, ["-precio", "codigo_libro"], limite=5)) == esperado
+
+
+LIBROS_CHICOS = [
+    {"codigo_libro": "1", "genero": "B", "precio": "10"},
+    {"codigo_libro": "2", "genero": "A", "precio": "30"},
+    {"codigo_libro": "3", "genero": "A", "precio": "20"},
+]
+
+
+@pytest.mark.parametrize("clave,esperado", [
+    (("genero", "precio"), ["3", "2", "1"]),
+    (["genero", "precio"], ["3", "2", "1"]),
+    (("precio", "desc"), ["2", "3", "1"]),
+    (("precio", "ASC"), ["1", "3", "2"]),
+    ([("genero", "desc"), "precio"], ["1", "3", "2"]),
+    (("genero", ("precio", "descendente")), ["2", "3", "1"]),
+])
+def test_tuplas_de_claves(clave, esperado):
+    assert codigos(fcs.ordenar_libros(LIBROS_CHICOS, clave)) == esperado
+    assert codigos(fcs.ordenar_libros(fcs.CatalogoCompacto.desde_libros(LIBROS_CHICOS), clave)) == esperado
+
+
+@pytest.mark.parametrize("clave", [[("precio", "dsc")], [("precio",)], ("genero", ("precio", "abajo"))])
+def test_direccion_desconocida_es_error(clave):
+    with pytest.raises(ValueError):
+        fcs.ordenar_libros(LIBROS_CHICOS, clave)
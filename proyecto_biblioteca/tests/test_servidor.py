@@ -0,0 +1,132 @@
+"""Servicio HTTP/JSON (servidor.py): rutas, conflictos de versión y caché."""
+import asyncio
+import contextlib
+import io
+import json
+
+import pytest
+
+import funciones_jerarquia as fcs
+import servidor
+
+
+def _correr(root, pasos):
+    """Corre la corrutina pasos(pedir, servicio) con un servicio nuevo sobre `root`."""
+    async def principal():
+        servicio = servidor.ServicioBiblioteca(root, trabajadores=2)
+
+        async def pedir(metodo, destino, cuerpo=None):
+            datos = json.dumps(cuerpo).encode("utf-8") if cuerpo is not None else b""
+            try:
+                return await servicio.despachar(metodo, destino, datos)
+            except servidor.ErrorHTTP as e:
+                return e.estado, {"error": str(e)}
+
+        try:
+            return await pasos(pedir, servicio)
+        finally:
+            servicio.pool.shutdown()
+    return asyncio.run(principal())
+
+
+def test_alta_lectura_y_modificacion(biblioteca):
+    async def pasos(pedir, servicio):
+        estado, datos = await pedir("GET", "/libros?limite=5")
+        assert (estado, datos["total"], len(datos["libros"])) == (200, 150, 5)
+
+        estado, datos = await pedir("POST", "/libros", [
+            {"genero": "Ficción", "autor": "Tolkien", "titulo": "El Hobbit", "precio": 1500, "anio": 1937},
+            {"genero": "Ficción", "autor": "Tolkien", "titulo": "Sin precio", "precio": "caro", "anio": 1937},
+        ])
+        assert estado == 201 and [e["registro"] for e in datos["errores"]] == [2]
+        [codigo] = datos["codigos"]
+        assert (await pedir("GET", "/libros"))[1]["total"] == 151
+
+        estado, libro = await pedir("GET", f"/libros/{codigo}")
+        assert (estado, libro["titulo"], libro["precio"], libro["anio"]) == (200, "El Hobbit", 1500.0, 1937)
+        estado, datos = await pedir("PATCH", f"/libros/{codigo}", {"precio": 1800, "version": libro["_version"]})
+        assert (estado, datos) == (200, {"actualizados": 1})
+        assert (await pedir("GET", f"/libros/{codigo}"))[1]["precio"] == 1800.0
+    _correr(biblioteca, pasos)
+
+
+def test_version_vieja_es_409(biblioteca):
+    codigo = fcs.leer_toda_jerarquia(biblioteca)[0]["codigo_libro"]
+
+    async def pasos(pedir, servicio):
+        version = (await pedir("GET", f"/libros/{codigo}"))[1]["_version"]
+        assert (await pedir("PATCH", f"/libros/{codigo}", {"anio": 2001}))[0] == 200
+        estado, _ = await pedir("DELETE", f"/libros/{codigo}", {"version": version})
+        assert estado == 409
+        assert (await pedir("GET", f"/libros/{codigo}"))[1]["anio"] == 2001
+    _correr(biblioteca, pasos)
+
+
+@pytest.mark.parametrize("metodo, destino, cuerpo, estado", [
+    ("GET", "/libros/no-existe", None, 404),
+    ("DELETE", "/libros/no-existe", None, 404),
+    ("GET", "/nada", None, 404),
+    ("POST", "/ordenar", None, 405),
+    ("GET", "/libros?limite=-1", None, 400),
+    ("GET", "/estadisticas?agrupar=titulo", None, 400),
+    ("GET", "/filtrar", None, 400),
+    ("PATCH", "/libros/x", {"precio": "abc"}, 400),
+    ("POST", "/libros", [], 400),
+])
+def test_errores(biblioteca, metodo, destino, cuerpo, estado):
+    async def pasos(pedir, servicio):
+        resultado = await pedir(metodo, destino, cuerpo)
+        assert resultado[0] == estado and "error" in resultado[1]
+    _correr(biblioteca, pasos)
+
+
+def test_lecturas_iguales_a_las_funciones(biblioteca):
+    libros = fcs.leer_toda_jerarquia(biblioteca)
+    autor = libros[0]["autor"]
+    with contextlib.redirect_stdout(io.StringIO()):
+        esperados = {l["codigo_libro"] for l in fcs.filtrar_libros(libros, "autor", autor.upper())}
+
+    async def pasos(pedir, servicio):
+        datos = (await pedir("GET", f"/filtrar?atributo=autor&valor={autor.upper()}"))[1]
+        assert {l["codigo_libro"] for l in datos["libros"]} == esperados
+        datos = (await pedir("GET", "/ordenar?clave=-precio&limite=3"))[1]
+        assert [l["precio"] for l in datos["libros"]] == sorted((float(l["precio"]) for l in libros),
+                                                                reverse=True)[:3]
+        datos = (await pedir("GET", "/estadisticas?agrupar=genero"))[1]
+        assert datos["global"]["cantidad"] == 150
+        assert set(datos["grupos"]) == {l["genero"] for l in libros}
+    _correr(biblioteca, pasos)
+
+
+def test_escritura_de_otro_proceso_recarga_el_cache(biblioteca):
+    async def pasos(pedir, servicio):
+        assert (await pedir("GET", "/libros"))[1]["total"] == 150
+        assert (await pedir("GET", "/libros"))[1]["total"] == 150
+        assert servicio.cache.cargas == 1
+        with contextlib.redirect_stdout(io.StringIO()):
+            fcs.alta_libro(biblioteca, "Poesía", "Neruda", "Veinte poemas", 900, 1924)
+        assert (await pedir("GET", "/libros"))[1]["total"] == 151
+        assert servicio.cache.cargas == 2
+    _correr(biblioteca, pasos)
+
+
+def test_conexion_http_con_keep_alive(biblioteca):
+    async def pasos(pedir, servicio):
+        server = await asyncio.start_server(servicio.atender, "127.0.0.1", 0)
+        puerto = server.sockets[0].getsockname()[1]
+        async with server:
+            reader, writer = await asyncio.open_connection("127.0.0.1", puerto)
+            respuestas = []
+            for destino in ("/salud", "/libros?limite=1"):
+                writer.write(f"GET {destino} HTTP/1.1\r\nHost: x\r\n\r\n".encode("latin-1"))
+                estado = (await reader.readline()).split()[1]
+                encabezados = {}
+                while (linea := await reader.readline()) != b"\r\n":
+                    nombre, _, valor = linea.decode("latin-1").partition(":")
+                    encabezados[nombre.lower()] = valor.strip()
+                cuerpo = await reader.readexactly(int(encabezados["content-length"]))
+                respuestas.append((int(estado), json.loads(cuerpo)))
+            writer.close()
+        assert respuestas[0][0] == 200 and respuestas[0][1]["estado"] == "ok"
+        assert respuestas[1][0] == 200 and respuestas[1][1]["total"] == 150
+    _correr(biblioteca, pasos)
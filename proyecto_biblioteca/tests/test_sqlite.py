@@ -0,0 +1,125 @@
+import os
+from contextlib import closing
+
+import pytest
+
+import backend_sqlite
+import funciones_jerarquia as fcs
+from conftest import codigos, registros
+
+
+@pytest.fixture
+def base(tmp_path):
+    root = str(tmp_path / "biblioteca.db")
+    fcs.inicializar_root(root)
+    fcs.alta_libros_bulk(root, registros())
+    return root
+
+
+def _filas(libros):
+    return sorted((l["codigo_libro"], l["titulo"], l["autor"], l["genero"], float(l["precio"]), int(l["anio"]))
+                  for l in libros)
+
+
+def test_migracion_conserva_los_libros(biblioteca, tmp_path):
+    destino = str(tmp_path / "migrada.sqlite")
+    resumen = fcs.copiar_biblioteca(biblioteca, destino)
+    assert resumen["libros"] == 150
+    assert _filas(fcs.leer_toda_jerarquia(destino)) == _filas(fcs.leer_toda_jerarquia(biblioteca))
+    assert _filas(fcs.iter_libros(destino, genero="historia")) == \
+        _filas(fcs.iter_libros(biblioteca, genero="historia"))
+    titulo = fcs.leer_toda_jerarquia(biblioteca)[0]["titulo"]
+    assert sorted(fcs.codigos_por_titulo(destino, titulo)) == sorted(fcs.codigos_por_titulo(biblioteca, titulo))
+
+
+def test_alta_modificacion_y_baja(base):
+    fcs.alta_libro(base, "Ficción", "Tolkien", "El Hobbit", 1500, 1937)
+    [codigo] = fcs.codigos_por_titulo(base, "el hobbit")
+    otro = fcs.leer_toda_jerarquia(base)[0]["codigo_libro"]
+    resumen = fcs.aplicar_lote(base, [("actualizar", codigo, {"precio": 1800}), ("eliminar", otro),
+                                      ("eliminar", "no-existe")])
+    assert (resumen["actualizados"], resumen["eliminados"], resumen["no_encontrados"]) == (1, 1, ["no-existe"])
+    [libro] = fcs.leer_libros_por_codigo(base, [codigo, otro])
+    assert float(libro["precio"]) == 1800 and int(libro["anio"]) == 1937
+    assert len(fcs.leer_toda_jerarquia(base)) == 150
+
+
+def test_esquema_una_vez_por_base(base, monkeypatch):
+    # Si volviera a correr el esquema en cada conexión, este fallaría
+    monkeypatch.setattr(backend_sqlite, "ESQUEMA", "esto no es SQL;")
+    assert len(fcs.leer_toda_jerarquia(base)) == 150
+    os.remove(base)
+    with pytest.raises(Exception):
+        backend_sqlite._conectar(base)
+
+
+def test_base_borrada_se_vuelve_a_crear(base):
+    os.remove(base)
+    assert fcs.leer_toda_jerarquia(base) == []
+
+
+def test_consulta_igual_al_motor(base):
+    motor = fcs.MotorConsultas(fcs.leer_toda_jerarquia(base))
+    for consulta in ["precio=1000..5000 & anio>=1990", "genero=Historia | autor^=Autor 1", "anio!=2001"]:
+        assert sorted(codigos(fcs.consultar_biblioteca(base, consulta))) == \
+            sorted(codigos(motor.consultar(fcs.parsear_consulta(consulta))))
+
+
+@pytest.mark.parametrize("condicion", [
+    ("precio", ">=", "xyz"), ("anio", "entre", "1990", "dos mil"),
+    ("o", ("genero", "=", "Historia"), ("anio", "=", "abc")),
+])
+def test_valor_numerico_invalido_es_error(base, condicion):
+    with pytest.raises(ValueError):
+        fcs.consultar_biblioteca(base, condicion)
+    with pytest.raises(ValueError):
+        backend_sqlite._sql_condicion(condicion, [])
+
+
+def _busqueda(root, texto, **opciones):
+    return sorted((r["codigo_libro"], r["similitud"]) for r in fcs.buscar_libros(root, texto, **opciones))
+
+
+@pytest.mark.parametrize("texto, opciones", [
+    ("lo 1", {}), ("autor 1", {"campos": ("autor",)}), ("T", {}),
+    ("titlo 4", {"difuso": True}), ("atuor 7", {"difuso": True, "campos": ("autor",)}),
+])
+def test_busqueda_igual_a_la_version_csv(biblioteca_lectura, tmp_path, texto, opciones):
+    base = str(tmp_path / "copia.db")
+    fcs.copiar_biblioteca(biblioteca_lectura, base)
+    assert _busqueda(base, texto, **opciones) == _busqueda(biblioteca_lectura, texto, **opciones)
+
+
+def test_trigramas_al_dia_con_altas_y_bajas(base):
+    codigo = fcs.alta_libro(base, "Ficción", "Ursula Le Guin", "Los desposeídos", 2500.0, 1974)
+    assert [r["codigo_libro"] for r in fcs.buscar_libros(base, "desposeidos")] == [codigo]
+    assert codigo in codigos(fcs.buscar_libros(base, "le guin", campos=("autor",)))
+
+    fcs.aplicar_lote(base, [("eliminar", codigo)])
+    assert fcs.buscar_libros(base, "desposeidos", difuso=True) == []
+    assert not any(fcs.verificar_indices(base).values())
+
+
+def test_base_sin_trigramas_se_migra_y_verificar_repara(base):
+    with closing(backend_sqlite._conectar(base)) as conexion, conexion:
+        conexion.execute("DELETE FROM trigramas")
+    # La búsqueda sale de la tabla: vacía, no encuentra nada
+    assert fcs.buscar_libros(base, "titulo") == []
+    assert fcs.verificar_indices(base, reparar=True)["trigramas"]
+    assert len(fcs.buscar_libros(base, "titulo")) == 150
+
+    with closing(backend_sqlite._conectar(base)) as conexion, conexion:
+        conexion.execute("DELETE FROM trigramas")
+    backend_sqlite._BASES_INICIALIZADAS.clear()  # como un proceso nuevo con una base de antes
+    assert len(fcs.buscar_libros(base, "titulo")) == 150
+    assert not any(fcs.verificar_indices(base).values())
+
+
+def test_codigo_repetido_en_bulk_no_deja_terminos_huerfanos(base):
+    codigo = fcs.alta_libro(base, "Ficción", "Ursula Le Guin", "Los desposeídos", 2500.0, 1974)
+    fcs.alta_libros_bulk(base, [{"codigo_libro": codigo, "genero": "Ficción", "autor": "Ursula Le Guin",
+                                 "titulo": "La mano izquierda", "precio": "1", "anio": "1969"}],
+                         conservar_codigos=True)
+    assert fcs.buscar_libros(base, "desposeidos") == []
+    assert codigos(fcs.buscar_libros(base, "mano izq")) == [codigo]
+    assert not any(fcs.verificar_indices(base).values())